@@ -1,32 +1,146 @@
 import os
 import json
+import asyncio
+import logging
+import time
 from uuid import uuid4
 from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import httpx
-import re
+
+import groq_client
+import groq_scheduler
+import logs
+import metrics
+import prompts
+import recommender
+import resilience
+from roadmap_cache import create_roadmap_cache
+from storage import create_user_store
+from task_index import TaskIndex
+from video_cache import create_video_cache, video_cache_key
+from batch_jobs import BatchRunner, BATCH_MAX_ITEMS
+from job_queue import JOB_DRAIN_SECONDS, JobQueue, start_job_workers, stop_job_workers
+import chat_context
+from answer_cache import create_answer_cache
+from json_stream import RoadmapStreamParser, format_json_path, parse_llm_json, parse_partial_json
 
 load_dotenv()
 
+logger = logs.get_logger(__name__)
 
 GROQ_API_KEY  = os.getenv("GROQ_API_KEY")
 GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+YOUTUBE_BASE_URL = os.getenv("YOUTUBE_BASE_URL", "https://www.googleapis.com/youtube/v3")
+
+# "single" = one completion for the whole roadmap, "per_month" = outline + parallel
+# month expansion, "auto" = per_month for 1_year roadmaps only
+ROADMAP_GENERATION_MODE = os.getenv("ROADMAP_GENERATION_MODE", "auto")
+ROADMAP_MONTH_CONCURRENCY = int(os.getenv("ROADMAP_MONTH_CONCURRENCY", "4"))
+ROADMAP_MONTH_RETRIES = int(os.getenv("ROADMAP_MONTH_RETRIES", "3"))
+
+# Week-level repair of otherwise good roadmaps (see repair_roadmap)
+ROADMAP_REPAIR_ROUNDS = int(os.getenv("ROADMAP_REPAIR_ROUNDS", "2"))
+ROADMAP_REPAIR_ATTEMPTS = int(os.getenv("ROADMAP_REPAIR_ATTEMPTS", "2"))
+ROADMAP_REPAIR_MAX_WEEKS = int(os.getenv("ROADMAP_REPAIR_MAX_WEEKS", "12"))
+
+# Follow-up calls for the months a cut-off single-completion roadmap didn't reach
+ROADMAP_MAX_CONTINUATIONS = int(os.getenv("ROADMAP_MAX_CONTINUATIONS", "2"))
+
+# Day of the week from which the next week's videos are prefetched
+VIDEO_PREFETCH_FROM_DAY = int(os.getenv("VIDEO_PREFETCH_FROM_DAY", "5"))
+
+# Roadmaps, progress and chat history (in-memory or SQLite, see storage.py)
+user_store = create_user_store()
+
+
+def update_user_store_metrics():
+    metrics.USER_STORE_USERS.set(user_store.count_users())
+    size = user_store.size_bytes()
+    if size is not None:
+        metrics.USER_STORE_BYTES.set(size)
+
+
+metrics.on_scrape(update_user_store_metrics)
+
+# Shared roadmap templates for users with identical onboarding answers
+roadmap_cache = create_roadmap_cache(version="/".join([groq_client.GROQ_MODEL] + prompts.ROADMAP_PROMPT_VERSIONS))
+video_cache = create_video_cache()
+
+# Answers to generic chat questions, shared per goal/target_role (opt-in, see answer_cache.py)
+answer_cache = create_answer_cache()
+
+# Retries, backoff and circuit breaker for YouTube; 403 (quota exhausted) counts as down too
+youtube_upstream = resilience.upstream("youtube", failure_statuses=resilience.FAILURE_STATUSES | {403})
+
+# Durable queue for background roadmap generation (see /api/roadmap_jobs). A JobQueue,
+# opened by the lifespan so that importing this module doesn't touch jobs.db
+job_queue = None
+
+def require_job_queue() -> JobQueue:
+    """The open job queue, or 503 before the lifespan has opened it (or after it closed it)"""
+    if job_queue is None:
+        raise HTTPException(503, "Job queue not ready")
+    return job_queue
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_queue
+    # Started here rather than at import, like the clients below
+    logs.configure()
+    job_queue = JobQueue()
+    # The pooled HTTP/2 Groq client (TLS and h2 setup) is built in the background,
+    # so the worker answers health checks before it is ready; the first call waits for it
+    client_warmup = asyncio.create_task(asyncio.to_thread(groq_client.get_client))
+    job_workers = start_job_workers(job_queue, {"generate_roadmap": run_roadmap_job})
+    yield
+    # The server has stopped taking requests; let running generations finish before closing the stores
+    await asyncio.gather(
+        stop_job_workers(job_queue, job_workers, JOB_DRAIN_SECONDS),
+        batch_runner.drain(JOB_DRAIN_SECONDS)
+    )
+    await client_warmup
+    await groq_client.close_client()
+    recommender.close()
+    video_cache.close()
+    queue, job_queue = job_queue, None
+    queue.close()
+    user_store.close()
+    logs.shutdown()
+
+# Every endpoint is registered here; create_app() mounts it next to the recommender's router
+router = APIRouter()
+
+class RequestIdMiddleware:
+    """Correlate every log line of a request (generate -> validate -> store) under one id, echoed back in X-Request-ID.
+
+    Plain ASGI rather than @app.middleware("http"): that resets the id as soon as the
+    response starts, before a StreamingResponse body (NDJSON roadmap, SSE chat) has run.
+    """
 
-# In-memory user store (for demo)
-user_store: dict[str, dict] = {}
-chat_history: dict[str, list] = {}
+    def __init__(self, app):
+        self.app = app
 
-app = FastAPI()
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = next((value for name, value in scope["headers"] if name == b"x-request-id"), b"")
+        rid = header.decode("latin-1")[:64] or logs.new_request_id()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", rid.encode("latin-1"))]}
+            await send(message)
+
+        with logs.request_context(rid):
+            await self.app(scope, receive, send_with_id)
 
 from typing import Optional, List
 
@@ -70,231 +184,391 @@ def regroup_by_month(flat_weeks: list[dict], weeks_per_month: int = 4) -> list[d
     return months
 
 #LLM-based Roadmap Generation
-def llm_generate_roadmap(req: FullPipelineReq) -> dict:
+async def llm_generate_roadmap(req: FullPipelineReq) -> dict:
     """Generate comprehensive roadmap with weekly focuses and daily tasks"""
+    mode = "per_month" if use_per_month_generation(req) else "single"
+    prompt_version = prompts.for_request(req).version
+    started = time.perf_counter()
+    with groq_client.track_usage() as usage:
+        if mode == "per_month":
+            roadmap_data = await llm_generate_roadmap_per_month(req)
+        else:
+            roadmap_data = await llm_generate_roadmap_single(req)
+
+    metrics.ROADMAP_TOKENS.observe(usage["total_tokens"], mode=mode)
+    metrics.ROADMAP_SECONDS.observe(time.perf_counter() - started, mode=mode)
+    metrics.ROADMAP_PROMPT_TOKENS.observe(usage["total_tokens"], prompt_version=prompt_version)
+    roadmap_data["prompt_version"] = prompt_version
+    return roadmap_data
+
+async def llm_generate_roadmap_single(req: FullPipelineReq) -> dict:
+    """Generate the whole roadmap in one completion, repairing broken weeks in place"""
     max_retries = 3
+    template = prompts.for_request(req).roadmap
+    # Rendered once: every attempt sends the same request body
+    payload = template.render(months=prompts.timeframe_months(req.timeframe), profile=prompts.learner_profile(req))
     
     for attempt in range(max_retries):
         try:
-            print(f"Generating roadmap for: {req.goal}")
+            logger.info("Generating roadmap", extra={"goal": req.goal, "attempt": attempt + 1})
             
             if not GROQ_API_KEY:
                 raise HTTPException(500, "GROQ_API_KEY not configured")
             
-            system_prompt = """You are Navi, a very realistic and practical expert career strategist AI that creates detailed learning roadmaps.
-    
-    CRITICAL JSON STRUCTURE RULES:
-    1. Every month MUST have exactly 4 weeks
-    2. Every week MUST have exactly 6 daily tasks
-    3. The roadmap structure MUST be:
-    {
-        "roadmap": [
-            {
-                "month": 1,
-                "month_title": "Specific Month Title",
-                "weeks": [
-                    {
-                        "week": 1,
-                        "week_number": 1,
-                        "focus": "Specific Week Focus",
-                        "daily_tasks": [
-                            {
-                                "day": 1,
-                                "title": "Specific Task Title",
-                                "description": "Detailed task description"
-                            },
-                            // ... exactly 6 tasks per week
-                        ]
-                    },
-                    // ... exactly 4 weeks per month
-                ]
-            },
-            // ... one object per month based on timeframe
-        ]
-    }
-    
-    CONTENT REQUIREMENTS:
-    1. NO generic titles like "Week 4 Learning" or "Day 1 Task"
-    2. Each month_title must describe the learning focus (e.g., "Frontend Framework Mastery")
-    3. Each week.focus must be specific (e.g., "React Components and Props")
-    4. Each task must be actionable and include a resource
-    
-    Example of CORRECT content:
-    {
-        "month_title": "JavaScript Fundamentals",
-        "weeks": [{
-            "focus": "DOM Manipulation",
-            "daily_tasks": [{
-                "title": "Learn querySelector Methods",
-                "description": "Complete MDN's DOM manipulation tutorial section on querySelectorAll"
-            }]
-        }]
-    }
-    """
-    
-            # Update user prompt to be explicit about months
-            timeframe_map = {
-                "3_months": "3 months",
-                "6_months": "6 months",
-                "1_year": "12 months",
-                "not_sure": "3 months"  # Explicitly state 3 months
-            }
-            actual_timeframe = timeframe_map.get(req.timeframe, "3 months")
-            
-            user_prompt = f"""Create a {actual_timeframe} roadmap for:
-    
-    Goal: {req.goal}
-    Target Role: {req.target_role}
-    Available Time: {req.hours_per_week} hours per week
-    Learning Style: {req.learning_style}
-    Learning Speed: {req.learning_speed}
-    Skill Level: {req.skill_level}
-    
-    IMPORTANT: The roadmap MUST contain exactly {actual_timeframe.split()[0]} months of content.
-    Each week should have exactly 6 daily tasks to match the UI template."""
-    
-            # Add verify=False for testing only
-            with httpx.Client(timeout=120.0, verify=False) as client:
-                response = client.post(
-                    f"{GROQ_BASE_URL}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {GROQ_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "openai/gpt-oss-120b",
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "temperature": 1,
-                        "max_tokens": 20000
-                    }
-                )
+            with metrics.ROADMAP_STAGE_SECONDS.time(stage="llm_call"):
+                response_data = await groq_client.chat_completion(payload, timeout=120.0)
             
             # Get raw content
-            response_data = response.json()
             if "choices" not in response_data or not response_data["choices"]:
                 raise ValueError("Invalid API response: missing choices")
                 
-            raw_content = response_data["choices"][0]["message"]["content"].strip()
-            print("Raw LLM response length:", len(raw_content))
+            choice = response_data["choices"][0]
+            raw_content = choice["message"]["content"].strip()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw LLM response", extra={"response": logs.payload(raw_content)})
             
-            # Clean and parse JSON
-            cleaned_json = clean_llm_response(raw_content)
-            roadmap_data = safe_json_loads(cleaned_json)
+            # Parse JSON; a response cut off at max_tokens is resumed from its last complete week, not regenerated
+            roadmap_data, cut_path = parse_roadmap_response(raw_content)
+            if cut_path is not None or choice.get("finish_reason") == "length":
+                roadmap_data = await continue_roadmap(roadmap_data, req)
             
             # Validate structure with timeframe check
-            if validate_roadmap_structure(roadmap_data, req):
+            defects = validate_roadmap_structure(roadmap_data, req)
+            template.record_validation(not defects)
+            if not defects:
                 return roadmap_data
-            else:
-                print(f"Attempt {attempt + 1}: Invalid roadmap structure, retrying...")
-                continue
+
+            # Re-prompt only for the broken weeks unless the response is too far gone
+            if is_repairable(defects) or attempt == max_retries - 1:
+                return await repair_roadmap(roadmap_data, defects, req)
+
+            logger.warning("Invalid roadmap structure, regenerating", extra={"attempt": attempt + 1, "defects": len(defects)})
+            metrics.ROADMAP_REGENERATIONS.inc()
+            continue
                 
         except Exception as e:
-            print(f"Error on attempt {attempt + 1}: {str(e)}")
-            if attempt == max_retries - 1:
+            logger.warning("Roadmap generation attempt failed", extra={"attempt": attempt + 1, "error": str(e)})
+            # Upstream errors were already retried with backoff; repeating the prompt won't help
+            if attempt == max_retries - 1 or resilience.is_upstream_failure(e):
                 raise
     
     raise ValueError("Failed to generate valid roadmap after multiple attempts")
 
-def validate_roadmap_structure(roadmap_data: dict, req: FullPipelineReq) -> bool:
-    """Validate that the roadmap has the correct structure and month count"""
+def parse_roadmap_response(raw_content: str) -> tuple[dict, Optional[list]]:
+    """Parse a roadmap completion. If it was cut off, keep the complete months and weeks and return the path where it stopped."""
+    roadmap_data, cut_path = parse_partial_json(raw_content)
+    if cut_path is None:
+        return roadmap_data, None
+
+    logger.info("Roadmap response cut off", extra={"cut_path": format_json_path(cut_path)})
+    roadmap = roadmap_data.get("roadmap")
+    if not isinstance(roadmap, list):
+        roadmap_data["roadmap"] = []
+    elif len(cut_path) >= 2 and cut_path[0] == "roadmap":
+        month_pos = cut_path[1]
+        month = roadmap[month_pos]
+        if not isinstance(month, dict) or not month.get("month_title"):
+            del roadmap[month_pos:]
+        elif not isinstance(month.get("weeks"), list):
+            month["weeks"] = []
+        elif len(cut_path) >= 4 and cut_path[2] == "weeks":
+            # The week being written is redone by the continuation
+            del month["weeks"][cut_path[3]:]
+    return roadmap_data, cut_path
+
+async def continue_roadmap(roadmap_data: dict, req: FullPipelineReq) -> dict:
+    """Resume a cut-off roadmap from its last complete week and stitch the continuation onto it"""
+    template = prompts.for_request(req).continuation
+    expected_months = prompts.timeframe_months(req.timeframe)
+    roadmap = roadmap_data["roadmap"]
+
+    for _ in range(ROADMAP_MAX_CONTINUATIONS):
+        # Finish the last month if it is short of weeks, otherwise start the next one
+        last = roadmap[-1] if roadmap and isinstance(roadmap[-1], dict) else None
+        last_weeks = last.get("weeks") if last is not None else None
+        resume_last = isinstance(last_weeks, list) and len(last_weeks) < 4
+        if resume_last:
+            month_pos, week_pos = len(roadmap), len(last_weeks) + 1
+            first = f'month {month_pos} ("{last.get("month_title", "")}") with only weeks {week_pos} to 4'
+        else:
+            month_pos, week_pos = len(roadmap) + 1, 1
+            first = f"month {month_pos}"
+        if month_pos > expected_months:
+            break
+
+        written = "\n".join(
+            f"    Month {pos}: {month.get('month_title', '')} - "
+            + "; ".join(w.get("focus", "") for w in month.get("weeks", []) if isinstance(w, dict))
+            for pos, month in enumerate(roadmap, 1) if isinstance(month, dict)
+        )
+        with metrics.ROADMAP_STAGE_SECONDS.time(stage="llm_call"):
+            response_data = await groq_client.chat_completion(
+                template.render(
+                    months=expected_months, month=month_pos, week=week_pos, profile=prompts.learner_profile(req),
+                    written=written or "    (nothing yet)", first=first
+                ),
+                timeout=120.0
+            )
+        metrics.ROADMAP_CONTINUATIONS.inc()
+        # An unusable continuation ends the resumption; what was collected still goes on
+        # to validation and repair rather than failing the whole generation
+        try:
+            if not response_data.get("choices"):
+                raise ValueError("Invalid API response: missing choices")
+            more, _ = parse_roadmap_response(response_data["choices"][0]["message"]["content"].strip())
+        except (ValueError, LookupError, TypeError, AttributeError) as e:
+            logger.warning("Unusable roadmap continuation", extra={"month": month_pos, "week": week_pos, "error": str(e)})
+            break
+        more_months = more.get("roadmap")
+        months = [month for month in more_months if isinstance(month, dict)] if isinstance(more_months, list) else []
+        if not months:
+            logger.warning("Roadmap continuation has no months", extra={"month": month_pos, "week": week_pos, "keys": list(more)[:10]})
+            break
+        logger.info("Continued roadmap", extra={"month": month_pos, "week": week_pos, "months": len(months)})
+
+        if resume_last:
+            weeks = [w for w in months.pop(0).get("weeks", []) if isinstance(w, dict)][:5 - week_pos]
+            for pos, week in enumerate(weeks, week_pos):
+                week["week"] = pos
+                week["week_number"] = pos
+            last_weeks.extend(weeks)
+        months = months[:expected_months - len(roadmap)]
+        for pos, month in enumerate(months, len(roadmap) + 1):
+            month["month"] = pos
+        roadmap.extend(months)
+    return roadmap_data
+
+def roadmap_defect(kind: str, detail: str, month: Optional[int] = None, week: Optional[int] = None, day: Optional[int] = None, **extra) -> dict:
+    """A single validation problem. month/week/day are 1-based positions in the roadmap arrays."""
+    return {"kind": kind, "month": month, "week": week, "day": day, "detail": detail, **extra}
+
+def validate_roadmap_structure(roadmap_data: dict, req: FullPipelineReq) -> list[dict]:
+    """Validate the roadmap structure and month count, returning every defect found (empty list = valid)"""
+    started = time.perf_counter()
     try:
         roadmap = roadmap_data.get("roadmap", [])
         
         # Verify correct number of months based on timeframe
-        timeframe_map = {
-            "3_months": 3,
-            "6_months": 6,
-            "1_year": 12,
-            "not_sure": 3  # Enforcing 3 months for "not sure"
-        }
-        expected_months = timeframe_map.get(req.timeframe, 3)
+        expected_months = prompts.timeframe_months(req.timeframe)
         
+        defects = []
         if len(roadmap) != expected_months:
-            print(f"Expected {expected_months} months, got {len(roadmap)} months")
-            return False
+            defects.append(roadmap_defect(
+                "month_count", f"Expected {expected_months} months, got {len(roadmap)} months",
+                expected=expected_months, actual=len(roadmap)
+            ))
         
         # Check each month
-        for month in roadmap:
-            if len(month.get("weeks", [])) != 4:
-                print(f"Month {month.get('month')} doesn't have exactly 4 weeks")
-                return False
-                
-            # Check each week
-            for week in month["weeks"]:
-                if len(week.get("daily_tasks", [])) != 6:
-                    print(f"Week {week.get('week')} in month {month.get('month')} doesn't have exactly 6 tasks")
-                    return False
-                    
-                # Check for generic content
-                if "Learning" in week.get("focus", ""):
-                    print(f"Generic week focus detected: {week.get('focus')}")
-                    return False
-                    
-                # Check tasks
-                for task in week["daily_tasks"]:
-                    if "Task" in task.get("title", "") or "Day" in task.get("title", ""):
-                        print(f"Generic task title detected: {task.get('title')}")
-                        return False
-        
-        return True
+        for month_pos, month in enumerate(roadmap, 1):
+            defects.extend(find_month_defects(month, month_pos))
     except Exception as e:
-        print(f"Validation error: {str(e)}")
-        return False
-
-def safe_json_loads(raw_content: str) -> dict:
-    """Safely parse JSON content with multiple fallback attempts"""
-    try:
-        return json.loads(raw_content)
-    except json.JSONDecodeError as e:
-        print("Initial JSON parsing failed, attempting repairs...")
-        try:
-            # Try fixing common JSON issues
-            fixed = raw_content
-            # Replace single quotes with double quotes
-            fixed = re.sub(r"(?<!\\)'", '"', fixed)
-            # Remove trailing commas
-            fixed = re.sub(r',(\s*[}\]])', r'\1', fixed)
-            # Ensure property names are quoted
-            fixed = re.sub(r'([{,]\s*)(\w+)(:)', r'\1"\2"\3', fixed)
-            
-            print("Attempting to parse fixed JSON...")
-            return json.loads(fixed)
-        except Exception as repair_err:
-            print("JSON repair failed:", str(repair_err))
-            print("Problematic JSON:", raw_content[:200])
-            raise ValueError(f"Could not parse JSON response: {str(e)}")
-
-def clean_llm_response(raw_content: str) -> str:
-    """Clean and extract valid JSON from LLM response"""
-    try:
-        # Remove markdown code blocks
-        if "```json" in raw_content:
-            parts = raw_content.split("```json")
-            raw_content = parts[1].split("```")[0]
+        defects = [roadmap_defect("malformed", f"Validation error: {str(e)}")]
+    metrics.ROADMAP_STAGE_SECONDS.observe(time.perf_counter() - started, stage="validate")
+
+    if defects:
+        logger.info("Roadmap defects found", extra={"defects": len(defects), "first": defects[0]["detail"]})
+        for defect in defects:
+            metrics.ROADMAP_DEFECTS.inc(kind=defect["kind"])
+    return defects
+
+def find_month_defects(month: dict, month_pos: int) -> list[dict]:
+    """Check a single month: 4 weeks, 6 tasks per week, no generic content"""
+    if not isinstance(month, dict):
+        return [roadmap_defect("malformed", f"Month {month_pos} is not an object", month=month_pos)]
+
+    weeks = month.get("weeks", [])
+    defects = []
+    if len(weeks) != 4:
+        defects.append(roadmap_defect(
+            "week_count", f"Month {month_pos} doesn't have exactly 4 weeks",
+            month=month_pos, expected=4, actual=len(weeks)
+        ))
         
-        # Find the outermost JSON object
-        json_start = raw_content.find('{')
-        json_end = raw_content.rfind('}') + 1
+    # Check each week
+    for week_pos, week in enumerate(weeks, 1):
+        defects.extend(find_week_defects(week, month_pos, week_pos))
+    return defects
+
+def find_week_defects(week: dict, month_pos: int, week_pos: int) -> list[dict]:
+    """Check a single week: 6 specific tasks under a specific focus"""
+    if not isinstance(week, dict):
+        return [roadmap_defect("malformed", f"Week {week_pos} in month {month_pos} is not an object", month=month_pos, week=week_pos)]
+
+    defects = []
+    tasks = week.get("daily_tasks", [])
+    if len(tasks) != 6:
+        defects.append(roadmap_defect(
+            "task_count", f"Week {week_pos} in month {month_pos} doesn't have exactly 6 tasks",
+            month=month_pos, week=week_pos, expected=6, actual=len(tasks)
+        ))
         
-        if json_start == -1 or json_end <= json_start:
-            raise ValueError("No valid JSON object found in response")
+    # Check for generic content
+    if "Learning" in week.get("focus", ""):
+        defects.append(roadmap_defect(
+            "generic_focus", f"Generic week focus detected: {week.get('focus')}",
+            month=month_pos, week=week_pos
+        ))
         
-        cleaned_json = raw_content[json_start:json_end]
-        
-        # Remove any trailing commas before } or ]
-        cleaned_json = re.sub(r',(\s*[}\]])', r'\1', cleaned_json)
-        
-        return cleaned_json.strip()
-    except Exception as e:
-        print(f"Error cleaning JSON: {str(e)}")
-        print("Raw content:", raw_content[:200])  # Print first 200 chars for debugging
-        raise
+    # Check tasks
+    for day_pos, task in enumerate(tasks, 1):
+        if not isinstance(task, dict):
+            defects.append(roadmap_defect("malformed", f"Task {day_pos} in week {week_pos} of month {month_pos} is not an object", month=month_pos, week=week_pos, day=day_pos))
+        elif "Task" in task.get("title", "") or "Day" in task.get("title", ""):
+            defects.append(roadmap_defect(
+                "generic_title", f"Generic task title detected: {task.get('title')}",
+                month=month_pos, week=week_pos, day=day_pos
+            ))
+    return defects
+
+def is_complete_roadmap(roadmap_data: dict, req: FullPipelineReq) -> bool:
+    """Defect-free check without logging or metrics, used to keep placeholder roadmaps out of the cache"""
+    roadmap = roadmap_data.get("roadmap", [])
+    if len(roadmap) != prompts.timeframe_months(req.timeframe):
+        return False
+    return not any(find_month_defects(month, pos) for pos, month in enumerate(roadmap, 1))
+
+def validate_month(month: dict) -> bool:
+    """Validate a single month: 4 weeks, 6 tasks per week, no generic content"""
+    defects = find_month_defects(month, month.get("month") if isinstance(month, dict) else None)
+    if defects:
+        logger.info("Invalid month", extra={"defects": len(defects), "first": defects[0]["detail"]})
+    return not defects
+
+# ROADMAP REPAIR
+def is_repairable(defects: list[dict]) -> bool:
+    """Whether patching individual weeks is cheaper than regenerating the whole roadmap"""
+    broken_weeks = set()
+    for defect in defects:
+        if defect["kind"] == "malformed" and defect["month"] is None:
+            return False
+        if defect["kind"] == "month_count" and defect["actual"] < defect["expected"]:
+            # Missing months have no titles or focuses to repair from
+            return False
+        if defect["week"] is not None:
+            broken_weeks.add((defect["month"], defect["week"]))
+        elif defect["kind"] == "week_count":
+            broken_weeks.update((defect["month"], w) for w in range(defect["actual"] + 1, defect["expected"] + 1))
+    return len(broken_weeks) <= ROADMAP_REPAIR_MAX_WEEKS
+
+async def repair_week(req: FullPipelineReq, month: dict, week_pos: int) -> Optional[dict]:
+    """Ask the LLM for a replacement of one week; returns None if it still fails validation"""
+    weeks = month.get("weeks", [])
+    current = weeks[week_pos - 1] if week_pos <= len(weeks) and isinstance(weeks[week_pos - 1], dict) else {}
+    focus = current.get("focus", "")
+    other_focuses = "\n".join(
+        f"    Week {pos}: {w.get('focus')}"
+        for pos, w in enumerate(weeks, 1)
+        if pos != week_pos and isinstance(w, dict)
+    )
+    keep_focus = f"Keep this focus: {focus}" if focus and "Learning" not in focus else "Choose a specific focus that fits between the other weeks."
+    template = prompts.for_request(req).week_repair
+    fields = {
+        "week": week_pos, "month": month.get("month"), "month_title": month.get("month_title", ""),
+        "profile": prompts.learner_profile(req), "other_weeks": other_focuses, "keep_focus": keep_focus
+    }
+
+    for attempt in range(ROADMAP_REPAIR_ATTEMPTS):
+        try:
+            week = await request_roadmap_json(template, **fields)
+            week["week"] = week_pos
+            week["week_number"] = week_pos
+            for day_pos, task in enumerate(week.get("daily_tasks", []), 1):
+                if isinstance(task, dict):
+                    task["day"] = day_pos
+            valid = not find_week_defects(week, month.get("month"), week_pos)
+            template.record_validation(valid)
+            if valid:
+                return week
+            logger.warning("Repaired week still invalid", extra={"month": month.get("month"), "week": week_pos, "attempt": attempt + 1})
+        except Exception as e:
+            logger.warning("Week repair failed", extra={"month": month.get("month"), "week": week_pos, "attempt": attempt + 1, "error": str(e)})
+            if resilience.is_upstream_failure(e):
+                break
+    return None
+
+async def repair_month(req: FullPipelineReq, month: dict, defects: list[dict]):
+    """Fix the defective weeks of one month in place; the rest of the month is kept as-is"""
+    weeks = month.setdefault("weeks", [])
+    targets = set()
+    for defect in defects:
+        if defect["kind"] == "week_count":
+            del weeks[4:]
+            targets.update(range(len(weeks) + 1, 5))
+        elif defect["kind"] == "task_count" and defect["actual"] > defect["expected"]:
+            # Too many tasks is fixable locally, unless the week was just trimmed away
+            if defect["week"] <= len(weeks):
+                del weeks[defect["week"] - 1]["daily_tasks"][defect["expected"]:]
+        elif defect["week"] is not None:
+            targets.add(defect["week"])
+
+    # A trimmed week may still have other defects
+    for defect in defects:
+        if defect["kind"] == "task_count" and defect["actual"] > defect["expected"] and defect["week"] <= len(weeks):
+            if find_week_defects(weeks[defect["week"] - 1], defect["month"], defect["week"]):
+                targets.add(defect["week"])
+
+    targets = sorted(t for t in targets if t <= 4)
+    repaired = await asyncio.gather(*(repair_week(req, month, week_pos) for week_pos in targets))
+    for week_pos, week in zip(targets, repaired):
+        if week is None:
+            continue
+        while len(weeks) < week_pos:
+            weeks.append({"week": len(weeks) + 1, "week_number": len(weeks) + 1, "focus": "", "daily_tasks": []})
+        weeks[week_pos - 1] = week
+
+async def repair_roadmap(roadmap_data: dict, defects: list[dict], req: FullPipelineReq) -> dict:
+    """Splice regenerated weeks into the roadmap, using normalize_roadmap_structure as the last-resort filler"""
+    expected_months = prompts.timeframe_months(req.timeframe)
+    roadmap = roadmap_data.setdefault("roadmap", [])
+    del roadmap[expected_months:]
+
+    # Positions are what the defects refer to, so make the labels agree with them
+    for month_pos, month in enumerate(roadmap, 1):
+        if isinstance(month, dict):
+            month["month"] = month_pos
+
+    for round_num in range(ROADMAP_REPAIR_ROUNDS):
+        by_month: dict[int, list] = {}
+        for defect in defects:
+            if defect["month"] is not None and defect["month"] <= len(roadmap) and isinstance(roadmap[defect["month"] - 1], dict):
+                by_month.setdefault(defect["month"], []).append(defect)
+        if not by_month:
+            break
+
+        logger.info("Repairing roadmap", extra={
+            "round": round_num + 1, "defects": sum(len(d) for d in by_month.values()), "months": len(by_month)
+        })
+        semaphore = asyncio.Semaphore(ROADMAP_MONTH_CONCURRENCY)
+
+        async def repair_with_limit(month_pos: int, month_defects: list[dict]):
+            async with semaphore:
+                await repair_month(req, roadmap[month_pos - 1], month_defects)
+
+        await asyncio.gather(*(repair_with_limit(pos, d) for pos, d in by_month.items()))
+
+        defects = validate_roadmap_structure(roadmap_data, req)
+        if not defects:
+            metrics.ROADMAP_REPAIRS.inc(outcome="repaired")
+            return roadmap_data
+
+    # Last resort: keep everything good and fill the remaining holes with placeholders
+    roadmap_data["roadmap"] = [m for m in roadmap if isinstance(m, dict)]
+    for month_pos, month in enumerate(roadmap_data["roadmap"], 1):
+        month["month"] = month_pos
+        month["weeks"] = [w for w in month.get("weeks", []) if isinstance(w, dict)][:4]
+        for week_pos, week in enumerate(month["weeks"], 1):
+            week["week"] = week_pos
+            week["week_number"] = week_pos
+            week["daily_tasks"] = [t for t in week.get("daily_tasks", []) if isinstance(t, dict)][:6]
+            for day_pos, task in enumerate(week["daily_tasks"], 1):
+                task["day"] = day_pos
+    normalize_roadmap_structure(roadmap_data, months=expected_months)
+    metrics.ROADMAP_REPAIRS.inc(outcome="filled")
+    return roadmap_data
 
 def enhance_roadmap_structure(roadmap_data: dict) -> dict:
     """Add IDs, completion status, and metadata to roadmap"""
+    started = time.perf_counter()
 
     #Start progress tracking
     roadmap_data["progress"] = {
@@ -325,21 +599,14 @@ def enhance_roadmap_structure(roadmap_data: dict) -> dict:
                     task["description"] = f"Master the fundamentals of {week['focus']}"
                 if "estimated_time" not in task:
                     task["estimated_time"] = "2 hours"
+    metrics.ROADMAP_STAGE_SECONDS.observe(time.perf_counter() - started, stage="enhance")
     return roadmap_data
 
 def create_fallback_roadmap(req: FullPipelineReq) -> dict:
     """Create a fallback roadmap when LLM generation fails"""
-    print("Creating fallback roadmap")
-    
-    # Convert timeframe to months
-    timeframe_map = {
-        "3_months": 3,
-        "6_months": 6,
-        "1_year": 12,
-        "not_sure": 3
-    }
+    logger.warning("Creating fallback roadmap", extra={"goal": req.goal})
     
-    months = timeframe_map.get(req.timeframe, 3)
+    months = prompts.timeframe_months(req.timeframe)
     
     roadmap = {
         "goal": req.goal,
@@ -425,50 +692,170 @@ def normalize_roadmap_structure(roadmap_data: dict, months: int = 3, weeks_per_m
     roadmap_data["roadmap"] = roadmap
     return roadmap_data
 
+# PER-MONTH ROADMAP GENERATION
+def use_per_month_generation(req: FullPipelineReq) -> bool:
+    """Decide whether this request uses the outline + per-month generation mode"""
+    if ROADMAP_GENERATION_MODE == "per_month":
+        return True
+    if ROADMAP_GENERATION_MODE == "single":
+        return False
+    return req.timeframe == "1_year"
+
+async def request_roadmap_json(template: prompts.PromptTemplate, **fields) -> dict:
+    """Run one roadmap completion of a prompt template and return its cleaned, parsed JSON"""
+    with metrics.ROADMAP_STAGE_SECONDS.time(stage="llm_call"):
+        response_data = await groq_client.chat_completion(template.render(**fields), timeout=120.0)
+    if "choices" not in response_data or not response_data["choices"]:
+        raise ValueError("Invalid API response: missing choices")
+
+    raw_content = response_data["choices"][0]["message"]["content"].strip()
+    return parse_llm_json(raw_content)
+
+def validate_outline(outline: dict, expected_months: int) -> bool:
+    """Validate the month/week skeleton produced by the outline call"""
+    roadmap = outline.get("roadmap", [])
+    if len(roadmap) != expected_months:
+        logger.info("Outline has the wrong number of months", extra={"expected": expected_months, "actual": len(roadmap)})
+        return False
+    for month in roadmap:
+        if not month.get("month_title") or len(month.get("weeks", [])) != 4:
+            logger.info("Outline month is missing a title or doesn't have exactly 4 weeks", extra={"month": month.get("month")})
+            return False
+        for week in month["weeks"]:
+            if not week.get("focus") or "Learning" in week["focus"]:
+                logger.info("Generic week focus in outline", extra={"focus": week.get("focus")})
+                return False
+    return True
+
+async def generate_roadmap_outline(req: FullPipelineReq, expected_months: int) -> dict:
+    """First step: a short call producing month titles and week focuses"""
+    template = prompts.for_request(req).outline
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            outline = await request_roadmap_json(template, months=expected_months, profile=prompts.learner_profile(req))
+            valid = validate_outline(outline, expected_months)
+            template.record_validation(valid)
+            if valid:
+                # Number months and weeks ourselves so the expansions line up
+                for month_num, month in enumerate(outline["roadmap"], 1):
+                    month["month"] = month_num
+                    for week_num, week in enumerate(month["weeks"], 1):
+                        week["week"] = week_num
+                return outline
+            logger.warning("Invalid outline, retrying", extra={"attempt": attempt + 1})
+        except Exception as e:
+            logger.warning("Outline attempt failed", extra={"attempt": attempt + 1, "error": str(e)})
+            if attempt == max_retries - 1 or resilience.is_upstream_failure(e):
+                raise
+    raise ValueError("Failed to generate valid roadmap outline after multiple attempts")
+
+async def expand_outline_month(req: FullPipelineReq, outline_month: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Second step: expand one outline month into daily tasks, retrying only this month"""
+    month_num = outline_month["month"]
+    week_lines = "\n".join(f"    Week {w['week']}: {w['focus']}" for w in outline_month["weeks"])
+    template = prompts.for_request(req).month
+    fields = {
+        "month": month_num, "month_title": outline_month["month_title"], "week_lines": week_lines,
+        "profile": prompts.learner_profile(req)
+    }
+
+    async with semaphore:
+        for attempt in range(ROADMAP_MONTH_RETRIES):
+            try:
+                month = await request_roadmap_json(template, **fields)
+                # Some completions wrap the month in a roadmap array
+                if "roadmap" in month and month["roadmap"]:
+                    month = month["roadmap"][0]
+                month["month"] = month_num
+                month.setdefault("month_title", outline_month["month_title"])
+                for week_num, week in enumerate(month.get("weeks", []), 1):
+                    week["week"] = week_num
+                    week["week_number"] = week_num
+                    if week_num <= len(outline_month["weeks"]):
+                        week.setdefault("focus", outline_month["weeks"][week_num - 1]["focus"])
+                    for day_num, task in enumerate(week.get("daily_tasks", []), 1):
+                        task.setdefault("day", day_num)
+
+                # Patch broken weeks before giving up on the whole month
+                defects = find_month_defects(month, month_num)
+                template.record_validation(not defects)
+                if defects:
+                    for defect in defects:
+                        metrics.ROADMAP_DEFECTS.inc(kind=defect["kind"])
+                    await repair_month(req, month, defects)
+
+                if validate_month(month):
+                    return month
+                logger.warning("Invalid month structure, retrying", extra={"month": month_num, "attempt": attempt + 1})
+            except Exception as e:
+                logger.warning("Month expansion failed", extra={"month": month_num, "attempt": attempt + 1, "error": str(e)})
+                if resilience.is_upstream_failure(e):
+                    raise
+    raise ValueError(f"Failed to generate month {month_num} after {ROADMAP_MONTH_RETRIES} attempts")
+
+async def llm_generate_roadmap_per_month(req: FullPipelineReq) -> dict:
+    """Generate a roadmap as an outline plus concurrently expanded months"""
+    if not GROQ_API_KEY:
+        raise HTTPException(500, "GROQ_API_KEY not configured")
+
+    expected_months = prompts.timeframe_months(req.timeframe)
+    logger.info("Generating per-month roadmap", extra={"goal": req.goal, "months": expected_months})
+
+    outline = await generate_roadmap_outline(req, expected_months)
+
+    semaphore = asyncio.Semaphore(ROADMAP_MONTH_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(expand_outline_month(req, outline_month, semaphore))
+        for outline_month in outline["roadmap"]
+    ]
+    try:
+        months = await asyncio.gather(*tasks)
+    except Exception:
+        # One month exhausted its retries; stop paying for the others
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return {"roadmap": list(months)}
+
 # DAILY TASK SYSTEM
 def get_current_daily_task(user_id: str) -> dict:
     """Get the current daily task for the user with motivation"""
 
-    roadmap = user_store.get(user_id)
-    if not roadmap:
+    index = user_store.get_task_index(user_id)
+    if index is None:
         return{}
     
-    progress = roadmap.get("progress", {})
-    current_month = progress.get("current_month", 1)
-    current_week = progress.get("current_week", 1)
-    current_day = progress.get("current_day", 1)
-
-    # find current task
-    for month in roadmap.get("roadmap", []):
-        if month["month"] == current_month:
-            for week in month["weeks"]:
-                if week["week"] == current_week:
-                    for task in week.get("daily_tasks", []):
-                        if task["day"] == current_day and not task.get("completed", False):
-
-                            #Generate motivational message
-                            motivation = generate_motivational_message(
-                                roadmap["goal"],
-                                task["title"],
-                                progress.get("total_tasks_completed",0)
-                            )
-
-                            return {
-                                "task_id": task["task_id"],
-                                "title": task["title"],
-                                "description": task["description"],
-                                "goal": task["goal"],
-                                "estimated_time": task["estimated_time"],
-                                "resources": task.get("resources", []),
-                                "week_focus": week["focus"],
-                                "motivation_message": motivation,
-                                "progress": {
-                                    "current_day": current_day,
-                                    "current_week": current_week,
-                                    "current_month": current_month,
-                                    "total_completed": progress.get("total_tasks_completed", 0)
-                                }
-                            }
+    progress = index.progress
+    pos = index.current()
+    if pos is not None:
+        task = index.task_at(pos)
+        week = index.week_at(pos)
+
+        #Generate motivational message
+        motivation = generate_motivational_message(
+            index.meta.get("goal", ""),
+            task["title"],
+            progress.get("total_tasks_completed",0)
+        )
+
+        return {
+            "task_id": task["task_id"],
+            "title": task["title"],
+            "description": task["description"],
+            "goal": task.get("goal", index.meta.get("goal", "")),
+            "estimated_time": task["estimated_time"],
+            "resources": task.get("resources", []),
+            "week_focus": week["focus"],
+            "motivation_message": motivation,
+            "progress": {
+                "current_day": progress.get("current_day", 1),
+                "current_week": progress.get("current_week", 1),
+                "current_month": progress.get("current_month", 1),
+                "total_completed": progress.get("total_tasks_completed", 0)
+            }
+        }
     return {"message": "All tasks completed! 🎉"}
 
 def generate_motivational_message(goal: str, task_title: str, completed_task: int) -> str:
@@ -492,85 +879,56 @@ def generate_motivational_message(goal: str, task_title: str, completed_task: in
 def mark_task_completed(user_id: str, task_id: str) -> dict:
     """Mark current task as completed and move to next"""
 
-    roadmap = user_store.get(user_id)
-    if not roadmap:
+    index = user_store.get_task_index(user_id)
+    if index is None:
         return{"error": "User not found"}
     
     # Find and mark task as completed
-    task_found = False
-    for month in roadmap.get("roadmap", []):
-        for week in month["weeks"]:
-            for task in week.get("daily_tasks", []):
-                if task["task_id"] == task_id:
-                    task["completed"] = True
-                    task["completed_date"] = datetime.now().isoformat()
-                    task_found = True
-
-                    #Update progress
-                    progress = roadmap.get("progress", {})
-                    progress["total_tasks_completed"] = progress.get("total_tasks_completed", 0) + 1
-
-                    #Move to next day
-                    advance_to_next_task(roadmap)
-
-                    return {
-                        "status": "success",
-                        "message": "Task completed! 🎉",
-                        "completed_task": task["title"],
-                        "total_completed": progress["total_tasks_completed"]
-                    }
-    if not task_found:
+    pos = index.position_of(task_id)
+    if pos is None:
         return{"error": "Task not found"}
+
+    index.mark_completed(pos, datetime.now().isoformat())
+
+    #Move to next day
+    advance_to_next_task(index)
+
+    return {
+        "status": "success",
+        "message": "Task completed! 🎉",
+        "completed_task": index.task_at(pos)["title"],
+        "total_completed": index.progress["total_tasks_completed"]
+    }
     
-def advance_to_next_task(roadmap: dict):
+def advance_to_next_task(index: TaskIndex):
     """Move user to the next task/week/month"""
+    # The index keeps a "next incomplete" cursor, so this doesn't rescan the roadmap
+    index.advance()
 
-    progress = roadmap.get("progress", {})
-    current_month = progress.get("current_month", 1)
-    current_week = progress.get("current_week", 1)
-    current_day = progress.get("current_day", 1)
-
-    #find next incomplete task
-    for month in roadmap.get("roadmap", []):
-        if month["month"] >= current_month:
-            for week in month['weeks']:
-                if (month["month"] > current_month) or (week["week"] >= current_week):
-                    for task in week.get("daily_tasks", []):
-                        if ((month["month"] > current_month) or (week["week"] > current_week) or (task["day"] > current_day)) and not task.get("completed", False):
-
-                            progress["current_month"] = month["month"]
-                            progress["current_week"] = week["week"]
-                            progress["current_day"] = task["day"]
-                            return
-    #If no more tasks, mark as completed
-    progress["current_day"] = -1  #to indicate completion
+    # Near the end of a week, warm the video cache for the next one
+    pos = index.current()
+    if pos is not None and index.progress.get("current_day", 1) >= VIDEO_PREFETCH_FROM_DAY:
+        prefetch_next_week_videos(index, pos)
 
 # YOUTUBE VIDEO RECOMMENDATION
 def get_current_week_videos(user_id: str) -> dict:
     """Get Youtube videos for current week's focus"""
 
-    roadmap = user_store.get(user_id)
-    if not roadmap:
+    index = user_store.get_task_index(user_id)
+    if index is None:
         return{"error": "User not found"}
     
-    progress = roadmap.get("progress", {})
+    progress = index.progress
     current_month = progress.get("current_month", 1)
     current_week = progress.get("current_week", 1)
 
     # Find and extract current week focus
-
-    current_week_focus = None
-    for month in roadmap.get("roadmap", []):
-        if month["month"] == current_month:
-            for week in month["weeks"]:
-                if week["week"] == current_week:
-                    current_week_focus = week["focus"]
-                    break
+    current_week_focus = index.week_focus(current_month, current_week)
 
     if not current_week_focus:
         return {"error": "Current week not found"}
     
-    videos = search_youtube_videos(current_week_focus)
+    videos = search_youtube_videos(current_week_focus, target_role=index.meta.get("target_role", ""))
 
     return {
         "week_focus": current_week_focus,
@@ -579,20 +937,42 @@ def get_current_week_videos(user_id: str) -> dict:
         "total_videos": len(videos)
     }
 
-def search_youtube_videos(query: str, req: FullPipelineReq, max_results: int = 8) -> list:
+def search_youtube_videos(query: str, req: Optional[FullPipelineReq] = None, max_results: int = 8, target_role: str = "") -> list:
     """Search Youtube for target role videos"""
 
     if not YOUTUBE_API_KEY:
-        print("No Youtube API key - returning sample videos")
+        logger.info("No YouTube API key, returning sample videos")
         return get_sample_videos(query)
     
+    key, fetch = week_video_lookup(query, req.target_role if req else target_role, max_results)
+    videos = video_cache.get_or_fetch(key, fetch)
+    return videos if videos is not None else get_sample_videos(query)
+
+def week_video_lookup(query: str, target_role: str, max_results: int = 8) -> tuple:
+    """Cache key and fetch callable for one week's video search"""
+    enhanced_query = f"{query} {target_role} tutorial coding"
+    key = video_cache_key("week_videos", enhanced_query, max_results=max_results)
+    return key, lambda: fetch_youtube_videos(enhanced_query, max_results)
+
+def prefetch_next_week_videos(index: TaskIndex, pos: int):
+    """Queue the next week's video search on the cache's background workers"""
+    if not YOUTUBE_API_KEY:
+        return
+    if youtube_upstream.breaker.state == "open":
+        return
+    next_week = index.week_after(pos)
+    if not next_week or not next_week.get("focus"):
+        return
+    # Users sharing a focus share the cache key, so only one lookup is queued
+    video_cache.prefetch(*week_video_lookup(next_week["focus"], index.meta.get("target_role", "")))
+
+def fetch_youtube_videos(enhanced_query: str, max_results: int = 8) -> Optional[list]:
+    """Run the YouTube search + details calls; None if either fails"""
     try:
-        enhanced_query = f"{query} {req.target_role} tutorial coding"
-
         with httpx.Client(timeout=30.0) as client:
             #search videos
-            search_response = client.get(
-                "https://www.googleapis.com/youtube/v3/search",params={
+            search_response = youtube_upstream.call_sync(lambda: client.get(
+                f"{YOUTUBE_BASE_URL}/search",params={
                     "key": YOUTUBE_API_KEY,
                     "part": "snippet",
                     "q": enhanced_query,
@@ -601,28 +981,28 @@ def search_youtube_videos(query: str, req: FullPipelineReq, max_results: int = 8
                     "order": "relevance",
                     "videoDuration": "medium"
                 }
-            )
+            ))
 
             if not search_response.is_success:
-                return get_sample_videos(query)
+                return None
             
             search_data = search_response.json()
             video_ids = [item["id"] ["videoId"] for item in search_data.get("items", [])]
 
             if not video_ids:
-                return get_sample_videos(query)
+                return None
             
             #Get video details
-            details_response = client.get(
-                "https://www.googleapis.com/youtube/v3/videos", params={
+            details_response = youtube_upstream.call_sync(lambda: client.get(
+                f"{YOUTUBE_BASE_URL}/videos", params={
                     "key": YOUTUBE_API_KEY,
                     "part": "snippet,contentDetails,statistics",
                     "id": ",".join(video_ids)
                 }
-            )
+            ))
 
             if not details_response.is_success:
-                return get_sample_videos(query)
+                return None
             
             details_data = details_response.json()
 
@@ -642,9 +1022,12 @@ def search_youtube_videos(query: str, req: FullPipelineReq, max_results: int = 8
             videos.sort(key=lambda x: int(x["views"]), reverse=True)
             return videos[:6]
     
+    except resilience.UpstreamUnavailable:
+        # Circuit open or too busy: straight to the fallback, nothing to log per call
+        return None
     except Exception as e:
-        print(f"Youtube API error: {e}")
-        return get_sample_videos(query)
+        logger.warning("YouTube API error", extra={"error": str(e)})
+        return None
 
 def get_sample_videos(query: str) -> list:
     """Return sample videos when Youtube API is not available"""
@@ -670,21 +1053,18 @@ def get_sample_videos(query: str) -> list:
     ]
 
 # CHATBOT SYSTEM
-def get_ai_chat_response(user_id: str, message: str, req:FullPipelineReq) -> dict:
-    """Generate AI chat response based on user's roadmap context"""
+def build_chat_messages(user_id: str, message: str, req: Optional[FullPipelineReq] = None) -> Optional[list]:
+    """System prompt, recent history and the new message for a chat completion; None if the user is unknown"""
 
-    roadmap = user_store.get(user_id)
-    if not roadmap:
-        return {"error": "User not found"}
+    index = user_store.get_task_index(user_id)
+    if index is None:
+        return None
     
     # Get user context
-    user_goal = roadmap.get("goal", "career goal")
-    current_progress = roadmap.get("progress", {})
+    user_goal = index.meta.get("goal", "career goal")
+    current_progress = index.progress
     total_completed = current_progress.get("total_task_completed", 0)
-
-    # Get chat history
-    if user_id not in chat_history:
-        chat_history[user_id] = []
+    target_role = req.target_role if req else index.meta.get("target_role", "")
 
     #Build AIs context-aware prompt
     system_prompt = f"""You are Navi, a helpful career mentor AI assitant
@@ -692,10 +1072,10 @@ def get_ai_chat_response(user_id: str, message: str, req:FullPipelineReq) -> dic
     Context about the user:
     - Career Goal: {user_goal}
     - Tasks Completed: {total_completed}
-    - Learning Journey: Currently working on their {req.target_role} roadmap
+    - Learning Journey: Currently working on their {target_role} roadmap
     
     Your role:
-    1. Answer questions about {req.target_role}, career development, and learning
+    1. Answer questions about {target_role}, career development, and learning
     2. Provide encouragement and motivation
     3. Give practical advice based on their goal
     4. Keep responses conversational and supportive
@@ -708,91 +1088,209 @@ def get_ai_chat_response(user_id: str, message: str, req:FullPipelineReq) -> dic
     - Reference their goal when relevant
     """
     
-    # Prepare conversation history
-    messages = [{"role": "system", "content": system_prompt}]
-
-    # Add recent chat history (last  6 messages to stay within token limits)
-    recent_history = chat_history[user_id][-6:]
-    for chat in recent_history:
-        messages.append({"role": "user", "content": chat["user"]})
-        messages.append({"role": "assistant", "content": chat["assistant"]})
-
-    # Add current message
-    messages.append({"role": "user", "content": message})
-
+    # Rolling summary of older turns plus as many recent turns as fit the prompt budget
+    messages = chat_context.build_context(
+        system_prompt,
+        user_store.get_chat_history(user_id),
+        message,
+        summary=user_store.get_chat_summary(user_id)
+    )
+    metrics.CHAT_PROMPT_TOKENS.observe(chat_context.prompt_tokens(messages))
+    return messages
+
+def chat_cache_partition(user_id: str, req: Optional[FullPipelineReq] = None) -> Optional[tuple]:
+    """Answer cache partition (goal, target_role) for a user; None if the user is unknown"""
+    index = user_store.get_task_index(user_id)
+    if index is None:
+        return None
+    target_role = req.target_role if req else index.meta.get("target_role", "")
+    return answer_cache.partition(index.meta.get("goal", ""), target_role)
+
+async def save_chat_turn(user_id: str, message: str, ai_response: str):
+    # Store in chat history, keeping only the last 20 conversations
+    await asyncio.to_thread(user_store.append_chat, user_id, {
+        "user": message,
+        "assistant": ai_response,
+        "timestamp": datetime.now().isoformat()
+    }, keep=20)
+    schedule_chat_summary(user_id)
+
+# Users whose summary is being updated, and the tasks doing it (kept so they aren't garbage collected)
+_summarizing: set[str] = set()
+_summary_tasks: set[asyncio.Task] = set()
+
+def schedule_chat_summary(user_id: str):
+    """Fold older turns into the user's rolling summary in the background, one update per user at a time"""
+    if user_id in _summarizing:
+        return
+    # Whether there is anything to fold is checked by the task, off the event loop
+    _summarizing.add(user_id)
+    task = asyncio.get_running_loop().create_task(update_chat_summary(user_id))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+
+async def update_chat_summary(user_id: str):
     try:
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(
-                f"{GROQ_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "openai/gpt-oss-120b",
-                    "messages": messages,
-                    "temperature": 1,
-                    "max_tokens": 8192
-                }
-            )
-        response.raise_for_status()
-        ai_response = response.json()["choices"][0]["message"]["content"]
+        summary = await asyncio.to_thread(user_store.get_chat_summary, user_id)
+        history = await asyncio.to_thread(user_store.get_chat_history, user_id)
+        turns = chat_context.turns_to_summarize(history, summary)
+        if not turns:
+            return
+        response_data = await groq_client.chat_completion(
+            {
+                "model": groq_client.GROQ_MODEL,
+                "messages": chat_context.summary_messages(summary, turns),
+                "temperature": 0.3,
+                "max_tokens": 1024
+            },
+            timeout=60.0,
+            priority="batch",
+            key=user_id
+        )
+        text = (response_data["choices"][0]["message"]["content"] or "").strip()
+        if text:
+            await asyncio.to_thread(user_store.set_chat_summary, user_id, text, turns[-1]["timestamp"])
+    except Exception as e:
+        logger.warning("Chat summary failed", extra={"user_id": user_id, "error": str(e)})
+    finally:
+        _summarizing.discard(user_id)
+
+async def get_ai_chat_response(user_id: str, message: str, req: Optional[FullPipelineReq] = None) -> dict:
+    """Generate AI chat response based on user's roadmap context"""
 
-        # Store in chat history 
-        chat_history[user_id].append({
-            "user": message,
-            "assistant": ai_response,
+    partition = await asyncio.to_thread(chat_cache_partition, user_id, req)
+    if partition is None:
+        return {"error": "User not found"}
+    cached = answer_cache.lookup(partition, message)
+    if cached is not None:
+        await save_chat_turn(user_id, message, cached)
+        return {
+            "response": cached,
             "timestamp": datetime.now().isoformat()
-        })
+        }
+
+    messages = await asyncio.to_thread(build_chat_messages, user_id, message, req)
+    if messages is None:
+        return {"error": "User not found"}
 
-        #Let's keep only the last 20 conversations to manage memory
-        if len(chat_history[user_id]) > 20:
-            chat_history[user_id] = chat_history[user_id][-20:]
+    try:
+        response_data = await groq_client.chat_completion(
+            {
+                "model": groq_client.GROQ_MODEL,
+                "messages": messages,
+                "temperature": 1,
+                "max_tokens": 8192
+            },
+            timeout=60.0,
+            priority="interactive",
+            key=user_id
+        )
+        ai_response = response_data["choices"][0]["message"]["content"]
+        await save_chat_turn(user_id, message, ai_response)
+        answer_cache.store(partition, message, ai_response)
         
         return {
             "response": ai_response,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
-        print(f"Chat error: {e}")
+        logger.error("Chat failed", extra={"user_id": user_id, "error": str(e)})
         return {
             "response": "I'm having trouble connecting right now. Please try again in a moment!",
             "timestamp": datetime.now().isoformat()
         }
 
 
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+async def cached_chat_events(user_id: str, message: str, answer: str):
+    """SSE events for an answer from the answer cache: the whole reply as one token"""
+    await save_chat_turn(user_id, message, answer)
+    yield _sse({"type": "token", "content": answer})
+    yield _sse({"type": "done", "response": answer, "timestamp": datetime.now().isoformat()})
+
+async def stream_chat_events(user_id: str, message: str, messages: list, partition: Optional[tuple] = None):
+    """Yield SSE events with each token of the reply as Groq streams it.
+
+    The turn is saved only after the stream completes. If the client goes away,
+    the response task is cancelled and closing the upstream generator aborts the
+    Groq request.
+    """
+    started = time.perf_counter()
+    parts = []
+    upstream = groq_client.stream_chat_completion(
+        {
+            "model": groq_client.GROQ_MODEL,
+            "messages": messages,
+            "temperature": 1,
+            "max_tokens": 8192
+        },
+        timeout=60.0,
+        priority="interactive",
+        key=user_id
+    )
+    try:
+        async for chunk in upstream:
+            text = groq_client.delta_text(chunk)
+            if not text:
+                continue
+            if not parts:
+                metrics.CHAT_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+            parts.append(text)
+            yield _sse({"type": "token", "content": text})
+    except Exception as e:
+        logger.error("Chat stream failed", extra={"user_id": user_id, "error": str(e)})
+        yield _sse({"type": "error", "detail": "I'm having trouble connecting right now. Please try again in a moment!"})
+        return
+    finally:
+        await upstream.aclose()
+
+    ai_response = "".join(parts)
+    await save_chat_turn(user_id, message, ai_response)
+    if partition is not None:
+        answer_cache.store(partition, message, ai_response)
+    yield _sse({"type": "done", "response": ai_response, "timestamp": datetime.now().isoformat()})
+
+
 # API Endpoints
 
-@app.post("/api/generate_roadmap")
-def api_generate_roadmap(req: FullPipelineReq):
+async def generate_roadmap_template(req: FullPipelineReq) -> dict:
+    """Generate roadmap with validation (or reuse the template of an identical profile)"""
+    return await roadmap_cache.get_or_generate(
+        req, llm_generate_roadmap,
+        cacheable=lambda template: is_complete_roadmap(template, req)
+    )
+
+def create_user_roadmap(req: FullPipelineReq, template: dict) -> tuple[str, dict]:
+    """Personalise a roadmap template and store it for a new user"""
+    roadmap = template
+
+    # Add user data to roadmap
+    roadmap.update({
+        "goal": req.goal,
+        "target_role": req.target_role,
+        "timeframe": req.timeframe,
+        "learning_style": req.learning_style,
+        "learning_speed": req.learning_speed,
+        "skill_level": req.skill_level
+    })
+    
+    # Add IDs and metadata
+    roadmap = enhance_roadmap_structure(roadmap)
+    
+    # Store for user
+    user_id = str(uuid4())
+    with metrics.ROADMAP_STAGE_SECONDS.time(stage="store"):
+        user_store.create_user(user_id, roadmap)
+    return user_id, roadmap
+
+@router.post("/api/generate_roadmap")
+async def api_generate_roadmap(req: FullPipelineReq):
     """Generate initial roadmap"""
     try:
-        # Generate roadmap with validation
-        roadmap = llm_generate_roadmap(req)
-
-        timeframe_map = {
-            "3_months": 3,
-            "6_months": 6,
-            "1_year": 12,
-            "not_sure": 3  # Make sure it's consistent
-        }
-        
-        # Add user data to roadmap
-        roadmap.update({
-            "goal": req.goal,
-            "target_role": req.target_role,
-            "timeframe": req.timeframe,
-            "learning_style": req.learning_style,
-            "learning_speed": req.learning_speed,
-            "skill_level": req.skill_level
-        })
-        
-        # Add IDs and metadata
-        roadmap = enhance_roadmap_structure(roadmap)
-        
-        # Store for user
-        user_id = str(uuid4())
-        user_store[user_id] = roadmap
+        template = await generate_roadmap_template(req)
+        user_id, roadmap = await asyncio.to_thread(create_user_roadmap, req, template)
 
         return {
             "success": True,
@@ -801,16 +1299,188 @@ def api_generate_roadmap(req: FullPipelineReq):
             "message": "Roadmap generated successfully!"
         }
     except Exception as e:
-        print(f"Roadmap generation failed: {str(e)}")
+        logger.exception("Roadmap generation failed")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate roadmap: {str(e)}"
         )
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+async def stream_roadmap_events(req: FullPipelineReq):
+    """Yield NDJSON events for each validated month as the LLM streams the roadmap"""
+    expected_months = prompts.timeframe_months(req.timeframe)
+    template = prompts.for_request(req).roadmap
+
+    parser = RoadmapStreamParser()
+    months: dict[int, dict] = {}
+    cached = await roadmap_cache.peek(req)
+    try:
+        if cached is not None:
+            # Identical profile generated before: replay the template
+            metrics.ROADMAP_CACHE_REQUESTS.inc(result="hit")
+            for month in cached["roadmap"]:
+                enhance_roadmap_structure({"roadmap": [month]})
+                months[month["month"]] = month
+                yield _ndjson({"type": "month", "month": month})
+        else:
+            metrics.ROADMAP_CACHE_REQUESTS.inc(result="miss")
+            async for chunk in groq_client.stream_chat_completion(
+                template.render(months=expected_months, profile=prompts.learner_profile(req)),
+                timeout=120.0
+            ):
+                for month in parser.feed(groq_client.delta_text(chunk)):
+                    month_num = month.get("month")
+                    if month_num not in range(1, expected_months + 1) or month_num in months or not validate_month(month):
+                        yield _ndjson({"type": "month_rejected", "month": month_num})
+                        continue
+                    # Same IDs enhance_roadmap_structure assigns to the full roadmap later
+                    enhance_roadmap_structure({"roadmap": [month]})
+                    months[month_num] = month
+                    yield _ndjson({"type": "month", "month": month})
+    except Exception as e:
+        logger.exception("Roadmap stream failed")
+        yield _ndjson({"type": "error", "detail": f"Failed to generate roadmap: {str(e)}"})
+        return
+
+    # Fill anything the model skipped or got wrong so the stored roadmap is complete
+    prompt_version = cached.get("prompt_version") if cached is not None else template.version
+    roadmap = {"roadmap": [months[n] for n in sorted(months)], "prompt_version": prompt_version}
+    filled_months = [n for n in range(1, expected_months + 1) if n not in months]
+    if cached is None and not filled_months:
+        await roadmap_cache.put(req, roadmap)
+    if filled_months:
+        normalize_roadmap_structure(roadmap, months=expected_months)
+        for month in roadmap["roadmap"]:
+            if month["month"] in filled_months:
+                enhance_roadmap_structure({"roadmap": [month]})
+                yield _ndjson({"type": "month", "month": month, "filled": True})
+
+    roadmap.update({
+        "goal": req.goal,
+        "target_role": req.target_role,
+        "timeframe": req.timeframe,
+        "learning_style": req.learning_style,
+        "learning_speed": req.learning_speed,
+        "skill_level": req.skill_level
+    })
+    roadmap = enhance_roadmap_structure(roadmap)
+
+    user_id = str(uuid4())
+    with metrics.ROADMAP_STAGE_SECONDS.time(stage="store"):
+        await asyncio.to_thread(user_store.create_user, user_id, roadmap)
+
+    yield _ndjson({
+        "type": "done",
+        "user_id": user_id,
+        "goal": roadmap["goal"],
+        "target_role": roadmap["target_role"],
+        "timeframe": roadmap["timeframe"],
+        "learning_style": roadmap["learning_style"],
+        "learning_speed": roadmap["learning_speed"],
+        "skill_level": roadmap["skill_level"],
+        "progress": roadmap["progress"],
+        "filled_months": filled_months,
+        "message": "Roadmap generated successfully!"
+    })
+
+@router.post("/api/generate_roadmap/stream")
+async def api_generate_roadmap_stream(req: FullPipelineReq):
+    """Generate a roadmap, streaming each month as NDJSON as soon as it is ready"""
+    if not GROQ_API_KEY:
+        raise HTTPException(500, "GROQ_API_KEY not configured")
+    return StreamingResponse(stream_roadmap_events(req), media_type="application/x-ndjson")
+
+async def run_roadmap_job(job: dict) -> tuple[str, dict]:
+    """Job handler: generate and store one roadmap, falling back only on the last attempt"""
+    req = FullPipelineReq(**job["payload"])
+    try:
+        with groq_scheduler.scheduling("roadmap", job["job_id"]):
+            template = await generate_roadmap_template(req)
+    except Exception as e:
+        if job["attempt"] < job["max_attempts"]:
+            raise
+        logger.error("All job attempts failed, using fallback roadmap", extra={"attempts": job["max_attempts"], "error": str(e)})
+        user_id, _ = await asyncio.to_thread(create_user_roadmap, req, create_fallback_roadmap(req))
+        return "failed", {"user_id": user_id, "fallback": True, "error": str(e)}
+
+    user_id, _ = await asyncio.to_thread(create_user_roadmap, req, template)
+    return "validated", {"user_id": user_id, "fallback": False}
+
+@router.post("/api/roadmap_jobs", status_code=202)
+async def api_create_roadmap_job(req: FullPipelineReq):
+    """Queue roadmap generation and return immediately; poll /api/jobs/{job_id}"""
+    if not GROQ_API_KEY:
+        raise HTTPException(500, "GROQ_API_KEY not configured")
+    queue = require_job_queue()
+    job_id = await asyncio.to_thread(queue.enqueue, "generate_roadmap", req.model_dump())
+    # The job logs under its job id; this line links it to the request that queued it
+    logger.info("Queued roadmap job", extra={"job_id": job_id})
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+
+@router.get("/api/jobs/{job_id}")
+def api_get_job(job_id: str):
+    """Status of a background job: queued, running (attempt N), validated or failed"""
+    job = require_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    job.pop("payload")
+
+    result = job["result"]
+    if result and result.get("user_id"):
+        # The roadmap lives in the user store; don't keep a second copy in the queue
+        job["roadmap"] = user_store.get_roadmap(result["user_id"])
+    return job
+
+# Cohort onboarding: identical profiles are generated once, under their own
+# concurrency limit and token budget so interactive requests keep priority
+batch_runner = BatchRunner(
+    generate_roadmap_template,
+    lambda req, template: create_user_roadmap(req, template)[0],
+    peek=roadmap_cache.peek,
+    # Status goes to the job database, so any worker process can answer /batch/{job_id}
+    publish=lambda snapshot: job_queue.save_batch(snapshot)
+)
+
+@router.post("/api/generate_roadmaps/batch", status_code=202)
+async def api_generate_roadmaps_batch(reqs: List[FullPipelineReq]):
+    """Queue roadmap generation for a whole cohort; poll the returned job for per-item status"""
+    if not GROQ_API_KEY:
+        raise HTTPException(500, "GROQ_API_KEY not configured")
+    if not reqs:
+        raise HTTPException(400, "No roadmap requests given")
+    if len(reqs) > BATCH_MAX_ITEMS:
+        raise HTTPException(400, f"At most {BATCH_MAX_ITEMS} roadmap requests per batch")
+    # Batch status is published to the job database
+    require_job_queue()
+
+    job = await batch_runner.submit(reqs)
+    logger.info("Queued roadmap batch", extra={"job_id": job.job_id, "total": len(reqs)})
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "total": len(reqs),
+        "unique_profiles": len(job.groups),
+        "status_url": f"/api/generate_roadmaps/batch/{job.job_id}"
+    }
+
+@router.get("/api/generate_roadmaps/batch/{job_id}")
+def api_get_batch_job(job_id: str):
+    """Per-item status of a batch roadmap job"""
+    job = batch_runner.get(job_id)
+    if job is not None:
+        return job.snapshot()
+    # Running in another worker process (or finished before a restart)
+    snapshot = require_job_queue().get_batch(job_id)
+    if snapshot is None:
+        raise HTTPException(404, "Batch job not found")
+    return snapshot
     
-@app.get("/api/daily_task/{user_id}")
+@router.get("/api/daily_task/{user_id}")
 def api_get_daily_task(user_id:str):
     """Get current daily task with motivation"""
-    if user_id not in user_store:
+    if not user_store.has_user(user_id):
         raise HTTPException(404, "User not found")
     
     task = get_current_daily_task(user_id)
@@ -819,19 +1489,19 @@ def api_get_daily_task(user_id:str):
     
     return task
 
-@app.post("/api/complete_task/{user_id}")
+@router.post("/api/complete_task/{user_id}")
 def api_complete_task(user_id:str, completion: TaskCompletion):
     """Mark current task as completed"""
-    if user_id not in user_store:
+    if not user_store.has_user(user_id):
         raise HTTPException(404, "user not found")
     
     # Get current task ID
-
-    current_task = get_current_daily_task(user_id)
-    if not current_task or "task_id" not in current_task:
+    index = user_store.get_task_index(user_id)
+    pos = index.current() if index is not None else None
+    if pos is None:
         raise HTTPException(404, "No current task to complete")
     
-    result = mark_task_completed(user_id, current_task["task_id"])
+    result = mark_task_completed(user_id, index.task_at(pos)["task_id"])
     
     if "error" in result: 
         raise HTTPException(400, result["error"])
@@ -839,10 +1509,10 @@ def api_complete_task(user_id:str, completion: TaskCompletion):
     return result
 
 
-@app.get("/api/week_videos/{user_id}")
+@router.get("/api/week_videos/{user_id}")
 def api_get_week_videos(user_id: str):
     """Get Youtube videos for current week"""
-    if user_id not in user_store:
+    if not user_store.has_user(user_id):
         raise HTTPException(404, "user not found")
     
     videos = get_current_week_videos(user_id)
@@ -852,39 +1522,53 @@ def api_get_week_videos(user_id: str):
     
     return videos
 
-@app.post("/api/chat/{user_id}")
+@router.post("/api/chat/{user_id}")
 async def api_chat(user_id: str, chat_msg: ChatMessage):
     """Chat with AI assistant"""
-    if user_id not in user_store:
+    if not await asyncio.to_thread(user_store.has_user, user_id):
         raise HTTPException(404, "User not found")
     
-    response = get_ai_chat_response(user_id, chat_msg.message, None)  # Added None as req parameter
+    response = await get_ai_chat_response(user_id, chat_msg.message)
     if "error" in response:
         raise HTTPException(400, response["error"])
     
     return response
 
-@app.get("/api/user_progress/{user_id}")
+@router.post("/api/chat/{user_id}/stream")
+async def api_chat_stream(user_id: str, chat_msg: ChatMessage):
+    """Chat with AI assistant, streaming the reply token by token as server-sent events"""
+    partition = await asyncio.to_thread(chat_cache_partition, user_id)
+    if partition is None:
+        raise HTTPException(404, "User not found")
+    cached = answer_cache.lookup(partition, chat_msg.message)
+    if cached is not None:
+        events = cached_chat_events(user_id, chat_msg.message, cached)
+    else:
+        messages = await asyncio.to_thread(build_chat_messages, user_id, chat_msg.message)
+        events = stream_chat_events(user_id, chat_msg.message, messages, partition)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/api/user_progress/{user_id}")
 def api_get_user_progress(user_id: str):
     """Get user's overall progress"""
-    if user_id not in user_store:
+    if not user_store.has_user(user_id):
         raise HTTPException(404, "User not found")
     
-    roadmap = user_store[user_id]
-    progress = roadmap.get("progress", {})
+    index = user_store.get_task_index(user_id)
+    progress = index.progress
 
-    # Calculate completion percentage
-    total_tasks = 0
+    # Calculate completion percentage from the index's cached totals
+    total_tasks = index.total
     completed_tasks = progress.get("total_tasks_completed", 0)
-
-    for month in roadmap.get("roadmap", []):
-        for week in month["weeks"]:
-            total_tasks += len(week.get("daily_tasks", []))
     
     completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
 
     return {
-        "goal": roadmap.get("goal", ""),
+        "goal": index.meta.get("goal", ""),
         "total_tasks": total_tasks,
         "completed_tasks": completed_tasks,
         "completion_percentage": round(completion_percentage, 1),
@@ -895,22 +1579,73 @@ def api_get_user_progress(user_id: str):
     }
 
 
-@app.get("/api/health")
+@router.get("/api/health")
 def health_check():
+    # 503 until the lifespan has opened the job queue, so load balancers wait for it
+    jobs = require_job_queue().counts()
     return {
         "status": "healthy",
-        "active_users": len(user_store),
+        "active_users": user_store.count_users(),
         "groq_configured": bool(GROQ_API_KEY),
-        "youtube_configured": bool(YOUTUBE_API_KEY)
+        "youtube_configured": bool(YOUTUBE_API_KEY),
+        "roadmap_cache": roadmap_cache.stats(),
+        "video_cache": video_cache.stats(),
+        "batch": batch_runner.stats(),
+        "jobs": jobs,
+        "upstreams": resilience.stats(),
+        "groq_scheduler": groq_scheduler.scheduler.stats(),
+        "prompts": prompts.stats(),
+        "generation": {
+            "tokens_per_roadmap": metrics.ROADMAP_TOKENS.snapshot(),
+            "seconds_per_roadmap": metrics.ROADMAP_SECONDS.snapshot(),
+            "stage_seconds": metrics.ROADMAP_STAGE_SECONDS.snapshot(),
+            "defects": metrics.ROADMAP_DEFECTS.snapshot(),
+            "repairs": metrics.ROADMAP_REPAIRS.snapshot(),
+            "regenerations": metrics.ROADMAP_REGENERATIONS.value(),
+            "continuations": metrics.ROADMAP_CONTINUATIONS.value()
+        },
+        "chat": {
+            "first_token_seconds": metrics.CHAT_FIRST_TOKEN_SECONDS.snapshot(),
+            "prompt_tokens": metrics.CHAT_PROMPT_TOKENS.snapshot(),
+            "answer_cache": answer_cache.stats()
+        }
     }
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Every metric in the Prometheus text format, for scraping"""
+    if metrics.SERVE_WORKER_PROCESSES > 1:
+        raise HTTPException(503, "Metrics are kept per worker process; scrape /metrics with SERVE_WORKERS=1")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 #  Legacy endpoint for compatibility
-@app.post("/api/full_pipeline")
-def api_full_pipeline(req: FullPipelineReq):
+@router.post("/api/full_pipeline")
+async def api_full_pipeline(req: FullPipelineReq):
     """Legacy endpoint - redirects to new generate_roadmap"""
-    return api_generate_roadmap(req)
+    return await api_generate_roadmap(req)
+
+
+def create_app() -> FastAPI:
+    """The one ASGI app: roadmap, chat and job endpoints plus the recommender's video search"""
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
+    )
+    app.add_middleware(RequestIdMiddleware)
+    app.include_router(router)
+    app.include_router(recommender.router)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("agent_orchestra:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    # Same as python serve.py: one process unless SERVE_WORKERS says otherwise
+    import serve
+    serve.main()
\ No newline at end of file
@@ -0,0 +1,175 @@
+# backend/answer_cache.py
+import os
+import re
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+import metrics
+
+CHAT_ANSWER_CACHE = os.getenv("CHAT_ANSWER_CACHE", "0") == "1"  # opt-in
+CHAT_ANSWER_CACHE_THRESHOLD = float(os.getenv("CHAT_ANSWER_CACHE_THRESHOLD", "0.85"))
+CHAT_ANSWER_CACHE_TTL = float(os.getenv("CHAT_ANSWER_CACHE_TTL", str(24 * 3600)))
+CHAT_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_ANSWER_CACHE_MAX_ENTRIES", "200"))  # per goal/target_role
+CHAT_ANSWER_CACHE_MAX_TOTAL = int(os.getenv("CHAT_ANSWER_CACHE_MAX_TOTAL", "10000"))  # across all of them
+
+# Questions about the user's own state, and answers that reference it, are never shared
+_PERSONAL_QUESTION = re.compile(
+    r"\b(my|mine)\s+(progress|roadmap|plan|tasks?|week|month|schedule|streak)\b"
+    r"|\bhow\s+am\s+i\s+doing\b|\bwhat('s| is)?\s+(my\s+)?next\b|\bhave\s+i\b|\bdid\s+i\b",
+    re.IGNORECASE
+)
+# Follow-ups that only make sense with the earlier conversation
+_FOLLOW_UP = re.compile(
+    r"^(and|but|so|also|what about|how about)\b|\b(that|this|those|these|it|above|again|earlier|you said)\b",
+    re.IGNORECASE
+)
+_PERSONAL_ANSWER = re.compile(
+    r"\byou('ve| have)\s+(already\s+)?(completed|finished|done)\b"
+    r"|\b\d+\s+tasks?\b|\btasks?\s+completed\b|\byour\s+(progress|roadmap|current\s+(week|month|task))\b",
+    re.IGNORECASE
+)
+
+
+# Function words that don't change what a question is about ("how do I" vs "how can I")
+_STOP_WORDS = frozenset(
+    "a an the i me im do does did can could should would will to how what which is are am be of for in on "
+    "with you it and or any some".split()
+)
+
+
+def normalize_message(message: str) -> str:
+    """Lowercased content words of a message, punctuation and function words dropped"""
+    words = re.sub(r"[^\w\s]", " ", message.lower()).split()
+    return " ".join(word for word in words if word not in _STOP_WORDS)
+
+
+def _features(text: str) -> tuple[Counter, float]:
+    """Whole words plus character trigrams inside each word (to absorb typos and plurals), and the vector norm"""
+    features: Counter = Counter()
+    for word in text.split():
+        features["w:" + word] += 1
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[padded[i:i + 3]] += 1
+    return features, math.sqrt(sum(count * count for count in features.values()))
+
+
+def _cosine(a: Counter, a_norm: float, b: Counter, b_norm: float) -> float:
+    if not a_norm or not b_norm:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(gram, 0) for gram, count in a.items()) / (a_norm * b_norm)
+
+
+def is_shareable(message: str, answer: str = "") -> bool:
+    """Whether a question (and its answer) is generic enough to serve to other users"""
+    if not normalize_message(message) or _PERSONAL_QUESTION.search(message) or _FOLLOW_UP.search(message):
+        return False
+    return not (answer and _PERSONAL_ANSWER.search(answer))
+
+
+class ChatAnswerCache:
+    """Answers to generic chat questions, shared by users with the same goal/target_role.
+
+    Questions match on cosine similarity of word and character trigram counts over
+    the normalized text, so rephrasings like "how do i stay motivated?" and "How
+    can I stay motivated" hit the same entry.
+
+    Each partition keeps its max_entries most recently used questions. Over
+    max_total entries in all, the least recently used partitions give up their
+    oldest entries, and partitions left empty are dropped.
+    """
+
+    def __init__(self, enabled: bool = True, threshold: float = CHAT_ANSWER_CACHE_THRESHOLD, ttl: float = CHAT_ANSWER_CACHE_TTL,
+                 max_entries: int = CHAT_ANSWER_CACHE_MAX_ENTRIES, max_total: int = CHAT_ANSWER_CACHE_MAX_TOTAL):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_total = max_total
+        # partition (least recently used first) -> normalized question -> (features, norm, answer, stored_at)
+        self._partitions: OrderedDict[tuple, OrderedDict] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def partition(goal: str, target_role: str) -> tuple:
+        return normalize_message(goal or ""), normalize_message(target_role or "")
+
+    def lookup(self, partition: tuple, message: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        if not is_shareable(message):
+            metrics.CHAT_ANSWER_CACHE_REQUESTS.inc(result="skipped")
+            return None
+
+        question = normalize_message(message)
+        features, norm = _features(question)
+        now = time.time()
+        best, best_score = None, 0.0
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is not None:
+                for key in [k for k, entry in entries.items() if now - entry[3] > self.ttl]:
+                    del entries[key]
+                    self._size -= 1
+                if not entries:
+                    del self._partitions[partition]
+                    entries = None
+                else:
+                    self._partitions.move_to_end(partition)
+            if entries:
+                for key, (entry_features, entry_norm, _, _) in entries.items():
+                    score = 1.0 if key == question else _cosine(features, norm, entry_features, entry_norm)
+                    if score > best_score:
+                        best, best_score = key, score
+                if best is not None and best_score >= self.threshold:
+                    entries.move_to_end(best)
+                    metrics.CHAT_ANSWER_CACHE_REQUESTS.inc(result="hit")
+                    return entries[best][2]
+        metrics.CHAT_ANSWER_CACHE_REQUESTS.inc(result="miss")
+        return None
+
+    def store(self, partition: tuple, message: str, answer: str) -> bool:
+        """Remember answer unless the question or answer is about the user's own progress"""
+        if not self.enabled or not answer or not is_shareable(message, answer):
+            return False
+        question = normalize_message(message)
+        features, norm = _features(question)
+        with self._lock:
+            entries = self._partitions.setdefault(partition, OrderedDict())
+            self._partitions.move_to_end(partition)
+            if question not in entries:
+                self._size += 1
+            entries[question] = (features, norm, answer, time.time())
+            entries.move_to_end(question)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._size -= 1
+            while self._size > self.max_total:
+                oldest_partition, oldest = next(iter(self._partitions.items()))
+                oldest.popitem(last=False)
+                self._size -= 1
+                if not oldest:
+                    del self._partitions[oldest_partition]
+        return True
+
+    def stats(self) -> dict:
+        hits = metrics.CHAT_ANSWER_CACHE_REQUESTS.value(result="hit")
+        lookups = hits + metrics.CHAT_ANSWER_CACHE_REQUESTS.value(result="miss")
+        return {
+            "enabled": self.enabled,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "partitions": len(self._partitions),
+            "entries": self._size,
+            "requests": metrics.CHAT_ANSWER_CACHE_REQUESTS.snapshot()
+        }
+
+
+def create_answer_cache() -> ChatAnswerCache:
+    """Build the cache configured by CHAT_ANSWER_CACHE_* environment variables (disabled unless CHAT_ANSWER_CACHE=1)"""
+    return ChatAnswerCache(enabled=CHAT_ANSWER_CACHE)
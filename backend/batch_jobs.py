@@ -0,0 +1,227 @@
+# backend/batch_jobs.py
+import os
+import copy
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+import groq_client
+import groq_scheduler
+import logs
+from roadmap_cache import cache_key
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_TOKENS_PER_MINUTE = int(os.getenv("BATCH_TOKENS_PER_MINUTE", "200000"))
+BATCH_TOKEN_ESTIMATE = int(os.getenv("BATCH_TOKEN_ESTIMATE", "20000"))  # until real usage is known
+BATCH_JOB_RETENTION = float(os.getenv("BATCH_JOB_RETENTION", "3600"))  # seconds after completion
+BATCH_PUBLISH_INTERVAL = float(os.getenv("BATCH_PUBLISH_INTERVAL", "1"))  # seconds between status publishes
+
+logger = logs.get_logger(__name__)
+
+
+class TokenBudget:
+    """Sliding one-minute token budget.
+
+    acquire() reserves an estimate and waits while the last minute's usage plus
+    the estimate would exceed the limit; settle() swaps in the real usage.
+    """
+
+    def __init__(self, tokens_per_minute: int, estimate: int = BATCH_TOKEN_ESTIMATE, window: float = 60.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.estimate = estimate
+        self.window = window
+        self._spent: deque = deque()  # [timestamp, tokens] entries
+        self._lock = asyncio.Lock()
+
+    def used(self) -> int:
+        cutoff = time.monotonic() - self.window
+        while self._spent and self._spent[0][0] < cutoff:
+            self._spent.popleft()
+        return sum(tokens for _, tokens in self._spent)
+
+    async def acquire(self) -> list:
+        async with self._lock:
+            while True:
+                used = self.used()
+                # An empty window always admits one call, even one larger than the limit
+                if not self._spent or used + self.estimate <= self.tokens_per_minute:
+                    entry = [time.monotonic(), self.estimate]
+                    self._spent.append(entry)
+                    return entry
+                await asyncio.sleep(max(0.05, self._spent[0][0] + self.window - time.monotonic()))
+
+    def settle(self, entry: list, tokens: int):
+        entry[1] = tokens
+        if tokens:
+            # Running estimate for the next reservations
+            self.estimate = int(0.8 * self.estimate + 0.2 * tokens)
+
+
+class BatchJob:
+    """One batch of roadmap requests and the status of each item"""
+
+    def __init__(self, reqs: list):
+        self.job_id = str(uuid4())
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.items = [
+            {"index": i, "status": "queued", "profile": None, "user_id": None, "error": None}
+            for i in range(len(reqs))
+        ]
+        # Identical profiles share one generation
+        self.groups: dict[str, list[int]] = {}
+        for i, req in enumerate(reqs):
+            self.groups.setdefault(cache_key(req), []).append(i)
+        for profile, indexes in enumerate(self.groups.values()):
+            for i in indexes:
+                self.items[i]["profile"] = profile
+        self.task: Optional[asyncio.Task] = None
+        self.published_at = 0.0
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is None:
+            return "running" if any(item["status"] != "queued" for item in self.items) else "queued"
+        return "failed" if all(item["status"] == "failed" for item in self.items) else "completed"
+
+    def snapshot(self) -> dict:
+        counts: dict[str, int] = {}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.items),
+            "unique_profiles": len(self.groups),
+            "counts": counts,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "items": self.items
+        }
+
+
+class BatchRunner:
+    """Runs batch jobs in the background under a concurrency limit and token budget.
+
+    generate(req) returns a roadmap template; create_user(req, template) stores a
+    personalised copy and returns the user id (it runs in a worker thread). publish(snapshot), if given, is
+    called with the job status as it changes (at most every BATCH_PUBLISH_INTERVAL
+    seconds), so other worker processes can serve status requests.
+    """
+
+    def __init__(self, generate: Callable[..., Awaitable[dict]], create_user: Callable[..., str],
+                 concurrency: int = BATCH_CONCURRENCY, tokens_per_minute: int = BATCH_TOKENS_PER_MINUTE,
+                 peek: Optional[Callable[..., Awaitable[Optional[dict]]]] = None,
+                 publish: Optional[Callable[[dict], None]] = None):
+        self.generate = generate
+        self.create_user = create_user
+        self.peek = peek
+        self.publish = publish
+        self.concurrency = concurrency
+        self.budget = TokenBudget(tokens_per_minute)
+        self.jobs: dict[str, BatchJob] = {}
+
+    async def submit(self, reqs: list) -> BatchJob:
+        self._purge()
+        job = BatchJob(reqs)
+        self.jobs[job.job_id] = job
+        if self.publish is not None:
+            # Before returning, so any worker can answer for the job straight away
+            await asyncio.to_thread(self.publish, job.snapshot())
+        job.task = asyncio.create_task(self._run(job, reqs))
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self.jobs.get(job_id)
+
+    def _purge(self):
+        cutoff = time.time() - BATCH_JOB_RETENTION
+        for job_id in [j for j, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _publish(self, job: BatchJob, force: bool = False):
+        now = time.monotonic()
+        if self.publish is None or (not force and now - job.published_at < BATCH_PUBLISH_INTERVAL):
+            return
+        job.published_at = now
+        try:
+            await asyncio.to_thread(self.publish, job.snapshot())
+        except Exception as e:
+            logger.warning("Batch status publish failed", extra={"job_id": job.job_id, "error": str(e)})
+
+    async def _run(self, job: BatchJob, reqs: list):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_group(indexes: list[int]):
+            async with semaphore:
+                for i in indexes:
+                    job.items[i]["status"] = "running"
+                try:
+                    with groq_scheduler.scheduling("batch", job.job_id):
+                        template = await self._generate(reqs[indexes[0]])
+                except Exception as e:
+                    logger.warning("Batch profile generation failed", extra={"job_id": job.job_id, "error": str(e)})
+                    for i in indexes:
+                        job.items[i].update({"status": "failed", "error": str(e)})
+                    return
+                for i in indexes:
+                    try:
+                        # The user store may be SQLite; keep its writes off the event loop
+                        user_id = await asyncio.to_thread(self.create_user, reqs[i], copy.deepcopy(template))
+                        job.items[i].update({"status": "done", "user_id": user_id})
+                    except Exception as e:
+                        job.items[i].update({"status": "failed", "error": str(e)})
+                await self._publish(job)
+
+        try:
+            with logs.request_context(job.job_id):
+                await asyncio.gather(*(run_group(indexes) for indexes in job.groups.values()))
+        except asyncio.CancelledError:
+            for item in job.items:
+                if item["status"] in ("queued", "running"):
+                    item.update({"status": "failed", "error": "Server shut down before this item finished"})
+            raise
+        finally:
+            job.finished_at = time.time()
+            if self.publish is not None:
+                # Not _publish: this also runs while the task is being cancelled
+                try:
+                    self.publish(job.snapshot())
+                except Exception as e:
+                    logger.warning("Batch status publish failed", extra={"job_id": job.job_id, "error": str(e)})
+
+    async def drain(self, timeout: float):
+        """Wait up to timeout seconds for running batches, then cancel the rest (server shutdown)"""
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.warning("Batch drain timed out, cancelling running batches", extra={"jobs": len(pending)})
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _generate(self, req) -> dict:
+        # Cached profiles cost no tokens, so they skip the budget
+        if self.peek is not None:
+            template = await self.peek(req)
+            if template is not None:
+                return template
+        entry = await self.budget.acquire()
+        with groq_client.track_usage() as usage:
+            try:
+                return await self.generate(req)
+            finally:
+                self.budget.settle(entry, usage["total_tokens"])
+
+    def stats(self) -> dict:
+        return {
+            "jobs": len(self.jobs),
+            "running": sum(1 for job in self.jobs.values() if job.finished_at is None),
+            "tokens_last_minute": self.budget.used(),
+            "tokens_per_minute": self.budget.tokens_per_minute
+        }
@@ -0,0 +1,87 @@
+# backend/bench_chat_context.py
+"""Estimated chat prompt size over a long conversation: last-6-turns vs budgeted context with summary.
+
+Usage: python bench_chat_context.py [turns] [budget]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+import chat_context
+
+SYSTEM_PROMPT = """You are Navi, a helpful career mentor AI assitant
+
+    Context about the user:
+    - Career Goal: Become a frontend developer
+    - Tasks Completed: 12
+    - Learning Journey: Currently working on their Frontend Developer roadmap
+
+    Your role:
+    1. Answer questions about Frontend Developer, career development, and learning
+    2. Provide encouragement and motivation
+    3. Give practical advice based on their goal
+    4. Keep responses conversational and supportive
+    5. If asked about progress, reference their completed tasks
+
+    Guidelines:
+    - Be encouraging and positive
+    - Provide practical, actionable advice
+    - Keep responses under 200 words unless more detail is needed
+    - Reference their goal when relevant
+    """
+
+WORDS = "react component state props hook effect render css layout flexbox grid async fetch api test deploy".split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def fake_summary(summary, turns) -> str:
+    """Stand-in for the LLM summary: previous summary plus a line per turn, capped at 150 words"""
+    words = ((summary or {}).get("summary", "") + " " + " ".join(t["user"] for t in turns)).split()
+    return " ".join(words[-150:])
+
+
+def legacy_messages(history: list, message: str) -> list:
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for chat in history[-6:]:
+        messages.append({"role": "user", "content": chat["user"]})
+        messages.append({"role": "assistant", "content": chat["assistant"]})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else chat_context.CHAT_PROMPT_BUDGET
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    history, summary = [], None
+    legacy_total = budgeted_total = 0
+
+    print(f"{'turn':>5} {'last-6':>8} {'budgeted':>9}")
+    for turn in range(1, turns + 1):
+        message = sentence(rng, rng.randint(8, 40))
+        legacy = chat_context.prompt_tokens(legacy_messages(history, message))
+        budgeted = chat_context.prompt_tokens(
+            chat_context.build_context(SYSTEM_PROMPT, history, message, summary=summary, budget=budget)
+        )
+        legacy_total += legacy
+        budgeted_total += budgeted
+        if turn in (1, 5, 10, 20, 50) or turn == turns:
+            print(f"{turn:>5} {legacy:>8} {budgeted:>9}")
+
+        # Replies are mostly ~150 words with the occasional long explanation
+        reply = sentence(rng, rng.choice([120, 150, 180, 600]))
+        history.append({"user": message, "assistant": reply, "timestamp": (start + timedelta(minutes=turn)).isoformat()})
+        history = history[-20:]
+        pending = chat_context.turns_to_summarize(history, summary)
+        if pending:
+            summary = {"summary": fake_summary(summary, pending), "covered_until": pending[-1]["timestamp"]}
+
+    print(f"total {legacy_total:>8} {budgeted_total:>9} ({budgeted_total / legacy_total:.0%})")
+
+
+if __name__ == "__main__":
+    main()
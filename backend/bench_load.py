@@ -0,0 +1,233 @@
+# backend/bench_load.py
+"""Offline load benchmark of the API against bench_upstream.py (no Groq or YouTube quota used).
+
+Starts the stand-in upstream and the API (serve.py with BENCH_WORKERS worker
+processes), runs each scenario and prints p50/p95/p99 latency and req/s as JSON. The stand-in is configured with
+its MOCK_* environment variables (latency, streaming speed, failure rates).
+The client-side Groq rate limiter is off unless GROQ_*_PER_MINUTE are set.
+With BENCH_BASELINE set to an earlier report, exits 1 when a scenario's p95
+got more than BENCH_TOLERANCE times slower or its error rate went up.
+
+Usage: python bench_load.py [requests] [concurrency] [scenario,...]
+Scenarios: generate, user_progress, daily_task, week_videos, search_videos, chat, complete_task
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_USERS = int(os.getenv("BENCH_USERS", "20"))  # users the per-user scenarios spread over
+BENCH_BASELINE = os.getenv("BENCH_BASELINE")  # earlier report to compare against
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "1.25"))
+BENCH_TIMEFRAME = os.getenv("BENCH_TIMEFRAME", "6_months")
+BENCH_WORKERS = int(os.getenv("BENCH_WORKERS", "1"))  # API worker processes; more than 1 uses the SQLite stores
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# In the order they run; complete_task goes last because it moves every user forward
+SCENARIOS = ["generate", "user_progress", "daily_task", "week_videos", "search_videos", "chat", "complete_task"]
+# Scenarios that don't need benchmark users
+USERLESS_SCENARIOS = {"generate", "search_videos"}
+
+CHAT_QUESTIONS = [
+    "How do I stay motivated when a topic gets hard?",
+    "What should I build for my portfolio?",
+    "How many hours a day should I practise?",
+    "Which resources are best for beginners?"
+]
+
+# The Course Recommendation page's searches (recommender.py); repeats are video cache hits
+SEARCH_QUERIES = ["React Components and Props", "Python for beginners", "SQL joins explained", "System design basics", "Git branching"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(args: list, env: dict, log) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable] + args, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+def generate_request(i: int) -> tuple:
+    # Distinct goals, so every request is a roadmap cache miss
+    return "POST", "/api/generate_roadmap", {"goal": f"Benchmark goal {i}", "target_role": "Software Engineer", "timeframe": BENCH_TIMEFRAME}
+
+
+def scenario_request(name: str, i: int, users: list) -> tuple:
+    user_id = users[i % len(users)]
+    if name == "generate":
+        return generate_request(i)
+    if name == "user_progress":
+        return "GET", f"/api/user_progress/{user_id}", None
+    if name == "daily_task":
+        return "GET", f"/api/daily_task/{user_id}", None
+    if name == "week_videos":
+        return "GET", f"/api/week_videos/{user_id}", None
+    if name == "search_videos":
+        return "GET", f"/api/search_videos?query={SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}&max_results=5", None
+    if name == "chat":
+        return "POST", f"/api/chat/{user_id}", {"message": CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)], "user_id": user_id}
+    if name == "complete_task":
+        return "POST", f"/api/complete_task/{user_id}", {"task_completed": True}
+    raise ValueError(f"Unknown scenario {name!r}")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, requests: int, concurrency: int, users: list) -> tuple[dict, list]:
+    latencies, errors, bodies = [], 0, []
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, path, body = scenario_request(name, i, users)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+                if ok and name == "generate":
+                    bodies.append(response.json().get("user_id"))
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0
+    }
+    return result, [user_id for user_id in bodies if user_id]
+
+
+def regressions(report: dict, baseline: dict) -> list[str]:
+    found = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * BENCH_TOLERANCE:
+            found.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+        if result["error_rate"] > before["error_rate"]:
+            found.append(f"{name}: error rate {before['error_rate']} -> {result['error_rate']}")
+    return found
+
+
+async def bench(requests: int, concurrency: int, scenarios: list) -> dict:
+    workdir = tempfile.mkdtemp(prefix="navipro-bench-")
+    upstream_port, api_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    # The stand-in has no quota, so the client-side Groq rate limiter is off unless set explicitly
+    env = {"GROQ_REQUESTS_PER_MINUTE": "0", "GROQ_TOKENS_PER_MINUTE": "0", "LOG_LEVEL": "warning", **os.environ}
+    env.update(
+        GROQ_API_KEY="bench",
+        GROQ_BASE_URL=f"{upstream_url}/openai/v1",
+        YOUTUBE_API_KEY="bench",
+        YOUTUBE_BASE_URL=f"{upstream_url}/youtube/v3",
+        JOB_QUEUE_PATH=os.path.join(workdir, "jobs.db"),
+        USER_STORE_PATH=os.path.join(workdir, "navipro.db"),
+        ROADMAP_CACHE_PATH=os.path.join(workdir, "roadmap_cache.db"),
+        VIDEO_CACHE_PATH=os.path.join(workdir, "video_cache.db"),
+        SERVE_PORT=str(api_port),
+        SERVE_WORKERS=str(BENCH_WORKERS)
+    )
+    log = open(os.path.join(workdir, "server.log"), "w")
+    processes = [
+        start(["bench_upstream.py", str(upstream_port)], env, log),
+        start(["serve.py"], env, log)
+    ]
+    try:
+        await wait_ready(f"{upstream_url}/health")
+        await wait_ready(f"http://127.0.0.1:{api_port}/api/health")
+        upstream_config = httpx.get(f"{upstream_url}/health").json()["config"]
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", timeout=300.0, limits=limits) as client:
+            users: list = []
+            results = {}
+            for name in [s for s in SCENARIOS if s in scenarios]:
+                if name not in USERLESS_SCENARIOS and not users:
+                    # Users for the per-user scenarios, not measured
+                    _, users = await run_scenario(client, "generate", BENCH_USERS, concurrency, [None])
+                    if not users:
+                        raise RuntimeError(f"Could not create benchmark users, see {log.name}")
+                results[name], created = await run_scenario(client, name, requests, concurrency, users or [None])
+                users = users or created[:BENCH_USERS]
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        log.close()
+
+    return {
+        "requests_per_scenario": requests,
+        "concurrency": concurrency,
+        "workers": BENCH_WORKERS,
+        "upstream": upstream_config,
+        "server_log": log.name,
+        "scenarios": results
+    }
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    scenarios = sys.argv[3].split(",") if len(sys.argv) > 3 else SCENARIOS
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    report = asyncio.run(bench(requests, concurrency, scenarios))
+    print(json.dumps(report, indent=2))
+
+    if BENCH_BASELINE:
+        with open(BENCH_BASELINE) as f:
+            found = regressions(report, json.load(f))
+        for line in found:
+            print(f"Regression: {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
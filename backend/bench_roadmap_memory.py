@@ -0,0 +1,107 @@
+# backend/bench_roadmap_memory.py
+"""Memory per user of the in-memory roadmap store: nested dicts vs CompactRoadmap.
+
+Usage: python bench_roadmap_memory.py [users] [months]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from storage import MemoryUserStore
+
+
+def sample_roadmap(months: int, variant: int) -> dict:
+    """Enhanced roadmap shaped like the LLM output; variant changes the text per user"""
+    roadmap = {
+        "roadmap": [],
+        "goal": "Become a frontend developer",
+        "target_role": "Frontend Developer",
+        "timeframe": "1_year",
+        "learning_style": "hands_on",
+        "learning_speed": "average",
+        "skill_level": "beginner",
+        "progress": {
+            "current_day": 1,
+            "current_week": 1,
+            "current_month": 1,
+            "total_tasks_completed": 0,
+            "start_date": datetime.now().isoformat()
+        }
+    }
+    for month_num in range(1, months + 1):
+        weeks = []
+        for week_num in range(1, 5):
+            tasks = []
+            for day_num in range(1, 7):
+                tasks.append({
+                    "day": day_num,
+                    "title": f"Build component {month_num}.{week_num}.{day_num} ({variant})",
+                    "description": f"Implement and test the month {month_num} week {week_num} exercise for profile {variant}",
+                    "task_id": f"m{month_num}_w{week_num}_d{day_num}",
+                    "completed": False,
+                    "completed_date": None,
+                    "estimated_time": "2 hours"
+                })
+            weeks.append({
+                "week": week_num,
+                "week_number": week_num,
+                "focus": f"Month {month_num} week {week_num} focus ({variant})",
+                "daily_tasks": tasks,
+                "week_id": f"month_{month_num}_week_{week_num}",
+                "completed": False
+            })
+        roadmap["roadmap"].append({"month": month_num, "month_title": f"Month {month_num} ({variant})", "weeks": weeks})
+    return roadmap
+
+
+def measure(compact: bool, payloads: list[str]) -> tuple[float, MemoryUserStore]:
+    """Bytes allocated per user for storing every payload in a fresh store"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    store = MemoryUserStore(compact=compact)
+    for i, payload in enumerate(payloads):
+        store.create_user(f"user-{i}", json.loads(payload))
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return size / len(payloads), store
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    months = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    # Roadmap templates are shared through the cache, so users repeat a few texts
+    templates = [json.dumps(sample_roadmap(months, i)) for i in range(max(1, users // 10))]
+    payloads = [templates[i % len(templates)] for i in range(users)]
+
+    dict_bytes, dict_store = measure(False, payloads)
+    compact_bytes, compact_store = measure(True, payloads)
+
+    # Both forms must serialize identically, including after progress updates
+    for store in (dict_store, compact_store):
+        index = store.get_task_index("user-0")
+        for task_id in ("m1_w1_d1", "m1_w1_d2", "m2_w3_d4"):
+            index.mark_completed(index.position_of(task_id), "2025-01-02T03:04:05.123456")
+            index.advance()
+    identical = json.dumps(dict_store.get_roadmap("user-0")) == json.dumps(compact_store.get_roadmap("user-0"))
+
+    start = time.perf_counter()
+    for i in range(min(users, 500)):
+        compact_store.get_roadmap(f"user-{i}")
+    materialize_ms = (time.perf_counter() - start) * 1000 / min(users, 500)
+
+    print(f"{users} users, {months} months ({months * 24} tasks each)")
+    print(f"  dict:    {dict_bytes / 1024:8.1f} KiB/user")
+    print(f"  compact: {compact_bytes / 1024:8.1f} KiB/user ({compact_bytes / dict_bytes:.0%} of dict)")
+    print(f"  to_dict: {materialize_ms:.3f} ms/roadmap")
+    print(f"  identical JSON: {identical}")
+
+
+if __name__ == "__main__":
+    main()
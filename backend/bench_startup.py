@@ -0,0 +1,176 @@
+# backend/bench_startup.py
+"""Cold-start benchmark and budget check for a worker process (no Groq or YouTube quota used).
+
+Measures, over BENCH_STARTUP_RUNS fresh processes:
+- import: seconds to import agent_orchestra (python -X importtime), with the
+  slowest packages backend modules import and each backend module's own import time
+- ready: seconds from starting serve.py (one worker) to the first 200 from /api/health
+- import side effects: threads started and store files created by the import alone;
+  clients, the log writer and the job database belong in the app lifespan
+
+Prints the medians as JSON and exits 1 when either is over its budget
+(IMPORT_BUDGET_SECONDS, STARTUP_BUDGET_SECONDS) or the import had side effects,
+so it can gate a deploy.
+
+Usage: python bench_startup.py
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_STARTUP_RUNS = int(os.getenv("BENCH_STARTUP_RUNS", "5"))
+BENCH_STARTUP_TOP = int(os.getenv("BENCH_STARTUP_TOP", "10"))  # slowest packages listed in the report
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0"))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_MODULES = {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith(".py")}
+
+
+def bench_env(workdir: str) -> dict:
+    # Keys only need to be set, nothing is called; stores go to a scratch directory
+    env = {"LOG_LEVEL": "warning", **os.environ}
+    env.update(
+        GROQ_API_KEY="bench",
+        YOUTUBE_API_KEY="bench",
+        JOB_QUEUE_PATH=os.path.join(workdir, "jobs.db"),
+        USER_STORE_PATH=os.path.join(workdir, "navipro.db"),
+        ROADMAP_CACHE_PATH=os.path.join(workdir, "roadmap_cache.db"),
+        VIDEO_CACHE_PATH=os.path.join(workdir, "video_cache.db"),
+        SERVE_WORKERS="1"
+    )
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_profile(env: dict) -> dict:
+    """Microseconds per module from one python -X importtime run.
+    Returns backend module -> its own time, and third-party package -> cumulative time
+    for the packages backend modules import directly."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import agent_orchestra"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time:      self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative), (len(name) - len(name.lstrip())) // 2))
+
+    profile = {"total": 0, "backend": {}, "packages": {}}
+    # Children are listed before the module that imported them
+    parents = {}
+    for name, own, cumulative, depth in reversed(rows):
+        parent = parents.get(depth - 1)
+        parents[depth] = name
+        if name == "agent_orchestra":
+            profile["total"] = cumulative
+        if name in BACKEND_MODULES:
+            profile["backend"][name] = own
+        elif parent in BACKEND_MODULES:
+            package = name.split(".")[0]
+            profile["packages"][package] = profile["packages"].get(package, 0) + cumulative
+    return profile
+
+
+IMPORT_SIDE_EFFECTS = """
+import json, os, threading
+import agent_orchestra
+print(json.dumps({
+    "threads": sorted(t.name for t in threading.enumerate() if t is not threading.main_thread()),
+    "files": sorted(os.listdir(os.environ["BENCH_STARTUP_WORKDIR"]))
+}))
+"""
+
+
+def import_side_effects() -> dict:
+    """Threads left running and files created in a fresh store directory by importing agent_orchestra"""
+    workdir = tempfile.mkdtemp(prefix="navipro-import-")
+    env = {**bench_env(workdir), "BENCH_STARTUP_WORKDIR": workdir}
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SIDE_EFFECTS], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def time_to_ready(env: dict, timeout: float = 30.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=BACKEND_DIR, env={**env, "SERVE_PORT": str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client() as client:
+            while True:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError(f"serve.py did not answer /api/health within {timeout:.0f}s")
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def median_ms(profiles: list, key: str, limit: int = 0) -> dict:
+    names = set.intersection(*(set(profile[key]) for profile in profiles))
+    medians = {name: statistics.median(profile[key][name] for profile in profiles) / 1000 for name in names}
+    slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)
+    return {name: round(ms, 1) for name, ms in (slowest[:limit] if limit else slowest)}
+
+
+def bench() -> dict:
+    workdir = tempfile.mkdtemp(prefix="navipro-startup-")
+    env = bench_env(workdir)
+    profiles = [import_profile(env) for _ in range(BENCH_STARTUP_RUNS)]
+    ready = [time_to_ready(env) for _ in range(BENCH_STARTUP_RUNS)]
+
+    return {
+        "runs": BENCH_STARTUP_RUNS,
+        "import_seconds": round(statistics.median(profile["total"] for profile in profiles) / 1e6, 3),
+        "ready_seconds": round(statistics.median(ready), 3),
+        # Including everything they import in turn, counted where first imported
+        "slowest_packages_ms": median_ms(profiles, "packages", BENCH_STARTUP_TOP),
+        # Module body only, excluding what it imports
+        "backend_modules_ms": median_ms(profiles, "backend"),
+        "import_side_effects": import_side_effects(),
+        "budget": {"import_seconds": IMPORT_BUDGET_SECONDS, "ready_seconds": STARTUP_BUDGET_SECONDS}
+    }
+
+
+def main():
+    report = bench()
+    print(json.dumps(report, indent=2))
+
+    over = [
+        f"{name}: {report[name]} s > {budget} s"
+        for name, budget in report["budget"].items()
+        if report[name] > budget
+    ]
+    over += [f"import {kind}: {', '.join(found)}" for kind, found in report["import_side_effects"].items() if found]
+    for line in over:
+        print(f"Over budget: {line}", file=sys.stderr)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# backend/bench_upstream.py
+"""Local stand-in for the Groq chat completions API and the YouTube Data API, for offline benchmarks.
+
+Answers roadmap, outline, month, week repair and continuation prompts with
+roadmaps that pass validation, and anything else (chat, summaries) with text.
+Point the backend at it with GROQ_BASE_URL=http://127.0.0.1:<port>/openai/v1
+and YOUTUBE_BASE_URL=http://127.0.0.1:<port>/youtube/v3.
+
+Usage: python bench_upstream.py [port]
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MOCK_LATENCY = float(os.getenv("MOCK_LATENCY", "0.05"))  # seconds before a completion starts
+MOCK_LATENCY_JITTER = float(os.getenv("MOCK_LATENCY_JITTER", "0.02"))  # +/- uniform
+MOCK_SECONDS_PER_TOKEN = float(os.getenv("MOCK_SECONDS_PER_TOKEN", "0"))  # generation speed, 0 = instant
+MOCK_STREAM_CHUNK_CHARS = int(os.getenv("MOCK_STREAM_CHUNK_CHARS", "40"))
+MOCK_YOUTUBE_LATENCY = float(os.getenv("MOCK_YOUTUBE_LATENCY", "0.02"))
+MOCK_FAILURE_RATE = float(os.getenv("MOCK_FAILURE_RATE", "0"))  # share of calls answered 503
+MOCK_RATE_LIMIT_RATE = float(os.getenv("MOCK_RATE_LIMIT_RATE", "0"))  # share of calls answered 429
+MOCK_RETRY_AFTER = os.getenv("MOCK_RETRY_AFTER", "1")
+
+app = FastAPI(title="Groq/YouTube stand-in")
+
+CHAT_REPLY = (
+    "Great question! Break the topic into small pieces and practise each one with a short project. "
+    "Spend most of your time building rather than reading, and review what you built at the end of "
+    "the week. Keep a list of questions as you go and look them up in the official documentation. "
+) * 3
+
+
+def config() -> dict:
+    return {
+        "latency": MOCK_LATENCY,
+        "latency_jitter": MOCK_LATENCY_JITTER,
+        "seconds_per_token": MOCK_SECONDS_PER_TOKEN,
+        "youtube_latency": MOCK_YOUTUBE_LATENCY,
+        "failure_rate": MOCK_FAILURE_RATE,
+        "rate_limit_rate": MOCK_RATE_LIMIT_RATE
+    }
+
+
+def _week(month: int, week: int) -> dict:
+    return {
+        "week": week,
+        "week_number": week,
+        "focus": f"Topic {month}.{week} Fundamentals",
+        "daily_tasks": [
+            {
+                "day": day,
+                "title": f"Study topic {month}.{week}.{day}",
+                "description": "Read the official guide section and build a small example with it"
+            }
+            for day in range(1, 7)
+        ]
+    }
+
+
+def _month(month: int, first_week: int = 1) -> dict:
+    return {
+        "month": month,
+        "month_title": f"Stage {month} Skills",
+        "weeks": [_week(month, week) for week in range(first_week, 5)]
+    }
+
+
+def _number(pattern: str, text: str, default: int) -> int:
+    match = re.search(pattern, text)
+    return int(match.group(1)) if match else default
+
+
+def completion_text(messages: list) -> str:
+    """The reply to a prompt, picked by which backend prompt it is"""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = messages[-1].get("content", "") if messages else ""
+
+    if user.startswith("Continue this learner's"):
+        months = _number(r"(\d+) month roadmap", user, 3)
+        month = _number(r"from month (\d+)", user, 1)
+        week = _number(r"week (\d+)\.", user, 1)
+        roadmap = [_month(month, week)] + [_month(m) for m in range(month + 1, months + 1)]
+        return json.dumps({"roadmap": roadmap})
+    if "Produce ONLY the outline" in system:
+        months = _number(r"exactly (\d+) months", user, 3)
+        outline = [
+            {"month": m, "month_title": f"Stage {m} Skills", "weeks": [{"week": w, "focus": f"Topic {m}.{w} Fundamentals"} for w in range(1, 5)]}
+            for m in range(1, months + 1)
+        ]
+        return json.dumps({"roadmap": outline})
+    if "given ONE month" in system:
+        return json.dumps(_month(_number(r"Expand month (\d+)", user, 1)))
+    if "one week of an existing roadmap" in system:
+        return json.dumps(_week(_number(r"of month (\d+)", user, 1), _number(r"Rewrite week (\d+)", user, 1)))
+    if "CRITICAL JSON STRUCTURE RULES" in system:
+        months = _number(r"exactly (\d+) months", user, 3)
+        return json.dumps({"roadmap": [_month(m) for m in range(1, months + 1)]})
+    return CHAT_REPLY
+
+
+def _usage(messages: list, text: str) -> dict:
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4
+    completion = len(text) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def _injected_failure():
+    """503 or 429 response for the configured share of calls, else None"""
+    roll = random.random()
+    if roll < MOCK_FAILURE_RATE:
+        return JSONResponse({"error": {"message": "Service unavailable (mock)"}}, status_code=503)
+    if roll < MOCK_FAILURE_RATE + MOCK_RATE_LIMIT_RATE:
+        return JSONResponse({"error": {"message": "Rate limit reached (mock)"}}, status_code=429,
+                            headers={"Retry-After": MOCK_RETRY_AFTER})
+    return None
+
+
+async def _wait(base: float):
+    delay = base + random.uniform(-MOCK_LATENCY_JITTER, MOCK_LATENCY_JITTER)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    failure = _injected_failure()
+    if failure is not None:
+        return failure
+
+    messages = body.get("messages", [])
+    text = completion_text(messages)
+    usage = _usage(messages, text)
+    created = int(time.time())
+    await _wait(MOCK_LATENCY)
+
+    if body.get("stream"):
+        async def events():
+            for start in range(0, len(text), MOCK_STREAM_CHUNK_CHARS):
+                piece = text[start:start + MOCK_STREAM_CHUNK_CHARS]
+                if MOCK_SECONDS_PER_TOKEN:
+                    await asyncio.sleep(len(piece) / 4 * MOCK_SECONDS_PER_TOKEN)
+                chunk = {"id": "mock", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            last = {"id": "mock", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+            yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    if MOCK_SECONDS_PER_TOKEN:
+        await asyncio.sleep(usage["completion_tokens"] * MOCK_SECONDS_PER_TOKEN)
+    return {
+        "id": "mock",
+        "object": "chat.completion",
+        "created": created,
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+
+@app.get("/youtube/v3/search")
+async def youtube_search(q: str = "", maxResults: int = 8):
+    failure = _injected_failure()
+    if failure is not None:
+        return failure
+    await _wait(MOCK_YOUTUBE_LATENCY)
+    seed = abs(hash(q)) % 100000
+    return {"items": [
+        {"id": {"kind": "youtube#video", "videoId": f"v{seed}x{i}"}, "snippet": _snippet(f"v{seed}x{i}", i)}
+        for i in range(maxResults)
+    ]}
+
+
+def _snippet(video_id: str, pos: int) -> dict:
+    """The snippet fields the YouTube Data API returns for a video"""
+    return {
+        "publishedAt": f"2024-{pos % 12 + 1:02d}-15T12:00:00Z",
+        "channelId": "UCmockchannel",
+        "title": f"Tutorial {video_id}",
+        "description": f"Step-by-step walkthrough of {video_id}, with exercises.",
+        "channelTitle": "Mock Channel",
+        "thumbnails": {
+            size: {"url": f"https://i.ytimg.com/vi/{video_id}/{name}.jpg", "width": width, "height": height}
+            for size, name, width, height in (
+                ("default", "default", 120, 90), ("medium", "mqdefault", 320, 180), ("high", "hqdefault", 480, 360)
+            )
+        }
+    }
+
+
+@app.get("/youtube/v3/videos")
+async def youtube_videos(id: str = ""):
+    failure = _injected_failure()
+    if failure is not None:
+        return failure
+    await _wait(MOCK_YOUTUBE_LATENCY)
+    items = []
+    for pos, video_id in enumerate(v for v in id.split(",") if v):
+        items.append({
+            "id": video_id,
+            "snippet": _snippet(video_id, pos),
+            "contentDetails": {"duration": "PT15M"},
+            "statistics": {"viewCount": str(1000 * (pos + 1))}
+        })
+    return {"items": items}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "config": config()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8900
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
@@ -1,14 +1,46 @@
 # backend/career.py
-import httpx, traceback, json
+import httpx, json
 from dotenv import load_dotenv
 import os
+import logging
+
+import logs
+import resilience
+import groq_scheduler
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or "https://api.groq.com/openai/v1"
 
+logger = logs.get_logger(__name__)
+
+# Shares retries and the circuit breaker with groq_client
+groq_upstream = resilience.upstream("groq")
+
+
+def post_chat_completion(headers: dict, data: dict, priority: str) -> httpx.Response:
+    """POST a chat completion through the shared Groq rate limiter (see groq_scheduler.py)"""
+    scheduler = groq_scheduler.scheduler
+    ticket = scheduler.acquire_sync(scheduler.estimate(data, priority), priority)
+    usage = None
+    try:
+        send = scheduler.charge_retries(
+            lambda: httpx.post(f"{GROQ_BASE_URL}/chat/completions", headers=headers, json=data),
+            groq_scheduler.estimate_tokens(data)[0]
+        )
+        response = groq_upstream.call_sync(send)
+        if response.is_success:
+            usage = response.json().get("usage")
+        return response
+    except resilience.UpstreamUnavailable:
+        usage = {"total_tokens": 0}
+        raise
+    finally:
+        usage = usage or {}
+        scheduler.settle(ticket, usage.get("total_tokens"), usage.get("completion_tokens"))
+
 # DEBUG — confirm what the client thinks your base is:
-print("🔧 Using GROQ API base:", GROQ_BASE_URL)
+logger.debug("Using Groq API base", extra={"base_url": GROQ_BASE_URL})
 
 # Step 1: Generate raw roadmap JSON string via LLM
 SYSTEM_PROMPT = (
@@ -46,11 +78,11 @@ def generate_roadmap(inputs: dict) -> str:
                 {"role": "user", "content": prompt}
             ]
         }
-        response = httpx.post(f"{GROQ_BASE_URL}/chat/completions", headers=headers, json=data)
+        response = post_chat_completion(headers, data, "roadmap")
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"].strip()
     except Exception:
-        traceback.print_exc()
+        logger.exception("Roadmap generation failed")
         return "{\"roadmap\": {}}"
 
 # Step 2: Normalize raw structure to front-end schema
@@ -73,8 +105,9 @@ def normalize_roadmap(raw_data):
 
 def get_structured_roadmap(inputs: dict) -> dict:
     raw_str = generate_roadmap(inputs)
-    # log raw output
-    print("🛠️ Raw model output:", raw_str)
+    # log raw output: size, hash and the start only, never the whole 20k-token completion
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Raw model output", extra={"response": logs.payload(raw_str)})
     try:
         raw_json = json.loads(raw_str)
         roadmap_raw = raw_json.get('roadmap', {})
@@ -85,7 +118,7 @@ def get_structured_roadmap(inputs: dict) -> dict:
             "roadmap": structured
         }
     except json.JSONDecodeError as e:
-        print("❌ JSON decode failed:", e)
+        logger.warning("JSON decode failed", extra={"error": str(e), "response": logs.payload(raw_str)})
         return {"goal": inputs.get('goal', ''), "timeframe": "", "roadmap": []}
 
 # Chat helper
@@ -103,9 +136,9 @@ def chat_with_navi(message: str) -> str:
                 {"role": "user", "content": message}
             ]
         }
-        response = httpx.post(f"{GROQ_BASE_URL}/chat/completions", headers=headers, json=data)
+        response = post_chat_completion(headers, data, "interactive")
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"].strip()
     except Exception as e:
-        print("Chat error:", e)
+        logger.error("Chat failed", extra={"error": str(e)})
         return "Sorry, something went wrong."
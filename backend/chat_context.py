@@ -0,0 +1,76 @@
+# backend/chat_context.py
+import os
+from typing import Optional
+
+CHAT_PROMPT_BUDGET = int(os.getenv("CHAT_PROMPT_BUDGET", "2000"))  # estimated input tokens per chat call
+CHAT_SUMMARY_KEEP_RAW = int(os.getenv("CHAT_SUMMARY_KEEP_RAW", "4"))  # newest turns never folded into the summary
+CHAT_SUMMARY_MIN_TURNS = int(os.getenv("CHAT_SUMMARY_MIN_TURNS", "2"))  # fold turns in batches of at least this many
+
+# Chat-format framing per message (role, separators)
+_MESSAGE_OVERHEAD = 4
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a conversation between a learner and Navi, their career mentor.
+Merge the new exchanges into the existing summary. Keep facts about the learner (background, goals,
+struggles, preferences, decisions) and advice already given. Drop small talk. Write at most 150 words
+of plain prose, no lists or headings. Return only the summary."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count (about 4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + _MESSAGE_OVERHEAD
+
+
+def prompt_tokens(messages: list[dict]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def build_context(system_prompt: str, history: list[dict], message: str,
+                  summary: Optional[dict] = None, budget: int = CHAT_PROMPT_BUDGET) -> list[dict]:
+    """Messages for a chat call that fit in budget estimated tokens.
+
+    The system prompt and the new message always go in. The rolling summary (if
+    any) is appended to the system prompt, then the newest turns it doesn't cover
+    are added until the budget runs out.
+    """
+    if summary and summary.get("summary"):
+        system_prompt = f"{system_prompt}\n\nSummary of the conversation so far:\n{summary['summary']}"
+    system = {"role": "system", "content": system_prompt}
+    current = {"role": "user", "content": message}
+    remaining = budget - message_tokens(system) - message_tokens(current)
+
+    covered_until = (summary or {}).get("covered_until") or ""
+    turns = []
+    for chat in reversed(history):
+        if chat["timestamp"] <= covered_until:
+            break
+        pair = [{"role": "user", "content": chat["user"]}, {"role": "assistant", "content": chat["assistant"]}]
+        cost = prompt_tokens(pair)
+        if cost > remaining:
+            break
+        remaining -= cost
+        turns[:0] = pair
+
+    return [system, *turns, current]
+
+
+def turns_to_summarize(history: list[dict], summary: Optional[dict] = None,
+                       keep_raw: int = CHAT_SUMMARY_KEEP_RAW, min_turns: int = CHAT_SUMMARY_MIN_TURNS) -> list[dict]:
+    """Turns that are not in the summary yet and are older than the newest keep_raw"""
+    covered_until = (summary or {}).get("covered_until") or ""
+    older = history[:-keep_raw] if keep_raw else history
+    pending = [chat for chat in older if chat["timestamp"] > covered_until]
+    return pending if len(pending) >= min_turns else []
+
+
+def summary_messages(summary: Optional[dict], turns: list[dict]) -> list[dict]:
+    """Prompt asking the model to fold turns into the existing summary"""
+    exchanges = "\n\n".join(f"Learner: {chat['user']}\nNavi: {chat['assistant']}" for chat in turns)
+    previous = (summary or {}).get("summary") or "(none yet)"
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Existing summary:\n{previous}\n\nNew exchanges:\n{exchanges}"}
+    ]
@@ -0,0 +1,315 @@
+# backend/compact_roadmap.py
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+COMPACT_SHAPE_CACHE_SIZE = int(os.getenv("COMPACT_SHAPE_CACHE_SIZE", "1024"))  # distinct task/roadmap key orders
+COMPACT_LAYOUT_CACHE_SIZE = int(os.getenv("COMPACT_LAYOUT_CACHE_SIZE", "256"))  # distinct task_id sequences
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Task keys with their own column; anything else (resources, goal, ...) and any
+# value of an unexpected type goes to the sparse per-task extras.
+_STR_COLUMNS = ("task_id", "title", "description", "estimated_time")
+
+
+# Key orders are shared by every task/roadmap with the same layout. Bounded, as
+# roadmaps with unexpected keys add new ones; an evicted shape stays valid for
+# the roadmaps holding it, later ones just stop sharing it.
+@lru_cache(maxsize=COMPACT_SHAPE_CACHE_SIZE)
+def _interned_shape(keys: tuple) -> tuple:
+    return keys
+
+
+def _shape(keys) -> tuple:
+    return _interned_shape(tuple(keys))
+
+
+# task_id sequence -> (task_ids, task_id -> position); normalized roadmaps of one
+# timeframe all use the same IDs, so a handful of these serve every user.
+# Unnormalized IDs give one per roadmap, hence the bound.
+@lru_cache(maxsize=COMPACT_LAYOUT_CACHE_SIZE)
+def _interned_layout(key: tuple) -> tuple[tuple, dict]:
+    positions = {}
+    for pos, task_id in enumerate(key):
+        if task_id is not None:
+            positions[task_id] = pos
+    return key, positions
+
+
+def _layout(task_ids: list) -> tuple[tuple, dict]:
+    return _interned_layout(tuple(task_ids))
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _encode_date(value: str) -> int:
+    """Microseconds since the epoch, or 0 if value does not round-trip exactly"""
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0
+    if dt.tzinfo is not None:
+        return 0
+    micros = (dt - _EPOCH) // _MICROSECOND
+    return micros if micros and _decode_date(micros) == value else 0
+
+
+def _decode_date(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class CompactRoadmap:
+    """Struct-of-arrays form of an enhanced roadmap, for the in-memory user store.
+
+    Tasks live in parallel columns (interned strings, an int array of days, a
+    completion bitset and an int array of completion timestamps) instead of one
+    dict each. to_dict() rebuilds the exact JSON shape for API responses.
+
+    Also implements the TaskIndex interface, so lookups stay constant-time.
+    """
+
+    __slots__ = (
+        "meta", "progress", "_top_shape", "_months", "_month_sizes", "_weeks", "_week_months",
+        "_week_starts", "_week_sizes", "_week_of",
+        "_positions", "_shapes", "_days", "_task_id", "_title", "_description", "_estimated_time",
+        "_done", "_dates", "_extras", "completed", "cursor"
+    )
+
+    def __init__(self, roadmap: dict):
+        self._top_shape = _shape(roadmap)
+        self.meta = {k: v for k, v in roadmap.items() if k not in ("roadmap", "progress")}
+        self.progress = dict(roadmap.get("progress", {}))
+        # Months and weeks are few per roadmap; keep them as dicts with their
+        # child lists replaced by None, plus the child counts
+        self._months: list[dict] = []
+        self._month_sizes = array("H")
+        self._weeks: list[dict] = []
+        self._week_months = array("i")
+        self._week_starts = array("I")
+        self._week_sizes = array("H")
+        self._week_of = array("H")
+        self._shapes: list[tuple] = []
+        self._days = array("i")
+        task_ids: list = []
+        self._title: list = []
+        self._description: list = []
+        self._estimated_time: list = []
+        self._dates = array("q")
+        self._extras: dict[int, dict] = {}
+        self.completed = 0
+        done = []
+
+        for month in roadmap.get("roadmap", []):
+            self._months.append({k: None if k == "weeks" else _intern(v) for k, v in month.items()})
+            self._month_sizes.append(len(month.get("weeks", [])))
+            for week in month.get("weeks", []):
+                week_pos = len(self._weeks)
+                self._weeks.append({k: None if k == "daily_tasks" else _intern(v) for k, v in week.items()})
+                self._week_months.append(month["month"] if type(month.get("month")) is int else -1)
+                self._week_starts.append(len(self._shapes))
+                self._week_sizes.append(len(week.get("daily_tasks", [])))
+                for task in week.get("daily_tasks", []):
+                    pos = len(self._shapes)
+                    self._shapes.append(_shape(task))
+                    self._week_of.append(week_pos)
+                    extras = {}
+
+                    day = task.get("day")
+                    if type(day) is int and -2**31 <= day < 2**31:
+                        self._days.append(day)
+                    else:
+                        self._days.append(0)
+                        if "day" in task:
+                            extras["day"] = day
+
+                    for name in _STR_COLUMNS:
+                        value = task.get(name)
+                        column = task_ids if name == "task_id" else getattr(self, "_" + name)
+                        if type(value) is str:
+                            column.append(sys.intern(value))
+                        else:
+                            column.append(None)
+                            if name in task:
+                                extras[name] = value
+
+                    completed = task.get("completed", False)
+                    done.append(bool(completed))
+                    if completed:
+                        self.completed += 1
+                    if type(completed) is not bool:
+                        extras["completed"] = completed
+
+                    completed_date = task.get("completed_date")
+                    micros = _encode_date(completed_date) if completed_date is not None else 0
+                    self._dates.append(micros)
+                    if completed_date is not None and not micros:
+                        extras["completed_date"] = completed_date
+
+                    for key, value in task.items():
+                        if key not in extras and key not in _STR_COLUMNS and key not in ("day", "completed", "completed_date"):
+                            extras[key] = value
+                    if extras:
+                        self._extras[pos] = extras
+
+        self._task_id, self._positions = _layout(task_ids)
+
+        self._done = bytearray((len(done) + 7) // 8)
+        for pos, flag in enumerate(done):
+            if flag:
+                self._done[pos >> 3] |= 1 << (pos & 7)
+
+        self.cursor = self._locate(
+            self.progress.get("current_month", 1),
+            self.progress.get("current_week", 1),
+            self.progress.get("current_day", 1)
+        )
+
+    @property
+    def total(self) -> int:
+        return len(self._shapes)
+
+    def _is_done(self, pos: int) -> bool:
+        return bool(self._done[pos >> 3] & (1 << (pos & 7)))
+
+    def _find_week(self, month: int, week: int) -> Optional[int]:
+        # At most 48 weeks; scanning beats keeping a per-user lookup dict
+        for week_pos, week_data in enumerate(self._weeks):
+            if self._week_months[week_pos] == month and week_data.get("week") == week:
+                return week_pos
+        return None
+
+    def _locate(self, month: int, week: int, day: int) -> Optional[int]:
+        week_pos = self._find_week(month, week)
+        if week_pos is None:
+            return None
+        start = self._week_starts[week_pos]
+        for pos in range(start, start + self._week_sizes[week_pos]):
+            if self._days[pos] == day and "day" not in self._extras.get(pos, ()):
+                return pos
+        return None
+
+    def _resume_from(self) -> int:
+        """Where advance scans from without a cursor; see TaskIndex._resume_from"""
+        week_pos = self._find_week(self.progress.get("current_month", 1), self.progress.get("current_week", 1))
+        if week_pos is None:
+            return self.total
+        start = self._week_starts[week_pos]
+        end = start + self._week_sizes[week_pos]
+        current_day = self.progress.get("current_day", 1)
+        for pos in range(start, end):
+            if self._days[pos] > current_day:
+                return pos
+        return end
+
+    def _task(self, pos: int) -> dict:
+        extras = self._extras.get(pos, {})
+        task = {}
+        for key in self._shapes[pos]:
+            if key in extras:
+                task[key] = extras[key]
+            elif key == "day":
+                task[key] = self._days[pos]
+            elif key == "completed":
+                task[key] = self._is_done(pos)
+            elif key == "completed_date":
+                task[key] = _decode_date(self._dates[pos]) if self._dates[pos] else None
+            else:
+                task[key] = getattr(self, "_" + key)[pos]
+        return task
+
+    # TaskIndex interface
+    def current(self) -> Optional[int]:
+        """Position of the current task, or None once everything is done"""
+        if self.cursor is None or self._is_done(self.cursor):
+            return None
+        return self.cursor
+
+    def task_at(self, pos: int) -> dict:
+        return self._task(pos)
+
+    def week_at(self, pos: int) -> dict:
+        return self._weeks[self._week_of[pos]]
+
+    def week_focus(self, month: int, week: int) -> Optional[str]:
+        week_pos = self._find_week(month, week)
+        return self._weeks[week_pos]["focus"] if week_pos is not None else None
+
+    def week_after(self, pos: int) -> Optional[dict]:
+        week_pos = self._week_of[pos] + 1
+        return self._weeks[week_pos] if week_pos < len(self._weeks) else None
+
+    def position_of(self, task_id: str) -> Optional[int]:
+        return self._positions.get(task_id)
+
+    def mark_completed(self, pos: int, completed_date: str) -> bool:
+        """Mark the task at pos completed; False if it already was"""
+        if self._is_done(pos):
+            return False
+        self._done[pos >> 3] |= 1 << (pos & 7)
+        extras = self._extras.get(pos)
+        if extras:
+            extras.pop("completed", None)
+            extras.pop("completed_date", None)
+        micros = _encode_date(completed_date)
+        self._dates[pos] = micros
+        if not micros:
+            self._extras.setdefault(pos, {})["completed_date"] = completed_date
+        for key in ("completed", "completed_date"):
+            if key not in self._shapes[pos]:
+                self._shapes[pos] = _shape(self._shapes[pos] + (key,))
+        self.completed += 1
+        self.progress["total_tasks_completed"] = self.progress.get("total_tasks_completed", 0) + 1
+        return True
+
+    def advance(self):
+        """Move the cursor to the next incomplete task after the current one"""
+        pos = (self.cursor + 1) if self.cursor is not None else self._resume_from()
+        while pos < self.total and self._is_done(pos):
+            pos += 1
+
+        if pos >= self.total:
+            # If no more tasks, mark as completed
+            self.progress["current_day"] = -1
+            self.cursor = None
+            return
+
+        self.cursor = pos
+        self.progress["current_month"] = self._week_months[self._week_of[pos]]
+        self.progress["current_week"] = self.week_at(pos)["week"]
+        self.progress["current_day"] = self._days[pos]
+
+    def to_dict(self) -> dict:
+        """Materialize the roadmap in its original JSON shape"""
+        months = []
+        week_pos = 0
+        for month_pos, month in enumerate(self._months):
+            month_data = dict(month)
+            weeks = []
+            for _ in range(self._month_sizes[month_pos]):
+                week_data = dict(self._weeks[week_pos])
+                start = self._week_starts[week_pos]
+                tasks = [self._task(pos) for pos in range(start, start + self._week_sizes[week_pos])]
+                if "daily_tasks" in week_data:
+                    week_data["daily_tasks"] = tasks
+                weeks.append(week_data)
+                week_pos += 1
+            if "weeks" in month_data:
+                month_data["weeks"] = weeks
+            months.append(month_data)
+
+        roadmap = {}
+        for key in self._top_shape:
+            if key == "roadmap":
+                roadmap[key] = months
+            elif key == "progress":
+                roadmap[key] = dict(self.progress)
+            else:
+                roadmap[key] = self.meta[key]
+        return roadmap
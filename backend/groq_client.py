@@ -0,0 +1,247 @@
+# backend/groq_client.py
+import os
+import json
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+import resilience
+import groq_scheduler
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+GROQ_MODEL = "openai/gpt-oss-120b"
+
+# Connection pool settings (shared by every Groq call in the process)
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "20"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+GROQ_MAX_CONCURRENCY_PER_HOST = int(os.getenv("GROQ_MAX_CONCURRENCY_PER_HOST", "256"))
+GROQ_VERIFY_SSL = os.getenv("GROQ_VERIFY_SSL", "true").lower() != "false"
+
+_client: Optional[httpx.AsyncClient] = None
+_client_lock = threading.Lock()
+# Retries with backoff and the circuit breaker shared by every Groq call (see resilience.py)
+_upstream = resilience.upstream("groq")
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+# Token usage accumulators of the enclosing track_usage blocks, innermost last
+_usage: ContextVar[tuple] = ContextVar("groq_usage", default=())
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        verify=GROQ_VERIFY_SSL,
+        timeout=httpx.Timeout(120.0, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+            keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def close_client():
+    """Close the shared client and drop its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_semaphores.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use.
+
+    Building it (HTTP/2 stack, TLS context) takes longer than the rest of startup,
+    so the app lifespan only warms it up in a background thread. Thread-safe.
+    """
+    global _client
+    client = _client
+    if client is None or client.is_closed:
+        with _client_lock:
+            if _client is None or _client.is_closed:
+                _client = _build_client()
+            client = _client
+    return client
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in _host_semaphores:
+        _host_semaphores[host] = asyncio.Semaphore(GROQ_MAX_CONCURRENCY_PER_HOST)
+    return _host_semaphores[host]
+
+
+@contextmanager
+def track_usage():
+    """Accumulate token usage of every Groq call made inside this block.
+
+    Tasks spawned inside the block share the same accumulator, so fanned-out
+    calls (per-month expansion, week repairs) are counted too. Blocks nest:
+    a call is counted in every enclosing block.
+    """
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "calls": 0}
+    token = _usage.set(_usage.get() + (usage,))
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def _record_usage(reported: Optional[dict]):
+    for usage in _usage.get():
+        usage["calls"] += 1
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            usage[key] += (reported or {}).get(key, 0)
+
+
+class Payload(dict):
+    """Chat completion body. content is the same body pre-serialized as JSON when
+    it was rendered from a PreparedPayload, and is sent as-is."""
+    content: Optional[bytes] = None
+
+    def streaming(self) -> "Payload":
+        body = Payload(self, stream=True)
+        if self.content is not None:
+            body.content = self.content[:-1] + b', "stream": true}'
+        return body
+
+
+class PreparedPayload:
+    """Chat completion settings and system prompt, serialized to JSON once.
+    render() only has to encode the user message of each request."""
+
+    def __init__(self, system_prompt: str, **settings):
+        self.settings = {"model": GROQ_MODEL, **settings}
+        self.system_message = {"role": "system", "content": system_prompt}
+        # Everything up to the end of the system message, messages array left open
+        self._head = json.dumps({**self.settings, "messages": [self.system_message]})[:-2].encode()
+
+    def render(self, user_prompt: str) -> Payload:
+        user_message = {"role": "user", "content": user_prompt}
+        payload = Payload(self.settings, messages=[self.system_message, user_message])
+        payload.content = self._head + b", " + json.dumps(user_message).encode() + b"]}"
+        return payload
+
+
+def _body(payload: dict) -> dict:
+    """httpx arguments for the request body, reusing a pre-serialized one"""
+    content = getattr(payload, "content", None)
+    return {"content": content} if content is not None else {"json": payload}
+
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+
+async def _acquire(payload: dict, priority: Optional[str], key: Optional[str]) -> groq_scheduler.Ticket:
+    """Wait for the client-side rate limiter (see groq_scheduler.py)"""
+    priority = priority or groq_scheduler.current()[0]
+    scheduler = groq_scheduler.scheduler
+    return await scheduler.acquire(scheduler.estimate(payload, priority), priority, key)
+
+
+def _charging_retries(send, payload: dict):
+    """send, with each retry charged to the rate limiter for the prompt it sends again"""
+    return groq_scheduler.scheduler.charge_retries(send, groq_scheduler.estimate_tokens(payload)[0])
+
+
+def _settle(ticket: groq_scheduler.Ticket, reported: Optional[dict]):
+    reported = reported or {}
+    groq_scheduler.scheduler.settle(ticket, reported.get("total_tokens"), reported.get("completion_tokens"))
+
+
+async def chat_completion(payload: dict, timeout: float = 120.0, priority: Optional[str] = None,
+                          key: Optional[str] = None) -> dict:
+    """POST a chat completion to Groq and return the decoded JSON body.
+
+    priority and key (user or job) default to the enclosing groq_scheduler.scheduling() block.
+    """
+    url = f"{GROQ_BASE_URL}/chat/completions"
+    client = get_client()
+    ticket = await _acquire(payload, priority, key)
+    reported = None
+    try:
+        async with _host_semaphore(url):
+            response = await _upstream.call(_charging_retries(
+                lambda: client.post(url, headers=_headers(), timeout=timeout, **_body(payload)), payload
+            ))
+        response.raise_for_status()
+        response_data = response.json()
+        reported = response_data.get("usage")
+    except resilience.UpstreamUnavailable:
+        # Never sent: the reservation goes back in full
+        reported = {"total_tokens": 0}
+        raise
+    finally:
+        _settle(ticket, reported)
+    _record_usage(reported)
+    return response_data
+
+
+async def stream_chat_completion(payload: dict, timeout: float = 120.0, priority: Optional[str] = None,
+                                 key: Optional[str] = None):
+    """Stream a chat completion from Groq, yielding each decoded SSE chunk"""
+    url = f"{GROQ_BASE_URL}/chat/completions"
+    body = (payload if isinstance(payload, Payload) else Payload(payload)).streaming()
+    client = get_client()
+    ticket = await _acquire(payload, priority, key)
+    reported = None
+    chunks = _stream(client, url, body, timeout)
+    try:
+        async for chunk in chunks:
+            # Groq reports usage on the last chunk under x_groq
+            reported = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or reported
+            yield chunk
+    except resilience.UpstreamUnavailable:
+        reported = {"total_tokens": 0}
+        raise
+    finally:
+        await chunks.aclose()
+        _settle(ticket, reported)
+    _record_usage(reported)
+
+
+async def _stream(client: httpx.AsyncClient, url: str, body: dict, timeout: float):
+    async with _host_semaphore(url):
+        # Only opening the stream is retried; once tokens flow, a failure ends it.
+        # The stream counts as in flight until it is closed, not just until its headers arrive
+        response = await _upstream.call(_charging_retries(lambda: client.send(
+            client.build_request("POST", url, headers=_headers(), timeout=timeout, **_body(body)), stream=True
+        ), body), hold=True)
+        try:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)
+        finally:
+            try:
+                await response.aclose()
+            finally:
+                _upstream.release()
+
+
+def delta_text(chunk: dict) -> str:
+    """Extract the content delta from a streamed completion chunk"""
+    choices = chunk.get("choices") or []
+    if not choices:
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
@@ -0,0 +1,269 @@
+# backend/groq_scheduler.py
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+import metrics
+
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "1000"))  # 0 = no limit
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "250000"))  # 0 = no limit
+
+# Lower number = served first
+PRIORITIES = {"interactive": 0, "roadmap": 1, "batch": 2}
+DEFAULT_PRIORITY = "roadmap"
+
+# (priority, fairness key) of the calls made inside a scheduling() block
+_context: ContextVar[tuple] = ContextVar("groq_schedule", default=(DEFAULT_PRIORITY, ""))
+
+
+@contextmanager
+def scheduling(priority: str, key: str = ""):
+    """Run the Groq calls in this block under priority class, queued fairly against other keys (users, jobs)"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}")
+    token = _context.set((priority, key))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current() -> tuple:
+    return _context.get()
+
+
+def estimate_tokens(payload: dict) -> tuple[int, int]:
+    """(prompt, completion cap) estimate for a chat completion payload, about 4 characters per token"""
+    prompt = sum(len(m.get("content") or "") for m in payload.get("messages", [])) // 4 + 4 * len(payload.get("messages", []))
+    return prompt, int(payload.get("max_tokens") or 1024)
+
+
+class _Bucket:
+    """Token bucket refilled continuously at per_minute / 60 per second, holding at most per_minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until amount is available (amounts above capacity only need a full bucket)"""
+        if not self.capacity:
+            return 0.0
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("priority", "key", "tokens", "granted", "event", "future", "loop", "enqueued")
+
+    def __init__(self, priority: int, key: str, tokens: int):
+        self.priority = priority
+        self.key = key
+        self.tokens = tokens
+        self.granted = False
+        self.event: Optional[threading.Event] = None
+        self.future: Optional[asyncio.Future] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.enqueued = time.monotonic()
+
+
+class Ticket:
+    """A granted slot; settle() with the real token usage once the call is done"""
+    __slots__ = ("tokens", "priority")
+
+    def __init__(self, tokens: int, priority: str):
+        self.tokens = tokens
+        self.priority = priority
+
+
+class GroqScheduler:
+    """Client-side rate limiter for Groq requests and tokens per minute.
+
+    Calls wait in one queue per priority class; a class is only served when
+    every higher class is empty. Inside a class, keys (users, jobs) take turns,
+    so one user's burst doesn't hold up everyone else. Each call reserves its
+    estimated tokens up front and settle() refunds what it didn't use; retries
+    of a granted call are charged on top (charge_retries).
+    Usable from event loops (acquire) and threads (acquire_sync).
+    """
+
+    def __init__(self, requests_per_minute: int = GROQ_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = GROQ_TOKENS_PER_MINUTE):
+        self.requests = _Bucket(requests_per_minute)
+        self.tokens = _Bucket(tokens_per_minute)
+        # priority -> key -> waiters of that key, keys in turn order
+        self._queues: list[OrderedDict] = [OrderedDict() for _ in PRIORITIES]
+        self._depth = 0
+        # Running average completion size per class, so reservations aren't always max_tokens
+        self._completion_avg: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, payload: dict, priority: str) -> int:
+        prompt, cap = estimate_tokens(payload)
+        completion = min(cap, self._completion_avg.get(priority, cap))
+        return int(prompt + completion)
+
+    async def acquire(self, tokens: int, priority: Optional[str] = None, key: Optional[str] = None) -> Ticket:
+        priority, key = self._resolve(priority, key)
+        waiter = _Waiter(PRIORITIES[priority], key, tokens)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        delay = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(delay, 0.005))
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    delay = self._dispatch()
+        except asyncio.CancelledError:
+            self._abandon(waiter, priority)
+            raise
+        return self._granted(waiter, priority)
+
+    def acquire_sync(self, tokens: int, priority: Optional[str] = None, key: Optional[str] = None) -> Ticket:
+        priority, key = self._resolve(priority, key)
+        waiter = _Waiter(PRIORITIES[priority], key, tokens)
+        waiter.event = threading.Event()
+        delay = self._enqueue(waiter)
+        while not waiter.granted:
+            waiter.event.wait(timeout=max(delay, 0.005))
+            with self._lock:
+                delay = self._dispatch()
+        return self._granted(waiter, priority)
+
+    def settle(self, ticket: Ticket, used_tokens: Optional[int], completion_tokens: Optional[int] = None):
+        """Give back the part of the reservation the call didn't use"""
+        with self._lock:
+            if used_tokens is not None and self.tokens.capacity:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + ticket.tokens - used_tokens)
+            if completion_tokens:
+                previous = self._completion_avg.get(ticket.priority, completion_tokens)
+                self._completion_avg[ticket.priority] = 0.8 * previous + 0.2 * completion_tokens
+            self._dispatch()
+
+    def charge(self, tokens: int):
+        """Take a request and tokens nobody queued for (a retry of a granted call) at once.
+        The buckets can go negative; the calls queued behind pay the debt by waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            if self.requests.capacity:
+                self.requests.level -= 1
+            if self.tokens.capacity:
+                self.tokens.level -= min(tokens, self.tokens.capacity)
+
+    def charge_retries(self, send: Callable, tokens: int) -> Callable:
+        """Wrap send for resilience.Upstream.call: each call after the first is a retry,
+        a request against Groq's limits the ticket didn't cover, so it is charged tokens"""
+        attempts = 0
+
+        def attempt():
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1:
+                self.charge(tokens)
+            return send()
+        return attempt
+
+    def _resolve(self, priority: Optional[str], key: Optional[str]) -> tuple:
+        context_priority, context_key = current()
+        return priority or context_priority, key if key is not None else context_key
+
+    def _enqueue(self, waiter: _Waiter) -> float:
+        with self._lock:
+            self._queues[waiter.priority].setdefault(waiter.key, deque()).append(waiter)
+            self._depth += 1
+            metrics.GROQ_QUEUE_DEPTH.set(self._depth)
+            return self._dispatch()
+
+    def _granted(self, waiter: _Waiter, priority: str) -> Ticket:
+        metrics.GROQ_QUEUE_WAIT_SECONDS.observe(time.monotonic() - waiter.enqueued, priority=priority)
+        return Ticket(waiter.tokens, priority)
+
+    def _abandon(self, waiter: _Waiter, priority: str):
+        with self._lock:
+            if waiter.granted:
+                # Granted just as it was cancelled: hand the reservation back
+                if self.tokens.capacity:
+                    self.tokens.level = min(self.tokens.capacity, self.tokens.level + waiter.tokens)
+                if self.requests.capacity:
+                    self.requests.level = min(self.requests.capacity, self.requests.level + 1)
+            else:
+                self._remove(waiter)
+            self._dispatch()
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues[waiter.priority]
+        waiters = queue.get(waiter.key)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del queue[waiter.key]
+            self._depth -= 1
+            metrics.GROQ_QUEUE_DEPTH.set(self._depth)
+
+    def _dispatch(self) -> float:
+        """Grant queued calls while the buckets allow; returns seconds until the next one could go. Holds _lock."""
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        for queue in self._queues:
+            while queue:
+                key, waiters = next(iter(queue.items()))
+                waiter = waiters[0]
+                delay = max(self.requests.wait_for(1), self.tokens.wait_for(waiter.tokens))
+                if delay > 0:
+                    # Strict priority: lower classes wait behind this call
+                    return delay
+                if self.requests.capacity:
+                    self.requests.level -= 1
+                if self.tokens.capacity:
+                    self.tokens.level -= min(waiter.tokens, self.tokens.capacity)
+                waiters.popleft()
+                # Round robin: this key goes to the back of the line
+                del queue[key]
+                if waiters:
+                    queue[key] = waiters
+                self._depth -= 1
+                metrics.GROQ_QUEUE_DEPTH.set(self._depth)
+                waiter.granted = True
+                if waiter.future is not None:
+                    waiter.loop.call_soon_threadsafe(_resolve_future, waiter.future)
+                else:
+                    waiter.event.set()
+        return 60.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "queued": {name: sum(len(w) for w in self._queues[p].values()) for name, p in PRIORITIES.items()},
+                "requests_available": int(self.requests.level) if self.requests.capacity else None,
+                "tokens_available": int(self.tokens.level) if self.tokens.capacity else None,
+                "wait_seconds": metrics.GROQ_QUEUE_WAIT_SECONDS.snapshot()
+            }
+
+
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+# Shared by every Groq call in the process (groq_client, career)
+scheduler = GroqScheduler()
@@ -0,0 +1,290 @@
+# backend/job_queue.py
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+import logs
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(os.path.dirname(__file__), "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))  # each attempt has its own LLM retries
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))  # seconds, multiplied by the attempt number
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))  # lease renewal interval
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+JOB_DRAIN_SECONDS = float(os.getenv("JOB_DRAIN_SECONDS", "120"))  # on shutdown, wait this long for running jobs
+
+logger = logs.get_logger(__name__)
+
+
+class JobQueue:
+    """Durable job queue in SQLite (WAL).
+
+    A claimed job is leased for JOB_LEASE_SECONDS and its worker renews the lease
+    while the job runs; if the worker dies (restart, crash) the lease runs out and
+    another worker picks it up again. complete, retry, release and renew only touch
+    a job still held under the lease in job["lease_until"], so a worker that lost
+    its lease can't overwrite the new owner's result.
+    The methods block on SQLite (up to 30 s while another process holds the
+    write lock); async code calls them through asyncio.to_thread.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempt INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        result TEXT,
+        error TEXT,
+        available_at REAL NOT NULL,
+        lease_until REAL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at);
+    CREATE TABLE IF NOT EXISTS batches (
+        job_id TEXT PRIMARY KEY,
+        snapshot TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._draining = False
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        job_id = str(uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), max_attempts, now, now, now)
+            )
+        if self._wakeup is not None:
+            # enqueue usually runs in a worker thread; the event belongs to the loop
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """Lease the oldest runnable job (queued, or running with an expired lease)"""
+        now = time.time()
+        lease_until = now + JOB_LEASE_SECONDS
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'running' AND lease_until < ?) ORDER BY available_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempt = attempt + 1, lease_until = ?, updated_at = ? "
+                        "WHERE job_id = ?", (lease_until, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self.get(row[0])
+        job["lease_until"] = lease_until
+        return job
+
+    def _update_leased(self, job: dict, assignments: str, params: tuple) -> bool:
+        """Run an UPDATE on a job this worker still holds; False if its lease was lost"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ? AND status = 'running' AND lease_until = ?",
+                (*params, time.time(), job["job_id"], job["lease_until"])
+            )
+        return cursor.rowcount > 0
+
+    def renew(self, job: dict) -> bool:
+        """Push the lease of a running job forward"""
+        lease_until = time.time() + JOB_LEASE_SECONDS
+        with self._lock:
+            renewed = self._update_leased(job, "lease_until = ?", (lease_until,))
+            if renewed:
+                job["lease_until"] = lease_until
+        return renewed
+
+    def complete(self, job: dict, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> bool:
+        return self._update_leased(
+            job, "status = ?, result = ?, error = ?, lease_until = NULL",
+            (status, json.dumps(result) if result is not None else None, error)
+        )
+
+    def retry(self, job: dict, error: str, delay: float) -> bool:
+        return self._update_leased(
+            job, "status = 'queued', error = ?, available_at = ?, lease_until = NULL", (error, time.time() + delay)
+        )
+
+    def release(self, job: dict) -> bool:
+        """Give a claimed job back without counting the attempt (worker shutting down)"""
+        return self._update_leased(job, "status = 'queued', attempt = attempt - 1, lease_until = NULL", ())
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, kind, payload, status, attempt, max_attempts, result, error, created_at, updated_at "
+                "FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, payload, status, attempt, max_attempts, result, error, created_at, updated_at = row
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "payload": json.loads(payload),
+            "status": status,
+            "attempt": attempt,
+            "max_attempts": max_attempts,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def save_batch(self, snapshot: dict):
+        """Publish a batch job's status, so every worker process can answer for it"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches (job_id, snapshot, updated_at) VALUES (?, ?, ?)",
+                (snapshot["job_id"], json.dumps(snapshot), time.time())
+            )
+
+    def get_batch(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT snapshot FROM batches WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def purge(self, max_age: float = JOB_RETENTION):
+        """Drop finished jobs and batches older than max_age"""
+        cutoff = time.time() - max_age
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND updated_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM batches WHERE updated_at < ?", (cutoff,))
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def start_job_workers(queue: JobQueue, handlers: dict[str, Callable[[dict], Awaitable[tuple]]],
+                      workers: int = JOB_WORKERS) -> list[asyncio.Task]:
+    """Run workers on the current loop. handlers[kind](job) returns (status, result);
+    raising retries the job until max_attempts, then marks it failed."""
+    queue._wakeup = asyncio.Event()
+    queue._loop = asyncio.get_running_loop()
+    queue._draining = False
+    queue.purge()
+    return [asyncio.create_task(_worker(queue, handlers)) for _ in range(workers)]
+
+
+async def _heartbeat(queue: JobQueue, job: dict, stop: asyncio.Event):
+    """Renew the job's lease until stop is set; a renewal is never left running in a thread"""
+    while True:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=JOB_HEARTBEAT_SECONDS)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            renewed = await asyncio.to_thread(queue.renew, job)
+        except sqlite3.Error as e:
+            # The lease is long enough to try again next beat
+            logger.warning("Job lease renewal failed", extra={"job_id": job["job_id"], "error": str(e)})
+            continue
+        if not renewed:
+            logger.warning("Job lease lost to another worker", extra={"job_id": job["job_id"]})
+            return
+
+
+async def _finish(queue: JobQueue, job: dict, method: Callable, *args, **kwargs):
+    if not await asyncio.to_thread(method, job, *args, **kwargs):
+        logger.warning("Job lease lost, outcome dropped", extra={"job_id": job["job_id"], "attempt": job["attempt"]})
+
+
+async def _worker(queue: JobQueue, handlers: dict):
+    while not queue._draining:
+        try:
+            # claim is a write transaction; a locked jobs.db mustn't stall the requests on this loop
+            job = await asyncio.to_thread(queue.claim)
+        except Exception as e:
+            # A dead worker task would never be restarted, so back off and keep polling
+            logger.error("Job claim failed", extra={"error": str(e)})
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        if job is None:
+            queue._wakeup.clear()
+            try:
+                await asyncio.wait_for(queue._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        stop = asyncio.Event()
+        heartbeat = asyncio.create_task(_heartbeat(queue, job, stop))
+        try:
+            try:
+                # The job id is the request id of everything the job logs
+                with logs.request_context(job["job_id"]):
+                    status, result = await handlers[job["kind"]](job)
+            finally:
+                stop.set()
+                await heartbeat
+            await _finish(queue, job, queue.complete, status, result)
+        except asyncio.CancelledError:
+            # Not to_thread: the task is being cancelled (shutdown), so don't await again
+            heartbeat.cancel()
+            queue.release(job)
+            raise
+        except Exception as e:
+            logger.warning("Job attempt failed", extra={"job_id": job["job_id"], "attempt": job["attempt"], "error": str(e)})
+            try:
+                if job["attempt"] < job["max_attempts"]:
+                    await _finish(queue, job, queue.retry, str(e), JOB_RETRY_DELAY * job["attempt"])
+                else:
+                    await _finish(queue, job, queue.complete, "failed", error=str(e))
+            except Exception as e:
+                # Left running; the lease runs out and another worker retries it
+                logger.error("Job outcome not saved", extra={"job_id": job["job_id"], "error": str(e)})
+
+
+async def stop_job_workers(queue: JobQueue, tasks: list[asyncio.Task], drain_seconds: float = JOB_DRAIN_SECONDS):
+    """Stop claiming jobs and let the running ones finish for up to drain_seconds.
+    Jobs still running then are cancelled and released for the next worker."""
+    queue._draining = True
+    if queue._wakeup is not None:
+        queue._wakeup.set()
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=drain_seconds)
+        if pending:
+            logger.warning("Job drain timed out, releasing running jobs", extra={"jobs": len(pending)})
+        for task in pending:
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,307 @@
+# backend/json_stream.py
+import json
+import re
+import time
+from typing import Optional
+
+import logs
+import metrics
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*\n|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<squote>'(?:[^'\\]|\\.)*')
+  | (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<punct>[{}\[\]:,])
+""", re.VERBOSE | re.DOTALL)
+
+_DECODER = json.JSONDecoder(strict=False)
+
+logger = logs.get_logger(__name__)
+
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+# Tokens that may continue in the next chunk when they end exactly at the end of the buffer
+_EXTENDABLE = {"number", "word"}
+
+
+def format_json_path(path: list) -> str:
+    """["roadmap", 2, "weeks", 1] -> roadmap[2].weeks[1]"""
+    out = ""
+    for part in path:
+        out += f"[{part}]" if isinstance(part, int) else (f".{part}" if out else part)
+    return out or "$"
+
+
+def _decode_string(token: str) -> str:
+    if token[0] == "'":
+        body = token[1:-1].replace("\\'", "'")
+        token = '"' + re.sub(r'(?<!\\)"', '\\"', body) + '"'
+    try:
+        return json.loads(token, strict=False)
+    except json.JSONDecodeError:
+        return token[1:-1]
+
+
+def _decode_number(token: str):
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+class TolerantJSONParser:
+    """Single-pass, incremental JSON parser for LLM output.
+
+    Text before the first "{" (prose, markdown fences) and after the top-level
+    object is ignored. Comments, trailing or missing commas, single quotes,
+    unquoted keys and Python literals are tolerated. Feed chunks as they arrive;
+    if the text stops early, value holds everything read so far and cut_path
+    names the innermost container that was still open. Containers along
+    cut_path are incomplete, everything else in value is complete (a scalar
+    still being read when the text stopped is dropped).
+
+    emit is a list of path patterns ("*" matches any key or index); feed()
+    returns (path, value) for every container matching one as soon as it closes.
+    """
+
+    def __init__(self, emit: Optional[list[tuple]] = None):
+        self.emit = [tuple(pattern) for pattern in emit or []]
+        self.value = None
+        self.done = False
+        self.repairs = 0  # malformed spots that were skipped or patched
+        self._text = ""
+        self._started = False
+        # One frame per open container: [container, pending key, expected token]
+        self._stack: list[list] = []
+        self._path: list = []
+
+    @property
+    def complete(self) -> bool:
+        return self.done
+
+    @property
+    def cut_path(self) -> Optional[list]:
+        """Path of the innermost open container, None once the document is complete"""
+        if self.done:
+            return None
+        return list(self._path)
+
+    def feed(self, chunk: str) -> list[tuple]:
+        """Consume a chunk of text and return the (path, value) pairs completed by it"""
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        return self._parse(final=False)
+
+    def close(self) -> list[tuple]:
+        """End of input: read whatever is left in the buffer"""
+        if self.done:
+            return []
+        return self._parse(final=True)
+
+    def _parse(self, final: bool) -> list[tuple]:
+        completed: list[tuple] = []
+        text = self._text
+        if not self._started:
+            start = text.find("{")
+            if start == -1:
+                self._text = ""
+                return completed
+            self._started = True
+            text = text[start:]
+
+        pos, end = 0, len(text)
+        while pos < end and not self.done:
+            match = _TOKEN.match(text, pos)
+            if match is None:
+                if text[pos] == '"' or (not final and text[pos] in "'/"):
+                    break  # unterminated string or comment: wait for more text, or drop it at the end
+                self.repairs += 1
+                pos += 1
+                continue
+            if match.end() == end and match.lastgroup in _EXTENDABLE:
+                break  # may be cut short
+            pos = match.end()
+            kind = match.lastgroup
+            if kind in ("ws", "comment"):
+                continue
+            self._token(kind, match.group(), completed)
+
+        self._text = "" if self.done else text[pos:]
+        return completed
+
+    def _token(self, kind: str, token: str, completed: list):
+        if kind == "punct" and token in "}]":
+            self._close(token, completed)
+            return
+        if not self._stack:
+            # Only the opening "{" of the document gets here
+            self._open({})
+            return
+
+        frame = self._stack[-1]
+        container, _, expect = frame
+        if isinstance(container, dict):
+            if expect == "key":
+                if kind in ("string", "squote", "word", "number"):
+                    frame[1] = _decode_string(token) if kind in ("string", "squote") else token
+                    frame[2] = "colon"
+                else:
+                    self.repairs += token != ","
+                return
+            if expect == "colon":
+                frame[2] = "value"
+                if token == ":":
+                    return
+                self.repairs += 1
+            elif expect == "comma":
+                if token == ",":
+                    frame[2] = "key"
+                    return
+                # Missing comma: read the token as the next key
+                self.repairs += 1
+                frame[2] = "key"
+                self._token(kind, token, completed)
+                return
+            if token == ",":
+                # Key without a value
+                self.repairs += 1
+                frame[1], frame[2] = None, "key"
+                return
+            if token == ":":
+                self.repairs += 1
+                return
+        else:
+            if token == ",":
+                if expect == "comma":
+                    frame[2] = "value"
+                else:
+                    self.repairs += 1
+                return
+            if token == ":":
+                self.repairs += 1
+                return
+            if expect == "comma":
+                self.repairs += 1  # missing comma between elements
+
+        if token == "{":
+            self._open({})
+        elif token == "[":
+            self._open([])
+        elif kind in ("string", "squote"):
+            self._add(_decode_string(token))
+        elif kind == "number":
+            self._add(_decode_number(token))
+        elif token in _LITERALS:
+            self._add(_LITERALS[token])
+        else:
+            # Unquoted word used as a value
+            self.repairs += 1
+            self._add(token)
+
+    def _add(self, value):
+        """Put a value into the innermost container, returning its key or index"""
+        frame = self._stack[-1]
+        container = frame[0]
+        if isinstance(container, dict):
+            key = frame[1]
+            container[key] = value
+            frame[1], frame[2] = None, "comma"
+            return key
+        container.append(value)
+        frame[2] = "comma"
+        return len(container) - 1
+
+    def _open(self, container):
+        if not self._stack:
+            self.value = container
+        else:
+            self._path.append(self._add(container))
+        self._stack.append([container, None, "key" if isinstance(container, dict) else "value"])
+
+    def _close(self, token: str, completed: list):
+        want = dict if token == "}" else list
+        depth = next((i for i in range(len(self._stack) - 1, -1, -1) if isinstance(self._stack[i][0], want)), None)
+        if depth is None:
+            self.repairs += 1
+            return
+        # Mismatched closer: containers opened inside the matching one are closed with it
+        self.repairs += len(self._stack) - 1 - depth
+        while len(self._stack) > depth:
+            container = self._stack.pop()[0]
+            path = tuple(self._path)
+            if self._path:
+                self._path.pop()
+            if self.emit and any(self._matches(pattern, path) for pattern in self.emit):
+                completed.append((path, container))
+        if not self._stack:
+            self.done = True
+
+    @staticmethod
+    def _matches(pattern: tuple, path: tuple) -> bool:
+        return len(pattern) == len(path) and all(p == "*" or p == k for p, k in zip(pattern, path))
+
+
+def parse_partial_json(raw_content: str) -> tuple[dict, Optional[list]]:
+    """Parse the JSON object in an LLM response, even a cut-off one.
+
+    Returns (value, cut_path); cut_path is None when the object is complete (see
+    TolerantJSONParser for what a cut-off value contains).
+    """
+    start = raw_content.find("{")
+    if start == -1:
+        metrics.ROADMAP_JSON_PARSES.inc(result="invalid")
+        raise ValueError("No valid JSON object found in response")
+    # Well-formed output decodes in one pass in C; the tolerant parser handles the rest
+    started = time.perf_counter()
+    try:
+        value, _ = _DECODER.raw_decode(raw_content, start)
+        metrics.ROADMAP_STAGE_SECONDS.observe(time.perf_counter() - started, stage="parse")
+        metrics.ROADMAP_JSON_PARSES.inc(result="clean")
+        return value, None
+    except json.JSONDecodeError:
+        pass
+
+    # Cleaning up malformed output: the failed fast pass plus the tolerant parse
+    parser = TolerantJSONParser()
+    parser.feed(raw_content[start:])
+    parser.close()
+    metrics.ROADMAP_STAGE_SECONDS.observe(time.perf_counter() - started, stage="clean")
+    metrics.ROADMAP_JSON_PARSES.inc(result="cut_off" if parser.cut_path is not None else "repaired")
+    if parser.repairs:
+        logger.info("Parsed JSON response with repairs", extra={"repairs": parser.repairs})
+    return parser.value, parser.cut_path
+
+
+def parse_llm_json(raw_content: str) -> dict:
+    """Parse the JSON object in an LLM response, raising ValueError if there is none or it was cut off"""
+    value, cut_path = parse_partial_json(raw_content)
+    if cut_path is not None:
+        raise ValueError(f"JSON response cut off at {format_json_path(cut_path)}")
+    return value
+
+
+class RoadmapStreamParser:
+    """Incrementally pull complete month objects out of a streamed roadmap JSON document.
+
+    Feed it text chunks as they arrive from the LLM; every time a month object
+    inside the top-level "roadmap" array closes, it is returned.
+    """
+
+    def __init__(self):
+        self._parser = TolerantJSONParser(emit=[("roadmap", "*")])
+
+    @property
+    def done(self) -> bool:
+        return self._parser.done
+
+    @property
+    def cut_path(self) -> Optional[list]:
+        return self._parser.cut_path
+
+    def feed(self, chunk: str) -> list[dict]:
+        """Consume a chunk of text and return any month objects completed by it"""
+        return [month for _, month in self._parser.feed(chunk) if isinstance(month, dict)]
@@ -0,0 +1,166 @@
+# backend/logs.py
+import os
+import sys
+import json
+import queue
+import atexit
+import hashlib
+import logging
+import threading
+from uuid import uuid4
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records waiting for the writer thread; more are dropped
+LOG_PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", "300"))  # characters of a large payload kept in the log
+
+# Parent of every backend logger; uvicorn's own loggers are left alone
+ROOT_LOGGER = "navipro"
+
+# Correlates the log lines of one API request or job across the whole pipeline
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came in through extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def new_request_id() -> str:
+    return uuid4().hex[:16]
+
+
+def request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextmanager
+def request_context(rid: Optional[str] = None):
+    """Tag every log line written in this block (and the tasks and threads it starts) with a request id"""
+    token = _request_id.set(rid or new_request_id())
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+def payload(text: Optional[str], limit: int = LOG_PAYLOAD_CHARS) -> dict:
+    """Loggable stand-in for a large payload (e.g. raw LLM output): its size, a hash and the first limit characters"""
+    if text is None:
+        return {"chars": 0}
+    summary = {"chars": len(text), "sha256": hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()[:16]}
+    if limit:
+        summary["head"] = text[:limit]
+    return summary
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and the record's extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, extra fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if getattr(record, "request_id", None):
+            fields = {"request_id": record.request_id, **fields}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread. Never blocks the caller: a full queue drops the record."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the cheap part happens on the caller's thread: the message and
+        # traceback are rendered (args may not be safe to read later), the JSON is not
+        record.request_id = _request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def configure():
+    """Route every backend logger through a bounded queue to a writer thread (idempotent)"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JSONFormatter())
+        records: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_NonBlockingQueueHandler(records))
+        root.propagate = False
+
+        _listener = QueueListener(records, stream)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Write out the queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            if isinstance(handler, _NonBlockingQueueHandler):
+                root.removeHandler(handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a backend module, e.g. get_logger(__name__).
+    Nothing is started at import: records are written once configure() has run (app
+    lifespan, serve.py); until then only warnings and errors reach stderr."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
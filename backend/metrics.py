@@ -0,0 +1,285 @@
+# backend/metrics.py
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable
+
+# Worker processes serving the app, exported by serve.py. Metrics live in process
+# memory, so with more than one a scrape would get whichever worker answered
+SERVE_WORKER_PROCESSES = int(os.getenv("SERVE_WORKER_PROCESSES", "1"))
+
+# Every metric registers itself here so snapshot() can report them all
+REGISTRY: list = []
+# Called before every /metrics render to refresh gauges that are cheaper to read on demand
+_SCRAPE_HOOKS: list[Callable[[], None]] = []
+
+# Seconds; covers in-process stages (sub-millisecond) up to multi-minute roadmap generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {_format_labels(key): value for key, value in self._values.items()}
+
+    def samples(self) -> list[tuple]:
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+
+class Summary:
+    """Running count/sum of observations, optionally split by labels"""
+    kind = "summary"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                _format_labels(key): {
+                    "count": count,
+                    "sum": round(total, 3),
+                    "avg": round(total / count, 3) if count else 0.0
+                }
+                for key, (count, total) in self._values.items()
+            }
+
+    def samples(self) -> list[tuple]:
+        with self._lock:
+            return [
+                sample
+                for key, (count, total) in self._values.items()
+                for sample in (("_count", key, count), ("_sum", key, total))
+            ]
+
+
+class Histogram:
+    """Observations counted into fixed buckets, optionally split by labels.
+    An observation is one bisect and three increments, cheap enough for every request."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), count, sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            entry[0][slot] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the seconds spent in the block"""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                _format_labels(key): {
+                    "count": count,
+                    # Stages can take microseconds, so more precision than Summary
+                    "sum": round(total, 6),
+                    "avg": round(total / count, 6) if count else 0.0
+                }
+                for key, (_, count, total) in self._values.items()
+            }
+
+    def samples(self) -> list[tuple]:
+        samples = []
+        with self._lock:
+            for key, (counts, count, total) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    samples.append(("_bucket", key + (("le", _format_bound(bound)),), cumulative))
+                samples.append(("_count", key, count))
+                samples.append(("_sum", key, total))
+        return samples
+
+
+class _Timer:
+    # A plain class rather than @contextmanager: a few times cheaper per block
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Gauge:
+    """Current value that goes up and down, optionally split by labels"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {_format_labels(key): value for key, value in self._values.items()}
+
+    def samples(self) -> list[tuple]:
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return "total"
+    return ",".join(f"{name}={value}" for name, value in key)
+
+
+def snapshot() -> dict:
+    """Current value of every registered metric, keyed by metric name"""
+    return {metric.name: metric.snapshot() for metric in REGISTRY}
+
+
+def on_scrape(hook: Callable[[], None]):
+    """Run hook before every render_prometheus(), e.g. to set gauges read from elsewhere"""
+    _SCRAPE_HOOKS.append(hook)
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)"""
+    for hook in _SCRAPE_HOOKS:
+        try:
+            hook()
+        except Exception:
+            # Not logs.get_logger: logs imports this module
+            logging.getLogger("navipro.metrics").exception("Metrics scrape hook failed")
+
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, key, value in metric.samples():
+            labels = ",".join(f'{name}="{_escape(label)}"' for name, label in key)
+            lines.append(f"{metric.name}{suffix}{{{labels}}} {value}" if labels else f"{metric.name}{suffix} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Roadmap generation
+ROADMAP_TOKENS = Summary("roadmap_generation_tokens", "Groq tokens spent per successful roadmap")
+ROADMAP_SECONDS = Summary("roadmap_generation_seconds", "Wall-clock seconds per successful roadmap")
+ROADMAP_DEFECTS = Counter("roadmap_defects_total", "Validation defects found in generated roadmaps, by kind")
+ROADMAP_REPAIRS = Counter("roadmap_repairs_total", "Roadmaps that went through the repair pass, by outcome")
+ROADMAP_REGENERATIONS = Counter("roadmap_regenerations_total", "Full roadmap regenerations after unrepairable output")
+ROADMAP_CONTINUATIONS = Counter("roadmap_continuations_total", "Follow-up calls for the months a cut-off roadmap response didn't reach")
+ROADMAP_PROMPT_VALIDATIONS = Counter("roadmap_prompt_validations_total", "LLM outputs checked by validation, by prompt template version and result (pass/fail)")
+ROADMAP_PROMPT_TOKENS = Summary("roadmap_prompt_tokens", "Groq tokens per successful roadmap, by prompt version")
+ROADMAP_STAGE_SECONDS = Histogram("roadmap_stage_seconds", "Seconds spent per roadmap pipeline stage (llm_call/clean/parse/validate/enhance/store)")
+ROADMAP_JSON_PARSES = Counter("roadmap_json_parses_total", "LLM JSON responses parsed, by result (clean/repaired/cut_off/invalid)")
+
+# Caches
+ROADMAP_CACHE_REQUESTS = Counter("roadmap_cache_requests_total", "Roadmap template cache lookups, by result (hit/miss/shared)")
+VIDEO_CACHE_REQUESTS = Counter("video_cache_requests_total", "YouTube result cache lookups, by result (hit/stale/miss)")
+VIDEO_PREFETCHES = Counter("video_prefetches_total", "Background video prefetches, by result (queued/cached/skipped/disabled)")
+CHAT_ANSWER_CACHE_REQUESTS = Counter("chat_answer_cache_requests_total", "Chat answer cache lookups, by result (hit/miss/skipped)")
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Share of cache lookups answered from the cache since start, by cache")
+
+# Upstreams (Groq, YouTube)
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Retried upstream calls, by upstream and reason (status code or transport)")
+UPSTREAM_REJECTIONS = Counter("upstream_rejections_total", "Upstream calls failed fast without being sent, by upstream and reason (circuit_open/busy)")
+UPSTREAM_SECONDS = Histogram("upstream_request_seconds", "Seconds to the response headers of each upstream attempt, by upstream, host and status")
+GROQ_QUEUE_DEPTH = Gauge("groq_queue_depth", "Groq calls waiting for the client-side rate limiter")
+GROQ_QUEUE_WAIT_SECONDS = Summary("groq_queue_wait_seconds", "Seconds a Groq call waited for the rate limiter, by priority")
+
+# Chat
+CHAT_FIRST_TOKEN_SECONDS = Summary("chat_first_token_seconds", "Seconds from request to the first streamed chat token")
+CHAT_PROMPT_TOKENS = Summary("chat_prompt_tokens", "Estimated input tokens per chat call")
+
+# Logging
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# User store
+USER_STORE_USERS = Gauge("user_store_users", "Users in the user store")
+USER_STORE_BYTES = Gauge("user_store_bytes", "Approximate bytes held by the user store (RSS estimate in memory, file size for SQLite)")
+
+
+def _ratio(counter: Counter, hits: tuple, misses: tuple) -> float:
+    hit = sum(counter.value(result=r) for r in hits)
+    total = hit + sum(counter.value(result=r) for r in misses)
+    return round(hit / total, 4) if total else 0.0
+
+
+def _update_cache_hit_ratios():
+    # "shared" joined a generation already in flight and "stale" was still served from the cache;
+    # skipped chat lookups were never eligible for the cache
+    CACHE_HIT_RATIO.set(_ratio(ROADMAP_CACHE_REQUESTS, ("hit", "shared"), ("miss",)), cache="roadmap")
+    CACHE_HIT_RATIO.set(_ratio(VIDEO_CACHE_REQUESTS, ("hit", "stale"), ("miss",)), cache="video")
+    CACHE_HIT_RATIO.set(_ratio(CHAT_ANSWER_CACHE_REQUESTS, ("hit",), ("miss",)), cache="chat_answer")
+
+
+on_scrape(_update_cache_hit_ratios)
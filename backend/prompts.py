@@ -0,0 +1,299 @@
+# backend/prompts.py
+import os
+import re
+
+import groq_client
+import metrics
+from roadmap_cache import cache_key
+
+# Prompt versions in use. With several, each onboarding profile is assigned one
+# by hash, so identical profiles (and their cached templates) stay on one version
+ROADMAP_PROMPT_VERSIONS = [v.strip() for v in os.getenv("ROADMAP_PROMPT_VERSIONS", "v1").split(",") if v.strip()]
+
+TIMEFRAME_MONTHS = {
+    "3_months": 3,
+    "6_months": 6,
+    "1_year": 12,
+    "not_sure": 3  # Enforcing 3 months for "not sure"
+}
+
+
+def timeframe_months(timeframe: str) -> int:
+    """Number of months a roadmap for this onboarding timeframe has"""
+    return TIMEFRAME_MONTHS.get(timeframe, 3)
+
+
+def learner_profile(req) -> str:
+    return f"""Goal: {req.goal}
+    Target Role: {req.target_role}
+    Available Time: {req.hours_per_week} hours per week
+    Learning Style: {req.learning_style}
+    Learning Speed: {req.learning_speed}
+    Skill Level: {req.skill_level}"""
+
+
+def _compact(text: str) -> str:
+    """Strip indentation and blank-line runs, which cost tokens without telling the model anything"""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+ROADMAP_SYSTEM_PROMPT = """You are Navi, a very realistic and practical expert career strategist AI that creates detailed learning roadmaps.
+    
+    CRITICAL JSON STRUCTURE RULES:
+    1. Every month MUST have exactly 4 weeks
+    2. Every week MUST have exactly 6 daily tasks
+    3. The roadmap structure MUST be:
+    {
+        "roadmap": [
+            {
+                "month": 1,
+                "month_title": "Specific Month Title",
+                "weeks": [
+                    {
+                        "week": 1,
+                        "week_number": 1,
+                        "focus": "Specific Week Focus",
+                        "daily_tasks": [
+                            {
+                                "day": 1,
+                                "title": "Specific Task Title",
+                                "description": "Detailed task description"
+                            },
+                            // ... exactly 6 tasks per week
+                        ]
+                    },
+                    // ... exactly 4 weeks per month
+                ]
+            },
+            // ... one object per month based on timeframe
+        ]
+    }
+    
+    CONTENT REQUIREMENTS:
+    1. NO generic titles like "Week 4 Learning" or "Day 1 Task"
+    2. Each month_title must describe the learning focus (e.g., "Frontend Framework Mastery")
+    3. Each week.focus must be specific (e.g., "React Components and Props")
+    4. Each task must be actionable and include a resource
+    
+    Example of CORRECT content:
+    {
+        "month_title": "JavaScript Fundamentals",
+        "weeks": [{
+            "focus": "DOM Manipulation",
+            "daily_tasks": [{
+                "title": "Learn querySelector Methods",
+                "description": "Complete MDN's DOM manipulation tutorial section on querySelectorAll"
+            }]
+        }]
+    }
+    """
+
+ROADMAP_USER_PROMPT = """Create a {months} months roadmap for:
+    
+    {profile}
+    
+    IMPORTANT: The roadmap MUST contain exactly {months} months of content.
+    Each week should have exactly 6 daily tasks to match the UI template."""
+
+CONTINUE_USER_PROMPT = """Continue this learner's {months} month roadmap from month {month}, week {week}.
+
+    {profile}
+
+    Already written (month titles and week focuses):
+{written}
+
+    Output ONLY {{"roadmap": [...]}} starting with {first}, followed by every month up to month {months}, in the same structure.
+    Each week should have exactly 6 daily tasks to match the UI template."""
+
+OUTLINE_SYSTEM_PROMPT = """You are Navi, a very realistic and practical expert career strategist AI that plans learning roadmaps.
+
+    Produce ONLY the outline of the roadmap as valid JSON, no daily tasks:
+    {
+        "roadmap": [
+            {
+                "month": 1,
+                "month_title": "Specific Month Title",
+                "weeks": [
+                    {"week": 1, "focus": "Specific Week Focus"},
+                    // ... exactly 4 weeks per month
+                ]
+            },
+            // ... one object per month based on timeframe
+        ]
+    }
+
+    CONTENT REQUIREMENTS:
+    1. NO generic titles like "Week 4 Learning" or "Month 1 Focus"
+    2. Each month_title must describe the learning focus (e.g., "Frontend Framework Mastery")
+    3. Each week focus must be specific (e.g., "React Components and Props")
+    4. Months must build on each other in a realistic order
+    """
+
+OUTLINE_USER_PROMPT = """Create the outline of a {months} month roadmap for:
+
+    {profile}
+
+    IMPORTANT: The outline MUST contain exactly {months} months with exactly 4 weeks each."""
+
+MONTH_SYSTEM_PROMPT = """You are Navi, a very realistic and practical expert career strategist AI that creates detailed learning roadmaps.
+
+    You will be given ONE month of a roadmap with its 4 week focuses. Expand it into daily tasks.
+
+    CRITICAL JSON STRUCTURE RULES:
+    1. Keep the month number, month_title and the 4 week focuses exactly as given
+    2. Every week MUST have exactly 6 daily tasks
+    3. Output ONLY valid JSON with this structure:
+    {
+        "month": 1,
+        "month_title": "Specific Month Title",
+        "weeks": [
+            {
+                "week": 1,
+                "week_number": 1,
+                "focus": "Specific Week Focus",
+                "daily_tasks": [
+                    {
+                        "day": 1,
+                        "title": "Specific Task Title",
+                        "description": "Detailed task description"
+                    },
+                    // ... exactly 6 tasks per week
+                ]
+            },
+            // ... exactly 4 weeks
+        ]
+    }
+
+    CONTENT REQUIREMENTS:
+    1. NO generic titles like "Day 1 Task"
+    2. Each task must be actionable and include a resource
+    """
+
+MONTH_USER_PROMPT = """Expand month {month} of this learner's roadmap into daily tasks.
+
+    {profile}
+
+    Month {month}: {month_title}
+{week_lines}
+
+    Each week should have exactly 6 daily tasks to match the UI template."""
+
+WEEK_REPAIR_SYSTEM_PROMPT = """You are Navi, a very realistic and practical expert career strategist AI that creates detailed learning roadmaps.
+
+    You will be given one week of an existing roadmap that has to be rewritten. Output ONLY valid JSON for that week:
+    {
+        "week": 1,
+        "week_number": 1,
+        "focus": "Specific Week Focus",
+        "daily_tasks": [
+            {
+                "day": 1,
+                "title": "Specific Task Title",
+                "description": "Detailed task description"
+            },
+            // ... exactly 6 tasks
+        ]
+    }
+
+    CONTENT REQUIREMENTS:
+    1. Exactly 6 daily tasks
+    2. The focus must be specific and must not contain the word "Learning"
+    3. Task titles must be specific and must not contain the words "Day" or "Task"
+    4. Each task must be actionable and include a resource
+    """
+
+WEEK_REPAIR_USER_PROMPT = """Rewrite week {week} of month {month} of this learner's roadmap.
+
+    {profile}
+
+    Month {month}: {month_title}
+    Other weeks this month:
+{other_weeks}
+
+    {keep_focus}"""
+
+
+class PromptTemplate:
+    """One version of a prompt. The system prompt and request settings are
+    serialized once, on first use; render() only formats the user prompt."""
+
+    def __init__(self, name: str, version: str, system: str, user: str, compact: bool = False, **settings):
+        self.name = name
+        self.version = version
+        self.id = f"{name}@{version}"
+        self.system = system
+        self.user = user
+        self.compact = compact
+        self.settings = settings
+        # Built by the first render(), so startup doesn't serialize templates a worker may never use
+        self._payload = None
+
+    def render(self, **fields) -> groq_client.Payload:
+        """Request body for the user prompt formatted with fields"""
+        if self._payload is None:
+            self._payload = groq_client.PreparedPayload(_compact(self.system) if self.compact else self.system, **self.settings)
+        text = self.user.format(**fields)
+        return self._payload.render(_compact(text) if self.compact else text)
+
+    def record_validation(self, passed: bool):
+        """Count an LLM output of this template that passed or failed validation"""
+        metrics.ROADMAP_PROMPT_VALIDATIONS.inc(prompt=self.id, result="pass" if passed else "fail")
+
+
+class PromptSet:
+    """Every roadmap prompt of one version"""
+
+    def __init__(self, version: str, compact: bool = False):
+        self.version = version
+        self.roadmap = PromptTemplate("roadmap", version, ROADMAP_SYSTEM_PROMPT, ROADMAP_USER_PROMPT, compact,
+                                      temperature=1, max_tokens=20000)
+        self.continuation = PromptTemplate("continuation", version, ROADMAP_SYSTEM_PROMPT, CONTINUE_USER_PROMPT, compact,
+                                           temperature=1, max_tokens=20000)
+        self.outline = PromptTemplate("outline", version, OUTLINE_SYSTEM_PROMPT, OUTLINE_USER_PROMPT, compact,
+                                      temperature=1, max_tokens=4000)
+        self.month = PromptTemplate("month", version, MONTH_SYSTEM_PROMPT, MONTH_USER_PROMPT, compact,
+                                    temperature=1, max_tokens=6000)
+        self.week_repair = PromptTemplate("week_repair", version, WEEK_REPAIR_SYSTEM_PROMPT, WEEK_REPAIR_USER_PROMPT, compact,
+                                          temperature=1, max_tokens=3000)
+
+    def templates(self) -> list[PromptTemplate]:
+        return [self.roadmap, self.continuation, self.outline, self.month, self.week_repair]
+
+
+# v1: the original prompts; v2: the same instructions with indentation stripped
+PROMPT_VERSIONS = {
+    "v1": PromptSet("v1"),
+    "v2": PromptSet("v2", compact=True)
+}
+
+for _version in ROADMAP_PROMPT_VERSIONS:
+    if _version not in PROMPT_VERSIONS:
+        raise ValueError(f"Unknown ROADMAP_PROMPT_VERSIONS entry {_version!r}, expected one of {sorted(PROMPT_VERSIONS)}")
+
+
+def for_request(req) -> PromptSet:
+    """The prompt version this onboarding profile is assigned to"""
+    if len(ROADMAP_PROMPT_VERSIONS) == 1:
+        return PROMPT_VERSIONS[ROADMAP_PROMPT_VERSIONS[0]]
+    bucket = int(cache_key(req)[:8], 16) % len(ROADMAP_PROMPT_VERSIONS)
+    return PROMPT_VERSIONS[ROADMAP_PROMPT_VERSIONS[bucket]]
+
+
+def stats() -> dict:
+    """A/B view per prompt version: validation pass rate of LLM outputs and tokens per roadmap"""
+    validations = metrics.ROADMAP_PROMPT_VALIDATIONS
+    tokens = metrics.ROADMAP_PROMPT_TOKENS.snapshot()
+    versions = {}
+    for version, prompt_set in PROMPT_VERSIONS.items():
+        passed = sum(validations.value(prompt=t.id, result="pass") for t in prompt_set.templates())
+        failed = sum(validations.value(prompt=t.id, result="fail") for t in prompt_set.templates())
+        if version not in ROADMAP_PROMPT_VERSIONS and not passed + failed:
+            continue
+        versions[version] = {
+            "active": version in ROADMAP_PROMPT_VERSIONS,
+            "validations": int(passed + failed),
+            "pass_rate": round(passed / (passed + failed), 3) if passed + failed else None,
+            "tokens_per_roadmap": tokens.get(f"prompt_version={version}")
+        }
+    return {"versions": versions, "validations": validations.snapshot()}
@@ -1,30 +1,79 @@
-from fastapi import FastAPI, Query
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import APIRouter, Query
 from dotenv import load_dotenv
-from typing import List
-import requests
+from typing import List, Optional
+import threading
+import httpx
 import os
 
-load_dotenv()
+import logs
+import resilience
+from video_cache import VideoCache, create_video_cache, video_cache_key
 
-app = FastAPI()
+load_dotenv()
 
-# ✅ Enable frontend requests (adjust origin in production)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Change to your domain in prod
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Mounted by agent_orchestra.create_app(), which also sets up CORS
+router = APIRouter()
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
-YOUTUBE_VIDEO_DETAILS_URL = "https://www.googleapis.com/youtube/v3/videos"
+YOUTUBE_BASE_URL = os.getenv("YOUTUBE_BASE_URL", "https://www.googleapis.com/youtube/v3")
+YOUTUBE_SEARCH_URL = f"{YOUTUBE_BASE_URL}/search"
+YOUTUBE_VIDEO_DETAILS_URL = f"{YOUTUBE_BASE_URL}/videos"
+
+logger = logs.get_logger(__name__)
+
+youtube_upstream = resilience.upstream("youtube", failure_statuses=resilience.FAILURE_STATUSES | {403})
+
+# Created by the first search, not at import: most workers never serve one
+_video_cache: Optional[VideoCache] = None
+_client: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+def get_video_cache() -> VideoCache:
+    global _video_cache
+    with _lock:
+        if _video_cache is None:
+            _video_cache = create_video_cache()
+        return _video_cache
+
 
+def get_client() -> httpx.Client:
+    """Pooled client for the YouTube calls, so searches reuse connections"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(timeout=30.0)
+        return _client
 
-@app.get("/api/search_videos")
+
+def close():
+    global _video_cache, _client
+    with _lock:
+        if _video_cache is not None:
+            _video_cache.close()
+            _video_cache = None
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+@router.get("/api/search_videos")
 def search_youtube(query: str = Query(..., description="Search query for YouTube"), max_results: int = 5):
+    key = video_cache_key("search_videos", query, max_results=max_results)
+    results = get_video_cache().get_or_fetch(key, lambda: fetch_videos(query, max_results))
+    return results if results is not None else []
+
+
+def fetch_videos(query: str, max_results: int):
+    try:
+        return _fetch_videos(query, max_results)
+    except (resilience.UpstreamUnavailable, httpx.HTTPError) as e:
+        # Upstream down or circuit open: don't cache
+        logger.warning("YouTube API error", extra={"error": str(e)})
+        return None
+
+
+def _fetch_videos(query: str, max_results: int):
     # Search YouTube
     search_params = {
         "key": YOUTUBE_API_KEY,
@@ -34,7 +83,11 @@ def search_youtube(query: str = Query(..., description="Search query for YouTube
         "maxResults": max_results,
     }
 
-    search_response = requests.get(YOUTUBE_SEARCH_URL, params=search_params).json()
+    client = get_client()
+    search_response = youtube_upstream.call_sync(lambda: client.get(YOUTUBE_SEARCH_URL, params=search_params)).json()
+    if "error" in search_response:
+        # Quota/key errors: don't cache them
+        return None
     video_ids = [item["id"]["videoId"] for item in search_response.get("items", [])]
 
     if not video_ids:
@@ -47,7 +100,7 @@ def search_youtube(query: str = Query(..., description="Search query for YouTube
         "id": ",".join(video_ids)
     }
 
-    details_response = requests.get(YOUTUBE_VIDEO_DETAILS_URL, params=details_params).json()
+    details_response = youtube_upstream.call_sync(lambda: client.get(YOUTUBE_VIDEO_DETAILS_URL, params=details_params)).json()
 
     results = []
 
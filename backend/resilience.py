@@ -0,0 +1,354 @@
+# backend/resilience.py
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+import logs
+import metrics
+
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))  # seconds, doubled per retry
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "20"))
+UPSTREAM_RETRY_AFTER_MAX = float(os.getenv("UPSTREAM_RETRY_AFTER_MAX", "60"))  # longer Retry-After gives up instead
+# Across every upstream, streamed responses counted until their body is read; keep it
+# above GROQ_MAX_CONCURRENCY_PER_HOST so that stays the limit for Groq
+UPSTREAM_MAX_INFLIGHT = int(os.getenv("UPSTREAM_MAX_INFLIGHT", "512"))
+UPSTREAM_INFLIGHT_WAIT = float(os.getenv("UPSTREAM_INFLIGHT_WAIT", "30"))  # seconds a call queues for a slot before it is shed
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # consecutive failures
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+# Errors before the request reached the upstream are retried; a read timeout on a
+# 120 s completion is not, so a hung upstream costs one timeout per call
+TRANSPORT_ERRORS = (httpx.TransportError,)
+RETRY_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+logger = logs.get_logger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the upstream: its circuit is open or too many calls are in flight"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class UpstreamBusyError(UpstreamUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds. Then one trial call is let through (half-open): success
+    closes the circuit, failure opens it again."""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_at: Optional[float] = None  # when the half-open trial call was let through
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            now = time.monotonic()
+            # A trial that never reported back (cancelled) is replaced after another reset_timeout
+            if state == "half_open" and (self._trial_at is None or now - self._trial_at >= self.reset_timeout):
+                self._trial_at = now
+                return
+        metrics.UPSTREAM_REJECTIONS.inc(upstream=self.name, reason="circuit_open")
+        raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Circuit closed", extra={"upstream": self.name})
+            self.failures = 0
+            self.opened_at = None
+            self._trial_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_at is not None or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    logger.error("Circuit opened", extra={"upstream": self.name, "failures": self.failures})
+                self.opened_at = time.monotonic()
+            self._trial_at = None
+
+
+class InflightLimit:
+    """Cap on upstream calls in flight across the process, shared by threads and
+    event loops. Over the cap, calls queue in order for up to wait seconds
+    (backpressure) and are only shed after that."""
+
+    def __init__(self, limit: int = UPSTREAM_MAX_INFLIGHT, wait: float = UPSTREAM_INFLIGHT_WAIT):
+        self.limit = limit
+        self.wait = wait
+        self.inflight = 0
+        # asyncio futures and threading events of queued calls; release() hands its slot to the first
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, upstream: str):
+        with self._lock:
+            if self.inflight < self.limit:
+                self.inflight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.wait)
+        except asyncio.TimeoutError:
+            # Unless the slot arrived just as the wait ran out
+            if not self._handed_over(waiter):
+                self._shed(upstream)
+        except asyncio.CancelledError:
+            if self._handed_over(waiter):
+                self.release()
+            raise
+
+    def acquire_sync(self, upstream: str):
+        with self._lock:
+            if self.inflight < self.limit:
+                self.inflight += 1
+                return
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if not waiter.wait(self.wait) and not self._handed_over(waiter):
+            self._shed(upstream)
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.inflight -= 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        try:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+        except RuntimeError:
+            # Its event loop is closed; nobody will take the slot
+            self.release()
+
+    def _handed_over(self, waiter) -> bool:
+        """After a wait ended early: whether release() gave waiter the slot anyway"""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                return False
+            return True
+
+    def _shed(self, upstream: str):
+        metrics.UPSTREAM_REJECTIONS.inc(upstream=upstream, reason="busy")
+        raise UpstreamBusyError(f"No upstream call slot free within {self.wait:g}s ({self.limit} in flight)")
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_inflight = InflightLimit()
+
+
+def backoff_delay(attempt: int, base: float = UPSTREAM_BACKOFF_BASE, cap: float = UPSTREAM_BACKOFF_MAX) -> float:
+    """Full-jitter exponential backoff for the given retry (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if any"""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _host(response, error) -> str:
+    """Host an attempt went to, from the httpx/requests response or error"""
+    try:
+        url = response.url if response is not None else error.request.url
+    except (AttributeError, RuntimeError):
+        return "unknown"
+    return getattr(url, "host", None) or urlsplit(str(url)).hostname or "unknown"
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Whether an exception means the upstream itself failed (already retried, so
+    callers shouldn't retry it again in their own loops)"""
+    if isinstance(error, (UpstreamUnavailable, httpx.TransportError)):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code in RETRY_STATUSES
+
+
+class Upstream:
+    """Retry, backoff and circuit breaking for the calls to one upstream service.
+
+    send() performs one HTTP call and returns the response. Responses with a
+    RETRY_STATUSES status and retry_transport_errors are retried with
+    full-jitter backoff, or after Retry-After when the upstream sends one. The
+    last response is returned (callers still raise_for_status) and the last
+    transport error is raised. Transport errors and failure_statuses count
+    against the circuit breaker.
+    """
+
+    def __init__(self, name: str, failure_statuses: frozenset = FAILURE_STATUSES,
+                 transport_errors: tuple = TRANSPORT_ERRORS, retry_transport_errors: tuple = RETRY_TRANSPORT_ERRORS):
+        self.name = name
+        self.failure_statuses = failure_statuses
+        self.transport_errors = transport_errors
+        self.retry_transport_errors = retry_transport_errors
+        self.breaker = CircuitBreaker(name)
+
+    def _observe(self, response, error, started: float):
+        status = str(response.status_code) if response is not None else "transport_error"
+        metrics.UPSTREAM_SECONDS.observe(
+            time.perf_counter() - started, upstream=self.name, host=_host(response, error), status=status
+        )
+
+    def _attempt_failed(self, response, error, attempt: int, retries: int) -> Optional[float]:
+        """Book-keeping after one attempt; returns the delay before retrying, or None to stop"""
+        if response is not None:
+            status = response.status_code
+            if status in self.failure_statuses:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if status not in RETRY_STATUSES or attempt >= retries:
+                return None
+            delay = retry_after_seconds(response)
+            if delay is not None and delay > UPSTREAM_RETRY_AFTER_MAX:
+                return None
+            reason = str(status)
+        else:
+            self.breaker.record_failure()
+            if attempt >= retries or not isinstance(error, self.retry_transport_errors):
+                return None
+            delay, reason = None, "transport"
+        metrics.UPSTREAM_RETRIES.inc(upstream=self.name, reason=reason)
+        return delay if delay is not None else backoff_delay(attempt)
+
+    async def call(self, send: Callable[[], Awaitable], retries: int = UPSTREAM_MAX_RETRIES, hold: bool = False):
+        """With hold (streamed responses), the in-flight slot of the returned response
+        stays taken until the caller has read the body and calls release()."""
+        for attempt in range(retries + 1):
+            self.breaker.check()
+            await _inflight.acquire(self.name)
+            response, error = None, None
+            started = time.perf_counter()
+            try:
+                response = await send()
+            except self.transport_errors as e:
+                error = e
+            finally:
+                if response is None or not hold:
+                    _inflight.release()
+            self._observe(response, error, started)
+
+            if response is not None and response.status_code < 400:
+                self.breaker.record_success()
+                return response
+            delay = self._attempt_failed(response, error, attempt, retries)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                await response.aclose()
+                if hold:
+                    _inflight.release()
+            await asyncio.sleep(delay)
+
+    def call_sync(self, send: Callable, retries: int = UPSTREAM_MAX_RETRIES):
+        """call() for blocking clients (httpx.Client, requests)"""
+        for attempt in range(retries + 1):
+            self.breaker.check()
+            _inflight.acquire_sync(self.name)
+            response, error = None, None
+            started = time.perf_counter()
+            try:
+                response = send()
+            except self.transport_errors as e:
+                error = e
+            finally:
+                _inflight.release()
+            self._observe(response, error, started)
+
+            if response is not None and response.status_code < 400:
+                self.breaker.record_success()
+                return response
+            delay = self._attempt_failed(response, error, attempt, retries)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def release(self):
+        """Free the in-flight slot of a response returned by call(hold=True)"""
+        _inflight.release()
+
+    def stats(self) -> dict:
+        return {"state": self.breaker.state, "consecutive_failures": self.breaker.failures}
+
+
+_upstreams: dict[str, Upstream] = {}
+
+
+def upstream(name: str, **options) -> Upstream:
+    """The process-wide Upstream for name (created on first use with options)"""
+    if name not in _upstreams:
+        _upstreams[name] = Upstream(name, **options)
+    return _upstreams[name]
+
+
+def stats() -> dict:
+    return {
+        "inflight": _inflight.inflight,
+        "max_inflight": _inflight.limit,
+        "waiting": _inflight.waiting,
+        "upstreams": {name: u.stats() for name, u in _upstreams.items()},
+        "retries": metrics.UPSTREAM_RETRIES.snapshot(),
+        "rejections": metrics.UPSTREAM_REJECTIONS.snapshot()
+    }
@@ -0,0 +1,125 @@
+# backend/roadmap_cache.py
+import os
+import copy
+import json
+import asyncio
+import hashlib
+from typing import Optional
+
+from cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+import metrics
+
+# Onboarding answers that decide the generated content. Users who agree on all
+# of these share one roadmap template.
+CACHE_KEY_FIELDS = ("goal", "target_role", "timeframe", "skill_level", "learning_speed")
+
+ROADMAP_CACHE_BACKEND = os.getenv("ROADMAP_CACHE_BACKEND", "memory")  # memory | sqlite | off
+ROADMAP_CACHE_PATH = os.getenv("ROADMAP_CACHE_PATH", os.path.join(os.path.dirname(__file__), "roadmap_cache.db"))
+ROADMAP_CACHE_TTL = float(os.getenv("ROADMAP_CACHE_TTL", str(7 * 24 * 3600)))
+ROADMAP_CACHE_MAX_ENTRIES = int(os.getenv("ROADMAP_CACHE_MAX_ENTRIES", "1000"))
+
+
+def _normalize(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def cache_key(req, version: str = "") -> str:
+    """Canonical hash of the request fields that shape the roadmap"""
+    canonical = {field: _normalize(getattr(req, field, "")) for field in CACHE_KEY_FIELDS}
+    canonical["version"] = version
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class RoadmapCache:
+    """Roadmap template cache with single-flight de-duplication of concurrent misses.
+
+    Templates are the raw validated LLM output; callers get a deep copy and
+    personalise it (user fields, IDs, progress) themselves.
+    The SQLite backend is called through asyncio.to_thread, as it blocks on disk
+    and on other worker processes holding the write lock.
+    """
+
+    def __init__(self, backend=None, version: str = ""):
+        self.backend = backend
+        self.version = version
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def _backend_call(self, method, *args):
+        if isinstance(self.backend, SQLiteCacheBackend):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def peek(self, req) -> Optional[dict]:
+        """Return a copy of the cached template without generating on a miss"""
+        if self.backend is None:
+            return None
+        cached = await self._backend_call(self.backend.get, cache_key(req, self.version))
+        return copy.deepcopy(cached[1]) if cached else None
+
+    async def put(self, req, template: dict):
+        if self.backend is not None:
+            await self._backend_call(self.backend.set, cache_key(req, self.version), copy.deepcopy(template))
+
+    async def get_or_generate(self, req, generate, cacheable=None) -> dict:
+        """Return a private copy of the template for req, calling generate(req) at most once per key.
+
+        cacheable(template) can veto storing a result (e.g. placeholder-filled
+        roadmaps); concurrent waiters still share it.
+        """
+        if self.backend is None:
+            return await generate(req)
+
+        key = cache_key(req, self.version)
+        cached = await self._backend_call(self.backend.get, key)
+        if cached is not None:
+            metrics.ROADMAP_CACHE_REQUESTS.inc(result="hit")
+            return copy.deepcopy(cached[1])
+
+        # Checked after the lookup: other misses for key may have started while it ran
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Someone is already generating this profile; share their result
+            metrics.ROADMAP_CACHE_REQUESTS.inc(result="shared")
+            template = await asyncio.shield(inflight)
+            return copy.deepcopy(template)
+
+        metrics.ROADMAP_CACHE_REQUESTS.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            template = await generate(req)
+            if cacheable is None or cacheable(template):
+                await self._backend_call(self.backend.set, key, copy.deepcopy(template))
+            future.set_result(template)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[key]
+        return copy.deepcopy(template)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "inflight": len(self._inflight),
+            "requests": metrics.ROADMAP_CACHE_REQUESTS.snapshot()
+        }
+
+
+def create_roadmap_cache(version: str = "") -> RoadmapCache:
+    """Build the cache configured by ROADMAP_CACHE_* environment variables"""
+    if ROADMAP_CACHE_BACKEND == "off":
+        return RoadmapCache(None, version)
+    if ROADMAP_CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(
+            ROADMAP_CACHE_PATH, table="roadmap_templates",
+            max_entries=ROADMAP_CACHE_MAX_ENTRIES, max_age=ROADMAP_CACHE_TTL
+        )
+    else:
+        backend = MemoryCacheBackend(max_entries=ROADMAP_CACHE_MAX_ENTRIES, max_age=ROADMAP_CACHE_TTL)
+    return RoadmapCache(backend, version)
@@ -0,0 +1,100 @@
+# backend/serve.py
+"""Entry point: agent_orchestra under SERVE_WORKERS uvicorn worker processes (default one,
+like the plain development run; set it, or 0 for one per CPU core, in production).
+
+Worker processes share nothing in memory, so with more than one worker:
+- The user store and the roadmap and video caches default to SQLite (WAL). A
+  memory user store is refused, because each worker would see different users.
+- Queued roadmap jobs and batch status already live in the SQLite job database.
+- Groq and batch token budgets are split evenly between the workers, so together
+  they stay inside the account's limits.
+- /metrics answers 503: its numbers are per process, and a scrape would get
+  whichever worker answered.
+Any worker can serve any request, so no sticky routing is needed in front.
+
+On SIGTERM/SIGINT each worker stops accepting connections, and waits up to
+SERVE_GRACEFUL_SECONDS for open requests (including streamed generations). It
+then waits up to JOB_DRAIN_SECONDS for queued jobs and batches it is running.
+
+Usage: python serve.py
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+import logs
+
+load_dotenv()
+
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")  # 0.0.0.0 to accept outside connections
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))  # opt in to more in production; 0 = one per CPU core
+SERVE_GRACEFUL_SECONDS = float(os.getenv("SERVE_GRACEFUL_SECONDS", "150"))  # longer than a 120 s completion
+SERVE_RELOAD = os.getenv("SERVE_RELOAD", "0") == "1"  # development only, implies one worker
+
+SHARED_STORES = ("USER_STORE_BACKEND", "ROADMAP_CACHE_BACKEND", "VIDEO_CACHE_BACKEND")
+
+logger = logs.get_logger(__name__)
+
+
+def worker_count() -> int:
+    if SERVE_RELOAD:
+        return 1
+    return SERVE_WORKERS or os.cpu_count() or 1
+
+
+def configure_workers(workers: int):
+    """Set the environment every worker process starts with (they inherit it, then import agent_orchestra)"""
+    os.environ["SERVE_WORKER_PROCESSES"] = str(workers)
+    if workers == 1:
+        return
+    if os.environ.get("USER_STORE_BACKEND") == "memory":
+        raise SystemExit("USER_STORE_BACKEND=memory can't be shared between worker processes; use sqlite or SERVE_WORKERS=1")
+    for name in SHARED_STORES:
+        os.environ.setdefault(name, "sqlite")
+
+    # Budgets each process enforces on its own but that are really per account
+    import batch_jobs
+    import groq_scheduler
+    totals = {
+        "GROQ_REQUESTS_PER_MINUTE": groq_scheduler.GROQ_REQUESTS_PER_MINUTE,
+        "GROQ_TOKENS_PER_MINUTE": groq_scheduler.GROQ_TOKENS_PER_MINUTE,
+        "BATCH_TOKENS_PER_MINUTE": batch_jobs.BATCH_TOKENS_PER_MINUTE
+    }
+    for name, total in totals.items():
+        # 0 means no limit, and stays that way
+        os.environ[name] = str(max(1, total // workers) if total else 0)
+
+
+def prepare_stores():
+    """Create the SQLite schemas and run migrations once, before workers race to do it"""
+    from storage import create_user_store
+    from job_queue import JobQueue
+    create_user_store().close()
+    JobQueue().close()
+
+
+def main():
+    logs.configure()
+    workers = worker_count()
+    configure_workers(workers)
+    prepare_stores()
+
+    import uvicorn
+    logger.info("Serving agent_orchestra", extra={"url": f"http://{SERVE_HOST}:{SERVE_PORT}", "workers": workers})
+    if workers > 1:
+        logger.warning("/metrics is disabled with more than one worker; use SERVE_WORKERS=1 to scrape it")
+    uvicorn.run(
+        "agent_orchestra:app",
+        host=SERVE_HOST,
+        port=SERVE_PORT,
+        workers=workers,
+        reload=SERVE_RELOAD,
+        timeout_graceful_shutdown=SERVE_GRACEFUL_SECONDS,
+        log_level=os.getenv("LOG_LEVEL", "info").lower()
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
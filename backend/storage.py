@@ -0,0 +1,562 @@
+# backend/storage.py
+import os
+import sys
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+from task_index import TaskIndex
+from compact_roadmap import CompactRoadmap
+
+USER_STORE_BACKEND = os.getenv("USER_STORE_BACKEND", "memory")  # memory | sqlite
+USER_STORE_PATH = os.getenv("USER_STORE_PATH", os.path.join(os.path.dirname(__file__), "navipro.db"))
+USER_STORE_COMPACT = os.getenv("USER_STORE_COMPACT", "1") == "1"  # memory backend only
+USER_STORE_SIZE_SAMPLE = int(os.getenv("USER_STORE_SIZE_SAMPLE", "20"))  # users deep-sized per memory estimate
+
+# Keys the normalized tables store in their own columns; anything else the LLM
+# adds is kept in the row's "extra" JSON so roadmaps round-trip unchanged.
+_ROADMAP_KEYS = {"roadmap", "progress"}
+_PROGRESS_KEYS = ("current_day", "current_week", "current_month", "total_tasks_completed", "start_date")
+_MONTH_KEYS = {"month", "month_title", "weeks"}
+_WEEK_KEYS = {"week", "week_number", "focus", "daily_tasks", "week_id", "completed"}
+_TASK_KEYS = {"day", "title", "description", "task_id", "completed", "completed_date", "estimated_time"}
+
+
+def deep_sizeof(obj) -> int:
+    """sys.getsizeof of obj and everything reachable through containers, __dict__ and __slots__ (shared objects once)"""
+    seen, stack, total = set(), [obj], 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or item is None:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        if hasattr(item, "__dict__"):
+            stack.append(item.__dict__)
+        for slot in getattr(type(item), "__slots__", ()):
+            stack.append(getattr(item, slot, None))
+    return total
+
+
+class UserStore(ABC):
+    """Storage interface for user roadmaps, progress and chat history"""
+
+    @abstractmethod
+    def create_user(self, user_id: str, roadmap: dict):
+        ...
+
+    @abstractmethod
+    def get_roadmap(self, user_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def has_user(self, user_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def count_users(self) -> int:
+        ...
+
+    def size_bytes(self) -> Optional[int]:
+        """Approximate bytes held by the store, for metrics (None if unknown)"""
+        return None
+
+    @abstractmethod
+    def get_task_index(self, user_id: str):
+        """Constant-time task lookup/completion/advance for one user (see TaskIndex), or None"""
+        ...
+
+    @abstractmethod
+    def get_chat_history(self, user_id: str, limit: Optional[int] = None) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def append_chat(self, user_id: str, entry: dict, keep: int = 20):
+        ...
+
+    @abstractmethod
+    def get_chat_summary(self, user_id: str) -> Optional[dict]:
+        """Rolling summary of older turns: {"summary", "covered_until"} or None"""
+        ...
+
+    @abstractmethod
+    def set_chat_summary(self, user_id: str, summary: str, covered_until: str):
+        ...
+
+    def close(self):
+        pass
+
+
+class MemoryUserStore(UserStore):
+    """Process-local dicts; state is lost on restart and not shared between workers.
+
+    With compact=True roadmaps are kept as CompactRoadmap (a fraction of the
+    nested-dict RSS) and only materialized as JSON when get_roadmap is called.
+    """
+
+    def __init__(self, compact: bool = True):
+        self.compact = compact
+        self._roadmaps: dict[str, dict] = {}
+        self._indexes: dict = {}
+        self._chats: dict[str, list] = {}
+        self._summaries: dict[str, dict] = {}
+
+    def create_user(self, user_id: str, roadmap: dict):
+        if self.compact:
+            self._indexes[user_id] = CompactRoadmap(roadmap)
+        else:
+            self._roadmaps[user_id] = roadmap
+            self._indexes[user_id] = TaskIndex(roadmap)
+
+    def get_roadmap(self, user_id: str) -> Optional[dict]:
+        if self.compact:
+            index = self._indexes.get(user_id)
+            return index.to_dict() if index is not None else None
+        return self._roadmaps.get(user_id)
+
+    def has_user(self, user_id: str) -> bool:
+        return user_id in self._indexes
+
+    def count_users(self) -> int:
+        return len(self._indexes)
+
+    def size_bytes(self) -> Optional[int]:
+        # Deep-sizing every user would walk millions of objects per scrape; extrapolate from a sample
+        user_ids = list(self._indexes)
+        if not user_ids:
+            return 0
+        step = max(1, len(user_ids) // USER_STORE_SIZE_SAMPLE)
+        sample = user_ids[::step][:USER_STORE_SIZE_SAMPLE]
+        sampled = deep_sizeof([
+            (self._indexes.get(u), self._roadmaps.get(u), self._chats.get(u), self._summaries.get(u)) for u in sample
+        ])
+        return int(sampled / len(sample) * len(user_ids))
+
+    def get_task_index(self, user_id: str):
+        return self._indexes.get(user_id)
+
+    def get_chat_history(self, user_id: str, limit: Optional[int] = None) -> list[dict]:
+        history = self._chats.get(user_id, [])
+        return list(history[-limit:] if limit else history)
+
+    def append_chat(self, user_id: str, entry: dict, keep: int = 20):
+        history = self._chats.setdefault(user_id, [])
+        history.append(entry)
+        if len(history) > keep:
+            self._chats[user_id] = history[-keep:]
+
+    def get_chat_summary(self, user_id: str) -> Optional[dict]:
+        summary = self._summaries.get(user_id)
+        return dict(summary) if summary else None
+
+    def set_chat_summary(self, user_id: str, summary: str, covered_until: str):
+        self._summaries[user_id] = {"summary": summary, "covered_until": covered_until}
+
+
+class SQLiteUserStore(UserStore):
+    """SQLite (WAL) store with normalized month/week/task tables.
+
+    Safe to share between several worker processes pointing at the same file;
+    each thread gets its own connection.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY,
+        meta TEXT NOT NULL,
+        current_month INTEGER NOT NULL DEFAULT 1,
+        current_week INTEGER NOT NULL DEFAULT 1,
+        current_day INTEGER NOT NULL DEFAULT 1,
+        total_tasks_completed INTEGER NOT NULL DEFAULT 0,
+        total_tasks INTEGER NOT NULL DEFAULT 0,
+        cursor INTEGER,
+        start_date TEXT,
+        progress_extra TEXT NOT NULL DEFAULT '{}',
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS months (
+        user_id TEXT NOT NULL,
+        month_pos INTEGER NOT NULL,
+        month INTEGER,
+        month_title TEXT,
+        extra TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (user_id, month_pos)
+    );
+    CREATE TABLE IF NOT EXISTS weeks (
+        user_id TEXT NOT NULL,
+        month_pos INTEGER NOT NULL,
+        week_pos INTEGER NOT NULL,
+        week INTEGER,
+        week_number INTEGER,
+        focus TEXT,
+        week_id TEXT,
+        completed INTEGER NOT NULL DEFAULT 0,
+        extra TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (user_id, month_pos, week_pos)
+    );
+    CREATE TABLE IF NOT EXISTS tasks (
+        user_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        month_pos INTEGER NOT NULL,
+        week_pos INTEGER NOT NULL,
+        day INTEGER,
+        task_id TEXT,
+        title TEXT,
+        description TEXT,
+        estimated_time TEXT,
+        completed INTEGER NOT NULL DEFAULT 0,
+        completed_date TEXT,
+        extra TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (user_id, position)
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_user_task ON tasks(user_id, task_id);
+    CREATE INDEX IF NOT EXISTS idx_tasks_task ON tasks(task_id);
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        user_message TEXT NOT NULL,
+        assistant_message TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_chat_user ON chat_messages(user_id, id);
+    CREATE TABLE IF NOT EXISTS chat_summaries (
+        user_id TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        covered_until TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        # Databases created before the task index columns existed
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        if "total_tasks" not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN total_tasks INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE users SET total_tasks = (SELECT COUNT(*) FROM tasks WHERE tasks.user_id = users.user_id)")
+        if "cursor" not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN cursor INTEGER")
+            conn.execute(
+                "UPDATE users SET cursor = (SELECT MIN(position) FROM tasks WHERE tasks.user_id = users.user_id AND completed = 0)"
+            )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def create_user(self, user_id: str, roadmap: dict):
+        progress = roadmap.get("progress", {})
+        meta = {k: v for k, v in roadmap.items() if k not in _ROADMAP_KEYS}
+        month_rows, week_rows, task_rows = [], [], []
+        position = 0
+        cursor = None
+        for month_pos, month in enumerate(roadmap.get("roadmap", []), 1):
+            month_rows.append((
+                user_id, month_pos, month.get("month"), month.get("month_title"),
+                json.dumps({k: v for k, v in month.items() if k not in _MONTH_KEYS})
+            ))
+            for week_pos, week in enumerate(month.get("weeks", []), 1):
+                week_rows.append((
+                    user_id, month_pos, week_pos, week.get("week"), week.get("week_number"),
+                    week.get("focus"), week.get("week_id"), int(bool(week.get("completed", False))),
+                    json.dumps({k: v for k, v in week.items() if k not in _WEEK_KEYS})
+                ))
+                for task in week.get("daily_tasks", []):
+                    if (month.get("month"), week.get("week"), task.get("day")) == (
+                        progress.get("current_month", 1), progress.get("current_week", 1), progress.get("current_day", 1)
+                    ):
+                        cursor = position
+                    task_rows.append((
+                        user_id, position, month_pos, week_pos, task.get("day"), task.get("task_id"),
+                        task.get("title"), task.get("description"), task.get("estimated_time"),
+                        int(bool(task.get("completed", False))), task.get("completed_date"),
+                        json.dumps({k: v for k, v in task.items() if k not in _TASK_KEYS})
+                    ))
+                    position += 1
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO users (user_id, meta, current_month, current_week, current_day, total_tasks_completed, "
+                "total_tasks, cursor, start_date, progress_extra, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id, json.dumps(meta),
+                    progress.get("current_month", 1), progress.get("current_week", 1), progress.get("current_day", 1),
+                    progress.get("total_tasks_completed", 0), len(task_rows), cursor, progress.get("start_date"),
+                    json.dumps({k: v for k, v in progress.items() if k not in _PROGRESS_KEYS}),
+                    datetime.now().isoformat()
+                )
+            )
+            conn.executemany("INSERT INTO months VALUES (?, ?, ?, ?, ?)", month_rows)
+            conn.executemany("INSERT INTO weeks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", week_rows)
+            conn.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", task_rows)
+
+    def get_roadmap(self, user_id: str) -> Optional[dict]:
+        conn = self._conn()
+        user = conn.execute(
+            "SELECT meta, current_month, current_week, current_day, total_tasks_completed, start_date, progress_extra "
+            "FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if user is None:
+            return None
+
+        months = []
+        for month_pos, month_num, title, extra in conn.execute(
+            "SELECT month_pos, month, month_title, extra FROM months WHERE user_id = ? ORDER BY month_pos", (user_id,)
+        ):
+            months.append({"month": month_num, "month_title": title, "weeks": [], **json.loads(extra)})
+
+        for month_pos, week_num, week_number, focus, week_id, completed, extra in conn.execute(
+            "SELECT month_pos, week, week_number, focus, week_id, completed, extra FROM weeks "
+            "WHERE user_id = ? ORDER BY month_pos, week_pos", (user_id,)
+        ):
+            months[month_pos - 1]["weeks"].append({
+                "week": week_num, "week_number": week_number, "focus": focus, "daily_tasks": [],
+                **json.loads(extra), "week_id": week_id, "completed": bool(completed)
+            })
+
+        for month_pos, week_pos, day, task_id, title, description, estimated_time, completed, completed_date, extra in conn.execute(
+            "SELECT month_pos, week_pos, day, task_id, title, description, estimated_time, completed, completed_date, extra "
+            "FROM tasks WHERE user_id = ? ORDER BY position", (user_id,)
+        ):
+            task = {"day": day, "title": title, "description": description, **json.loads(extra),
+                    "task_id": task_id, "completed": bool(completed), "completed_date": completed_date}
+            if estimated_time is not None:
+                task["estimated_time"] = estimated_time
+            months[month_pos - 1]["weeks"][week_pos - 1]["daily_tasks"].append(task)
+
+        meta, current_month, current_week, current_day, total, start_date, progress_extra = user
+        return {
+            "roadmap": months,
+            **json.loads(meta),
+            "progress": {
+                "current_day": current_day,
+                "current_week": current_week,
+                "current_month": current_month,
+                "total_tasks_completed": total,
+                "start_date": start_date,
+                **json.loads(progress_extra)
+            }
+        }
+
+    def has_user(self, user_id: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def count_users(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def size_bytes(self) -> Optional[int]:
+        conn = self._conn()
+        size = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+        wal = self.path + "-wal"
+        return size + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+    def get_task_index(self, user_id: str) -> Optional["SQLiteTaskIndex"]:
+        row = self._conn().execute(
+            "SELECT meta, current_month, current_week, current_day, total_tasks_completed, start_date, progress_extra, "
+            "total_tasks, cursor FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return SQLiteTaskIndex(self, user_id, row) if row else None
+
+    def get_chat_history(self, user_id: str, limit: Optional[int] = None) -> list[dict]:
+        rows = self._conn().execute(
+            "SELECT user_message, assistant_message, timestamp FROM chat_messages "
+            "WHERE user_id = ? ORDER BY id DESC LIMIT ?", (user_id, limit if limit else -1)
+        ).fetchall()
+        return [{"user": u, "assistant": a, "timestamp": t} for u, a, t in reversed(rows)]
+
+    def append_chat(self, user_id: str, entry: dict, keep: int = 20):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO chat_messages (user_id, user_message, assistant_message, timestamp) VALUES (?, ?, ?, ?)",
+                (user_id, entry["user"], entry["assistant"], entry["timestamp"])
+            )
+            conn.execute(
+                "DELETE FROM chat_messages WHERE user_id = ? AND id NOT IN ("
+                "SELECT id FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                (user_id, user_id, keep)
+            )
+
+    def get_chat_summary(self, user_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT summary, covered_until FROM chat_summaries WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return {"summary": row[0], "covered_until": row[1]} if row else None
+
+    def set_chat_summary(self, user_id: str, summary: str, covered_until: str):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_summaries (user_id, summary, covered_until, updated_at) VALUES (?, ?, ?, ?)",
+                (user_id, summary, covered_until, datetime.now().isoformat())
+            )
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SQLiteTaskIndex:
+    """TaskIndex over the SQLite tables: every operation is a primary-key or index lookup.
+
+    mark_completed and advance take the write lock up front (BEGIN IMMEDIATE) and
+    advance starts from the stored cursor, not this snapshot's, so workers
+    completing tasks for the same user can't write conflicting cursors.
+    """
+
+    def __init__(self, store: SQLiteUserStore, user_id: str, row: tuple):
+        meta, current_month, current_week, current_day, total_completed, start_date, progress_extra, total, cursor = row
+        self._store = store
+        self.user_id = user_id
+        self.meta = json.loads(meta)
+        self.progress = {
+            "current_day": current_day,
+            "current_week": current_week,
+            "current_month": current_month,
+            "total_tasks_completed": total_completed,
+            "start_date": start_date,
+            **json.loads(progress_extra)
+        }
+        self.total = total
+        self.completed = total_completed
+        self.cursor = cursor if current_day != -1 else None
+
+    def _task_row(self, pos: int):
+        return self._store._conn().execute(
+            "SELECT t.day, t.title, t.description, t.extra, t.task_id, t.completed, t.completed_date, t.estimated_time, "
+            "w.week, w.focus, m.month FROM tasks t "
+            "JOIN weeks w ON w.user_id = t.user_id AND w.month_pos = t.month_pos AND w.week_pos = t.week_pos "
+            "JOIN months m ON m.user_id = t.user_id AND m.month_pos = t.month_pos "
+            "WHERE t.user_id = ? AND t.position = ?", (self.user_id, pos)
+        ).fetchone()
+
+    def current(self) -> Optional[int]:
+        if self.cursor is None:
+            return None
+        row = self._store._conn().execute(
+            "SELECT completed FROM tasks WHERE user_id = ? AND position = ?", (self.user_id, self.cursor)
+        ).fetchone()
+        return self.cursor if row and not row[0] else None
+
+    def task_at(self, pos: int) -> dict:
+        day, title, description, extra, task_id, completed, completed_date, estimated_time = self._task_row(pos)[:8]
+        task = {"day": day, "title": title, "description": description, **json.loads(extra),
+                "task_id": task_id, "completed": bool(completed), "completed_date": completed_date}
+        if estimated_time is not None:
+            task["estimated_time"] = estimated_time
+        return task
+
+    def week_at(self, pos: int) -> dict:
+        row = self._task_row(pos)
+        return {"week": row[8], "focus": row[9]}
+
+    def week_focus(self, month: int, week: int) -> Optional[str]:
+        row = self._store._conn().execute(
+            "SELECT w.focus FROM weeks w JOIN months m ON m.user_id = w.user_id AND m.month_pos = w.month_pos "
+            "WHERE w.user_id = ? AND m.month = ? AND w.week = ?", (self.user_id, month, week)
+        ).fetchone()
+        return row[0] if row else None
+
+    def week_after(self, pos: int) -> Optional[dict]:
+        row = self._store._conn().execute(
+            "SELECT w.week, w.focus FROM tasks t JOIN weeks w ON w.user_id = t.user_id "
+            "AND (w.month_pos > t.month_pos OR (w.month_pos = t.month_pos AND w.week_pos > t.week_pos)) "
+            "WHERE t.user_id = ? AND t.position = ? ORDER BY w.month_pos, w.week_pos LIMIT 1", (self.user_id, pos)
+        ).fetchone()
+        return {"week": row[0], "focus": row[1]} if row else None
+
+    def position_of(self, task_id: str) -> Optional[int]:
+        row = self._store._conn().execute(
+            "SELECT position FROM tasks WHERE user_id = ? AND task_id = ?", (self.user_id, task_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark_completed(self, pos: int, completed_date: str) -> bool:
+        conn = self._store._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE tasks SET completed = 1, completed_date = ? WHERE user_id = ? AND position = ? AND completed = 0",
+                (completed_date, self.user_id, pos)
+            ).rowcount
+            if updated:
+                conn.execute(
+                    "UPDATE users SET total_tasks_completed = total_tasks_completed + 1 WHERE user_id = ?", (self.user_id,)
+                )
+            self.completed = conn.execute(
+                "SELECT total_tasks_completed FROM users WHERE user_id = ?", (self.user_id,)
+            ).fetchone()[0]
+        self.progress["total_tasks_completed"] = self.completed
+        return bool(updated)
+
+    def advance(self):
+        conn = self._store._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor, current_month, current_week, current_day = conn.execute(
+                "SELECT cursor, current_month, current_week, current_day FROM users WHERE user_id = ?", (self.user_id,)
+            ).fetchone()
+            if cursor is not None and current_day != -1:
+                start = cursor + 1
+            else:
+                # The rest of the current week, as in TaskIndex._resume_from
+                first, last = conn.execute(
+                    "SELECT MIN(CASE WHEN t.day > ? THEN t.position END), MAX(t.position) FROM tasks t "
+                    "JOIN weeks w ON w.user_id = t.user_id AND w.month_pos = t.month_pos AND w.week_pos = t.week_pos "
+                    "JOIN months m ON m.user_id = t.user_id AND m.month_pos = t.month_pos "
+                    "WHERE t.user_id = ? AND m.month = ? AND w.week = ?",
+                    (current_day, self.user_id, current_month, current_week)
+                ).fetchone()
+                start = first if first is not None else (last + 1 if last is not None else self.total)
+            row = conn.execute(
+                "SELECT t.position, m.month, w.week, t.day FROM tasks t "
+                "JOIN weeks w ON w.user_id = t.user_id AND w.month_pos = t.month_pos AND w.week_pos = t.week_pos "
+                "JOIN months m ON m.user_id = t.user_id AND m.month_pos = t.month_pos "
+                "WHERE t.user_id = ? AND t.position >= ? AND t.completed = 0 ORDER BY t.position LIMIT 1",
+                (self.user_id, start)
+            ).fetchone()
+            if row is None:
+                # If no more tasks, mark as completed
+                self.cursor = None
+                self.progress["current_day"] = -1
+                conn.execute("UPDATE users SET cursor = NULL, current_day = -1 WHERE user_id = ?", (self.user_id,))
+                return
+            self.cursor, month, week, day = row
+            self.progress.update({"current_month": month, "current_week": week, "current_day": day})
+            conn.execute(
+                "UPDATE users SET cursor = ?, current_month = ?, current_week = ?, current_day = ? WHERE user_id = ?",
+                (self.cursor, month, week, day, self.user_id)
+            )
+
+
+def create_user_store() -> UserStore:
+    """Build the store configured by USER_STORE_BACKEND / USER_STORE_PATH"""
+    if USER_STORE_BACKEND == "sqlite":
+        return SQLiteUserStore(USER_STORE_PATH)
+    return MemoryUserStore(compact=USER_STORE_COMPACT)
@@ -0,0 +1,118 @@
+# backend/task_index.py
+from typing import Optional
+
+
+class TaskIndex:
+    """Flat, ordered view over an enhanced roadmap for constant-time task lookups.
+
+    Holds references into the roadmap dict, so completing a task here also
+    updates the roadmap the API returns. Positions count tasks in roadmap
+    order (month, week, day).
+    """
+
+    def __init__(self, roadmap: dict):
+        self.meta = roadmap
+        self.progress = roadmap.setdefault("progress", {})
+        self.tasks: list[dict] = []
+        self.task_weeks: list[dict] = []
+        self.task_months: list[int] = []
+        self.positions: dict[str, int] = {}
+        self._weeks: dict[tuple, dict] = {}
+        self.completed = 0
+
+        for month in roadmap.get("roadmap", []):
+            for week in month.get("weeks", []):
+                self._weeks[(month["month"], week["week"])] = week
+                for task in week.get("daily_tasks", []):
+                    self.positions[task["task_id"]] = len(self.tasks)
+                    self.tasks.append(task)
+                    self.task_weeks.append(week)
+                    self.task_months.append(month["month"])
+                    if task.get("completed", False):
+                        self.completed += 1
+
+        # "Next incomplete" cursor: position of the task the progress points at
+        self.cursor = self._locate(
+            self.progress.get("current_month", 1),
+            self.progress.get("current_week", 1),
+            self.progress.get("current_day", 1)
+        )
+
+    @property
+    def total(self) -> int:
+        return len(self.tasks)
+
+    def _locate(self, month: int, week: int, day: int) -> Optional[int]:
+        week_data = self._weeks.get((month, week))
+        if week_data is None:
+            return None
+        for task in week_data.get("daily_tasks", []):
+            if task["day"] == day:
+                return self.positions.get(task["task_id"])
+        return None
+
+    def current(self) -> Optional[int]:
+        """Position of the current task, or None once everything is done"""
+        if self.cursor is None or self.tasks[self.cursor].get("completed", False):
+            return None
+        return self.cursor
+
+    def task_at(self, pos: int) -> dict:
+        return self.tasks[pos]
+
+    def week_at(self, pos: int) -> dict:
+        return self.task_weeks[pos]
+
+    def week_focus(self, month: int, week: int) -> Optional[str]:
+        week_data = self._weeks.get((month, week))
+        return week_data["focus"] if week_data else None
+
+    def week_after(self, pos: int) -> Optional[dict]:
+        """The week following the one that holds the task at pos, if any"""
+        week = self.task_weeks[pos]
+        while pos < self.total and self.task_weeks[pos] is week:
+            pos += 1
+        return self.task_weeks[pos] if pos < self.total else None
+
+    def position_of(self, task_id: str) -> Optional[int]:
+        return self.positions.get(task_id)
+
+    def mark_completed(self, pos: int, completed_date: str) -> bool:
+        """Mark the task at pos completed; False if it already was"""
+        task = self.tasks[pos]
+        if task.get("completed", False):
+            return False
+        task["completed"] = True
+        task["completed_date"] = completed_date
+        self.completed += 1
+        self.progress["total_tasks_completed"] = self.progress.get("total_tasks_completed", 0) + 1
+        return True
+
+    def _resume_from(self) -> int:
+        """Where advance scans from without a cursor (current_day -1 once the tasks after
+        it were done): the rest of the current week, as the linear scan did"""
+        week = self._weeks.get((self.progress.get("current_month", 1), self.progress.get("current_week", 1)))
+        if week is None or not week.get("daily_tasks"):
+            return self.total
+        current_day = self.progress.get("current_day", 1)
+        for task in week["daily_tasks"]:
+            if task["day"] > current_day:
+                return self.positions[task["task_id"]]
+        return self.positions[week["daily_tasks"][-1]["task_id"]] + 1
+
+    def advance(self):
+        """Move the cursor to the next incomplete task after the current one"""
+        pos = (self.cursor + 1) if self.cursor is not None else self._resume_from()
+        while pos < self.total and self.tasks[pos].get("completed", False):
+            pos += 1
+
+        if pos >= self.total:
+            # If no more tasks, mark as completed
+            self.progress["current_day"] = -1
+            self.cursor = None
+            return
+
+        self.cursor = pos
+        self.progress["current_month"] = self.task_months[pos]
+        self.progress["current_week"] = self.task_weeks[pos]["week"]
+        self.progress["current_day"] = self.tasks[pos]["day"]
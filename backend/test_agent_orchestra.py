@@ -0,0 +1,136 @@
+# backend/test_agent_orchestra.py
+"""Roadmap generation and request handling edge cases. Run from backend/: python -m pytest -q"""
+import asyncio
+import copy
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+import agent_orchestra
+import logs
+from agent_orchestra import FullPipelineReq
+
+
+def month(num: int) -> dict:
+    return {
+        "month": num,
+        "month_title": f"Month {num} title",
+        "weeks": [{
+            "week": week,
+            "week_number": week,
+            "focus": f"Focus {num}.{week}",
+            "daily_tasks": [{"day": day, "title": f"Task {day}", "description": "Do it"} for day in range(1, 7)]
+        } for week in range(1, 5)]
+    }
+
+
+def completion(content) -> dict:
+    return {"choices": [{"message": {"content": content}, "finish_reason": "stop"}]}
+
+
+@pytest.mark.parametrize("reply", [
+    completion(json.dumps({"months": [month(2)]})),  # wrong key
+    completion(json.dumps(month(2))),  # a bare month instead of {"roadmap": [...]}
+    completion('{"roadmap": "month 2 coming soon"}'),
+    completion("Sorry, I can't continue."),
+    completion(None),
+    {"error": "no choices"}
+])
+def test_continuation_without_roadmap_keeps_partial(monkeypatch, reply):
+    calls = []
+
+    async def chat_completion(payload, timeout=120.0, **kwargs):
+        calls.append(payload)
+        return reply
+
+    monkeypatch.setattr(agent_orchestra.groq_client, "chat_completion", chat_completion)
+    req = FullPipelineReq(goal="Web developer", target_role="Frontend", timeframe="3_months")
+    partial = {"roadmap": [month(1)]}
+
+    result = asyncio.run(agent_orchestra.continue_roadmap(copy.deepcopy(partial), req))
+
+    assert result == partial
+    assert len(calls) == 1
+
+
+class RecordRequestIds(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.getMessage(), logs.request_id()))
+
+
+def test_streamed_response_logs_carry_request_id(monkeypatch):
+    async def failing_stream(payload, timeout=120.0, **kwargs):
+        raise RuntimeError("upstream went away")
+        yield
+
+    monkeypatch.setattr(agent_orchestra, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(agent_orchestra.groq_client, "stream_chat_completion", failing_stream)
+    handler = RecordRequestIds()
+    logger = logging.getLogger(logs.ROOT_LOGGER)
+    logger.addHandler(handler)
+    try:
+        # No lifespan: the job workers and stores aren't needed here
+        client = TestClient(agent_orchestra.app)
+        response = client.post(
+            "/api/generate_roadmap/stream",
+            json={"goal": "Stream test", "target_role": "Frontend", "timeframe": "3_months"},
+            headers={"X-Request-ID": "stream-test-1"}
+        )
+    finally:
+        logger.removeHandler(handler)
+
+    assert response.headers["x-request-id"] == "stream-test-1"
+    assert '"type": "error"' in response.text
+    # Logged from inside the streamed body, after the response headers went out
+    assert ("Roadmap stream failed", "stream-test-1") in handler.records
+
+
+def test_repair_month_with_oversized_extra_week(monkeypatch):
+    async def repair_week(req, month, week_pos):
+        raise AssertionError(f"week {week_pos} needs no LLM repair")
+
+    monkeypatch.setattr(agent_orchestra, "repair_week", repair_week)
+    req = FullPipelineReq(goal="Web developer", target_role="Frontend", timeframe="3_months")
+    broken = month(1)
+    broken["weeks"].append({
+        "week": 5, "week_number": 5, "focus": "Focus 1.5",
+        "daily_tasks": [{"day": day, "title": f"Extra {day}", "description": "Do it"} for day in range(1, 9)]
+    })
+    defects = [
+        agent_orchestra.roadmap_defect("week_count", "5 weeks", month=1, expected=4, actual=5),
+        agent_orchestra.roadmap_defect("task_count", "8 tasks", month=1, week=5, expected=6, actual=8)
+    ]
+    assert agent_orchestra.is_repairable(defects)
+
+    asyncio.run(agent_orchestra.repair_month(req, broken, defects))
+
+    assert broken == month(1)
+
+
+def test_job_endpoints_answer_503_before_lifespan(monkeypatch):
+    monkeypatch.setattr(agent_orchestra, "GROQ_API_KEY", "test")
+    # No lifespan, so the job queue was never opened
+    client = TestClient(agent_orchestra.app)
+    responses = [
+        client.get("/api/health"),
+        client.get("/api/jobs/some-job"),
+        client.post("/api/roadmap_jobs", json={"goal": "Web developer", "target_role": "Frontend", "timeframe": "3_months"}),
+        client.get("/api/generate_roadmaps/batch/some-batch")
+    ]
+    assert [(r.status_code, r.json()["detail"]) for r in responses] == [(503, "Job queue not ready")] * 4
+
+
+def test_metrics_refused_with_several_workers(monkeypatch):
+    client = TestClient(agent_orchestra.app)
+    assert client.get("/metrics").status_code == 200
+
+    monkeypatch.setattr(agent_orchestra.metrics, "SERVE_WORKER_PROCESSES", 4)
+    response = client.get("/metrics")
+    assert response.status_code == 503
+    assert "SERVE_WORKERS=1" in response.json()["detail"]
@@ -0,0 +1,23 @@
+# backend/test_answer_cache.py
+"""Chat answer cache bounds. Run from backend/: python -m pytest -q"""
+from answer_cache import ChatAnswerCache
+
+
+def test_total_entries_bounded_across_partitions():
+    cache = ChatAnswerCache(max_entries=3, max_total=10)
+    for goal in range(20):
+        for topic in range(5):
+            cache.store((f"Goal {goal}", ""), f"Explain concept number {topic} in depth for goal {goal}", "answer")
+    stats = cache.stats()
+    assert stats["entries"] == 10
+    # The least recently used partitions were dropped, the newest are intact
+    assert stats["partitions"] == 4
+    assert cache.lookup(("Goal 19", ""), "Explain concept number 4 in depth for goal 19") == "answer"
+    assert cache.lookup(("Goal 0", ""), "Explain concept number 4 in depth for goal 0") is None
+
+
+def test_expired_partition_is_dropped():
+    cache = ChatAnswerCache(ttl=-1)
+    cache.store(("Goal", ""), "Explain closures in javascript", "answer")
+    assert cache.lookup(("Goal", ""), "Explain closures in javascript") is None
+    assert cache.stats()["partitions"] == 0 and cache.stats()["entries"] == 0
@@ -0,0 +1,23 @@
+# backend/test_compact_roadmap.py
+"""Compact roadmap shape/layout interning. Run from backend/: python -m pytest -q"""
+import compact_roadmap
+from compact_roadmap import CompactRoadmap
+from test_storage import small_roadmap
+
+
+def test_interned_layouts_are_bounded():
+    roadmaps = []
+    for i in range(compact_roadmap.COMPACT_LAYOUT_CACHE_SIZE + 50):
+        roadmap = small_roadmap(f"Goal {i}")
+        for week in roadmap["roadmap"][0]["weeks"]:
+            for task in week["daily_tasks"]:
+                task["task_id"] = f"{i}_{task['task_id']}"
+                task[f"extra_{i}"] = True
+        roadmaps.append((roadmap, CompactRoadmap(roadmap)))
+
+    assert compact_roadmap._interned_layout.cache_info().currsize <= compact_roadmap.COMPACT_LAYOUT_CACHE_SIZE
+    assert compact_roadmap._interned_shape.cache_info().currsize <= compact_roadmap.COMPACT_SHAPE_CACHE_SIZE
+    # Roadmaps built before their layout was evicted keep working
+    roadmap, compact = roadmaps[0]
+    assert compact.position_of("0_m1_w2_d1") == 3
+    assert compact.to_dict() == roadmap
@@ -0,0 +1,98 @@
+# backend/test_groq_scheduler.py
+"""Groq rate limiter: priorities, per-key turns and retry charging. Run from backend/: python -m pytest -q"""
+import asyncio
+
+import httpx
+import pytest
+
+import groq_client
+import groq_scheduler
+import resilience
+from groq_scheduler import GroqScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(groq_scheduler.time, "monotonic", clock)
+    return clock
+
+
+def grant_order(scheduler: GroqScheduler, clock: FakeClock, calls: list) -> list:
+    """Queue calls (priority, key) on an empty request bucket, then refill one request at a time"""
+    granted = []
+
+    async def call(priority: str, key: str):
+        await scheduler.acquire(1, priority, key)
+        granted.append((priority, key))
+
+    async def run():
+        scheduler.requests.level = 0
+        tasks = []
+        for priority, key in calls:
+            tasks.append(asyncio.create_task(call(priority, key)))
+            await asyncio.sleep(0)
+        for _ in calls:
+            clock.now += 1
+            with scheduler._lock:
+                scheduler._dispatch()
+            for _ in range(3):
+                await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    return granted
+
+
+def test_strict_priority(clock):
+    scheduler = GroqScheduler(requests_per_minute=60, tokens_per_minute=0)
+    granted = grant_order(scheduler, clock, [
+        ("batch", "job-1"), ("roadmap", "user-1"), ("interactive", "user-2"), ("batch", "job-2"), ("interactive", "user-3")
+    ])
+    assert [priority for priority, _ in granted] == ["interactive", "interactive", "roadmap", "batch", "batch"]
+
+
+def test_keys_take_turns_within_a_class(clock):
+    scheduler = GroqScheduler(requests_per_minute=60, tokens_per_minute=0)
+    granted = grant_order(scheduler, clock, [
+        ("batch", "job-a"), ("batch", "job-a"), ("batch", "job-a"), ("batch", "job-b"), ("batch", "job-c")
+    ])
+    assert [key for _, key in granted] == ["job-a", "job-b", "job-c", "job-a", "job-a"]
+
+
+def test_settle_refunds_unused_reservation(clock):
+    scheduler = GroqScheduler(requests_per_minute=0, tokens_per_minute=600)
+    ticket = asyncio.run(scheduler.acquire(500, "roadmap", "user-1"))
+    assert scheduler.tokens.level == 100
+    scheduler.settle(ticket, used_tokens=200, completion_tokens=150)
+    assert scheduler.tokens.level == 400
+
+
+def test_retries_are_charged(clock, monkeypatch):
+    scheduler = GroqScheduler(requests_per_minute=60, tokens_per_minute=6000)
+    monkeypatch.setattr(groq_scheduler, "scheduler", scheduler)
+    monkeypatch.setattr(groq_client, "GROQ_BASE_URL", "https://groq.test/openai/v1")
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: 0)
+    responses = [
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 300, "completion_tokens": 100}})
+    ]
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+    monkeypatch.setattr(groq_client, "get_client", lambda: client)
+    payload = {"messages": [{"role": "user", "content": "x" * 800}], "max_tokens": 500}
+    prompt = groq_scheduler.estimate_tokens(payload)[0]
+
+    asyncio.run(groq_client.chat_completion(payload, priority="interactive", key="user-1"))
+
+    # One granted request plus two retries; the ticket settles at its reported usage, each retry costs its prompt
+    assert scheduler.requests.level == 60 - 3
+    assert scheduler.tokens.level == 6000 - 300 - 2 * prompt
@@ -0,0 +1,95 @@
+# backend/test_job_queue.py
+"""Job queue leases and worker resilience. Run from backend/: python -m pytest -q"""
+import asyncio
+import sqlite3
+import time
+
+import job_queue
+from job_queue import JobQueue, start_job_workers, stop_job_workers
+
+
+def run_until_done(queue: JobQueue, handlers: dict, job_id: str, timeout: float = 5.0) -> dict:
+    async def run():
+        workers = start_job_workers(queue, handlers, workers=1)
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                job = await asyncio.to_thread(queue.get, job_id)
+                if job["status"] not in ("queued", "running"):
+                    return job
+                await asyncio.sleep(0.02)
+            raise AssertionError(f"job still {job['status']} after {timeout}s")
+        finally:
+            await stop_job_workers(queue, workers, drain_seconds=1)
+
+    return asyncio.run(run())
+
+
+def test_heartbeat_keeps_long_job_leased(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(job_queue, "JOB_HEARTBEAT_SECONDS", 0.05)
+    path = str(tmp_path / "jobs.db")
+    queue, other = JobQueue(path), JobQueue(path)
+    stolen = []
+
+    async def handler(job):
+        # Well past the first lease; another process polls for expired leases meanwhile
+        for _ in range(10):
+            await asyncio.sleep(0.1)
+            stolen.append(await asyncio.to_thread(other.claim))
+        return "done", {"ok": True}
+
+    try:
+        job_id = queue.enqueue("slow", {})
+        job = run_until_done(queue, {"slow": handler}, job_id)
+        assert stolen == [None] * 10
+        assert (job["status"], job["attempt"], job["result"]) == ("done", 1, {"ok": True})
+    finally:
+        queue.close()
+        other.close()
+
+
+def test_worker_that_lost_its_lease_cannot_overwrite(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", 0.05)
+    path = str(tmp_path / "jobs.db")
+    first, second = JobQueue(path), JobQueue(path)
+    try:
+        job_id = first.enqueue("slow", {})
+        stale = first.claim()
+        time.sleep(0.1)
+        current = second.claim()
+        assert current["job_id"] == job_id and current["attempt"] == 2
+
+        assert not first.renew(stale)
+        assert not first.complete(stale, "done", {"by": "first"})
+        assert not first.retry(stale, "boom", 0)
+        assert not first.release(stale)
+        assert second.complete(current, "done", {"by": "second"})
+        assert second.get(job_id)["result"] == {"by": "second"}
+    finally:
+        first.close()
+        second.close()
+
+
+def test_claim_error_does_not_stop_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_POLL_INTERVAL", 0.05)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    claim = queue.claim
+    failures = []
+
+    def flaky_claim():
+        if len(failures) < 3:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return claim()
+
+    async def handler(job):
+        return "done", {"ok": True}
+
+    monkeypatch.setattr(queue, "claim", flaky_claim)
+    try:
+        job_id = queue.enqueue("quick", {})
+        assert run_until_done(queue, {"quick": handler}, job_id)["status"] == "done"
+        assert len(failures) == 3
+    finally:
+        queue.close()
@@ -0,0 +1,204 @@
+# backend/test_resilience.py
+"""Retry, backoff, circuit breaking and load shedding for upstream calls. Run from backend/: python -m pytest -q"""
+import asyncio
+import threading
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, InflightLimit, Upstream, UpstreamBusyError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Delays call() slept for, without sleeping; backoff jitter at its maximum"""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(resilience.asyncio, "sleep", sleep)
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    return delays
+
+
+def replies(*responses):
+    """An upstream answering with responses in turn; returns (send, requests seen)"""
+    seen = []
+    queue = list(responses)
+
+    def handler(request):
+        seen.append(request)
+        return queue.pop(0)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return (lambda: client.get("https://upstream.test/v1")), seen
+
+
+def test_backoff_is_exponential_full_jitter_and_capped(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: (low, high))
+    assert [resilience.backoff_delay(attempt, base=0.5, cap=5) for attempt in range(5)] == [
+        (0, 0.5), (0, 1.0), (0, 2.0), (0, 4.0), (0, 5)
+    ]
+
+
+def test_retries_server_errors_with_backoff(sleeps):
+    send, seen = replies(*(httpx.Response(503) for _ in range(4)))
+    upstream = Upstream("test-backoff")
+
+    response = asyncio.run(upstream.call(send, retries=3))
+
+    assert response.status_code == 503
+    assert len(seen) == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_honours_retry_after(sleeps):
+    send, seen = replies(
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(429, headers={"Retry-After": "7"}),
+        httpx.Response(200, json={"ok": True})
+    )
+    response = asyncio.run(Upstream("test-retry-after").call(send))
+
+    assert response.status_code == 200
+    assert len(seen) == 3
+    assert sleeps == [2.0, 7.0]
+
+
+def test_gives_up_on_long_retry_after(sleeps):
+    send, seen = replies(
+        httpx.Response(429, headers={"Retry-After": str(resilience.UPSTREAM_RETRY_AFTER_MAX + 1)}),
+        httpx.Response(200)
+    )
+    response = asyncio.run(Upstream("test-long-retry-after").call(send))
+
+    assert response.status_code == 429
+    assert len(seen) == 1 and sleeps == []
+
+
+def test_retry_after_http_date(monkeypatch):
+    monkeypatch.setattr(resilience.time, "time", lambda: 1_700_000_000.0)
+    response = httpx.Response(503, headers={"Retry-After": formatdate(1_700_000_030.0, usegmt=True)})
+    assert resilience.retry_after_seconds(response) == 30.0
+    assert resilience.retry_after_seconds(httpx.Response(503, headers={"Retry-After": "soon"})) is None
+
+
+def test_breaker_opens_rejects_and_recovers_half_open(clock, sleeps):
+    upstream = Upstream("test-breaker")
+    upstream.breaker = CircuitBreaker("test-breaker", failure_threshold=2, reset_timeout=30)
+    send, seen = replies(httpx.Response(500), httpx.Response(500), httpx.Response(500), httpx.Response(200))
+
+    assert asyncio.run(upstream.call(send, retries=1)).status_code == 500
+    assert upstream.breaker.state == "open"
+    # Open: rejected without calling the upstream
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream.call(send))
+    assert len(seen) == 2
+
+    # Half-open: one trial goes through; it fails, so the circuit opens again
+    clock.now += 30
+    assert upstream.breaker.state == "half_open"
+    assert asyncio.run(upstream.call(send, retries=0)).status_code == 500
+    assert upstream.breaker.state == "open"
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream.call(send))
+
+    # The next trial succeeds and closes it
+    clock.now += 1
+    assert asyncio.run(upstream.call(send)).status_code == 200
+    assert upstream.breaker.state == "closed" and upstream.breaker.failures == 0
+    assert len(seen) == 4
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker("test-trial", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    # A trial that never reported back is replaced after another reset_timeout
+    clock.now += 30
+    breaker.check()
+
+
+def test_inflight_limit_queues_in_order_then_sheds():
+    limit = InflightLimit(limit=1, wait=0.5)
+    order = []
+
+    async def call(name: str, hold: float):
+        await limit.acquire("test")
+        order.append(name)
+        await asyncio.sleep(hold)
+        limit.release()
+
+    async def run():
+        await asyncio.gather(call("first", 0.05), call("second", 0.05), call("third", 0.05))
+        assert (limit.inflight, limit.waiting) == (0, 0)
+
+        # Nobody releases: the queued call is shed once its wait is over
+        await limit.acquire("test")
+        with pytest.raises(UpstreamBusyError):
+            await limit.acquire("test")
+        assert (limit.inflight, limit.waiting) == (1, 0)
+
+    asyncio.run(run())
+    assert order == ["first", "second", "third"]
+
+
+def test_inflight_limit_waits_the_configured_time_before_shedding(monkeypatch):
+    limit = InflightLimit(limit=1)
+    waited = []
+
+    async def wait_for(future, timeout):
+        waited.append(timeout)
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(resilience.asyncio, "wait_for", wait_for)
+
+    async def run():
+        await limit.acquire("test")
+        with pytest.raises(UpstreamBusyError, match="30s"):
+            await limit.acquire("test")
+
+    asyncio.run(run())
+    assert waited == [resilience.UPSTREAM_INFLIGHT_WAIT] == [30.0]
+
+
+def test_inflight_limit_hands_slots_to_threads():
+    limit = InflightLimit(limit=1, wait=5)
+    limit.acquire_sync("test")
+    acquired = threading.Event()
+
+    def worker():
+        limit.acquire_sync("test")
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limit.release()
+    assert acquired.wait(1)
+    thread.join()
+    assert (limit.inflight, limit.waiting) == (1, 0)
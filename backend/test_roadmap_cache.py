@@ -0,0 +1,56 @@
+# backend/test_roadmap_cache.py
+"""Roadmap template cache on the SQLite backend. Run from backend/: python -m pytest -q"""
+import asyncio
+import sqlite3
+import time
+
+from agent_orchestra import FullPipelineReq
+from cache_backends import SQLiteCacheBackend
+from roadmap_cache import RoadmapCache
+
+
+def test_sqlite_backend_single_flight(tmp_path):
+    cache = RoadmapCache(SQLiteCacheBackend(str(tmp_path / "cache.db"), table="roadmap_templates"))
+    req = FullPipelineReq(goal="Data analyst", target_role="Analyst", timeframe="3_months")
+    calls = []
+
+    async def generate(req):
+        calls.append(req)
+        await asyncio.sleep(0.05)
+        return {"roadmap": [{"month": 1}]}
+
+    async def run():
+        results = await asyncio.gather(*(cache.get_or_generate(req, generate) for _ in range(5)))
+        return results, await cache.peek(req)
+
+    results, cached = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"roadmap": [{"month": 1}]} for result in results)
+    assert cached == {"roadmap": [{"month": 1}]}
+
+
+def test_locked_sqlite_cache_does_not_block_event_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = RoadmapCache(SQLiteCacheBackend(path, table="roadmap_templates"))
+    req = FullPipelineReq(goal="Data analyst", target_role="Analyst", timeframe="3_months")
+    # Another worker process holding the write lock
+    blocker = sqlite3.connect(path, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def run() -> float:
+        asyncio.get_running_loop().call_later(0.5, blocker.commit)
+        put = asyncio.create_task(cache.put(req, {"roadmap": []}))
+        longest, last = 0.0, time.perf_counter()
+        while not put.done():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            longest, last = max(longest, now - last), now
+        await put
+        return longest
+
+    try:
+        longest = asyncio.run(run())
+        assert longest < 0.25, f"event loop stalled for {longest:.2f}s behind the SQLite lock"
+        assert asyncio.run(cache.peek(req)) == {"roadmap": []}
+    finally:
+        blocker.close()
@@ -0,0 +1,209 @@
+# backend/test_storage.py
+"""User stores: the interface, SQLite under concurrent writers. Run from backend/: python -m pytest -q"""
+import asyncio
+import copy
+import random
+import sqlite3
+import time
+
+import pytest
+
+import agent_orchestra
+from storage import MemoryUserStore, SQLiteUserStore, UserStore
+
+
+def small_roadmap(goal: str) -> dict:
+    return {
+        "goal": goal,
+        "roadmap": [{
+            "month": 1,
+            "month_title": "Basics",
+            "weeks": [{
+                "week": week,
+                "focus": f"Topic {week}",
+                "daily_tasks": [{"day": day, "title": f"Task {week}.{day}", "task_id": f"m1_w{week}_d{day}"} for day in range(1, 4)]
+            } for week in range(1, 3)]
+        }],
+        "progress": {"current_month": 1, "current_week": 1, "current_day": 1, "total_tasks_completed": 0}
+    }
+
+
+def test_concurrent_writers(tmp_path):
+    # Two stores on one file stand in for two worker processes
+    path = str(tmp_path / "navipro.db")
+    stores = [SQLiteUserStore(path), SQLiteUserStore(path)]
+    users, turns = 40, 5
+
+    def write(i: int):
+        store = stores[i % 2]
+        user_id = f"user-{i}"
+        store.create_user(user_id, small_roadmap(f"Goal {i}"))
+        for turn in range(turns):
+            store.append_chat(user_id, {"user": f"q{turn}", "assistant": f"a{turn}", "timestamp": str(turn)}, keep=3)
+        store.set_chat_summary(user_id, f"summary {i}", str(turns - 1))
+
+    async def run():
+        await asyncio.gather(*(asyncio.to_thread(write, i) for i in range(users)))
+
+    try:
+        asyncio.run(run())
+        for store in stores:
+            assert store.count_users() == users
+        for i in range(users):
+            store = stores[(i + 1) % 2]
+            assert [t["user"] for t in store.get_chat_history(f"user-{i}")] == ["q2", "q3", "q4"]
+            assert store.get_chat_summary(f"user-{i}")["summary"] == f"summary {i}"
+            assert store.get_task_index(f"user-{i}").total == 6
+    finally:
+        for store in stores:
+            store.close()
+
+
+def test_locked_database_does_not_block_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "navipro.db")
+    store = SQLiteUserStore(path)
+    store.create_user("user-1", small_roadmap("Goal"))
+    monkeypatch.setattr(agent_orchestra, "user_store", store)
+
+    # Another process holding the write lock, as under WAL contention between workers
+    blocker = sqlite3.connect(path, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def run() -> float:
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.5, blocker.commit)
+        save = asyncio.create_task(agent_orchestra.save_chat_turn("user-1", "hello", "hi"))
+        longest, last = 0.0, time.perf_counter()
+        while not save.done():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            longest, last = max(longest, now - last), now
+        await save
+        await asyncio.gather(*agent_orchestra._summary_tasks)
+        return longest
+
+    try:
+        longest = asyncio.run(run())
+        assert longest < 0.25, f"event loop stalled for {longest:.2f}s behind the SQLite lock"
+        assert [t["user"] for t in store.get_chat_history("user-1")] == ["hello"]
+    finally:
+        blocker.close()
+        store.close()
+
+
+def two_month_roadmap() -> dict:
+    roadmap = small_roadmap("Goal")
+    second = copy.deepcopy(roadmap["roadmap"][0])
+    second["month"] = 2
+    for week in second["weeks"]:
+        for task in week["daily_tasks"]:
+            task["task_id"] = task["task_id"].replace("m1_", "m2_")
+    roadmap["roadmap"].append(second)
+    return roadmap
+
+
+def linear_scan_complete(roadmap: dict, task_id: str):
+    """mark_task_completed/advance_to_next_task as they were before the task index"""
+    for month in roadmap["roadmap"]:
+        for week in month["weeks"]:
+            for task in week["daily_tasks"]:
+                if task["task_id"] == task_id:
+                    task["completed"] = True
+                    progress = roadmap["progress"]
+                    progress["total_tasks_completed"] = progress.get("total_tasks_completed", 0) + 1
+                    current_month, current_week, current_day = progress["current_month"], progress["current_week"], progress["current_day"]
+                    for m in roadmap["roadmap"]:
+                        if m["month"] >= current_month:
+                            for w in m["weeks"]:
+                                if m["month"] > current_month or w["week"] >= current_week:
+                                    for t in w["daily_tasks"]:
+                                        if (m["month"] > current_month or w["week"] > current_week or t["day"] > current_day) \
+                                                and not t.get("completed", False):
+                                            progress.update(current_month=m["month"], current_week=w["week"], current_day=t["day"])
+                                            return
+                    progress["current_day"] = -1
+                    return
+
+
+def completion_orders() -> dict:
+    task_ids = [task["task_id"] for month in two_month_roadmap()["roadmap"] for week in month["weeks"] for task in week["daily_tasks"]]
+    shuffled = list(task_ids)
+    random.Random(7).shuffle(shuffled)
+    return {
+        "in_order": task_ids,
+        "last_first": task_ids[-1:] + task_ids[:-1],
+        "skip_ahead": task_ids[4:7] + task_ids[:4] + task_ids[7:],
+        "reversed": task_ids[::-1],
+        "shuffled": shuffled
+    }
+
+
+@pytest.mark.parametrize("order", list(completion_orders()))
+@pytest.mark.parametrize("backend", ["dict", "compact", "sqlite"])
+def test_task_index_matches_linear_scan(tmp_path, backend, order):
+    stores = {
+        "dict": lambda: MemoryUserStore(compact=False),
+        "compact": lambda: MemoryUserStore(compact=True),
+        "sqlite": lambda: SQLiteUserStore(str(tmp_path / "navipro.db"))
+    }
+    store = stores[backend]()
+    expected = two_month_roadmap()
+    store.create_user("user-1", two_month_roadmap())
+    try:
+        for task_id in completion_orders()[order]:
+            linear_scan_complete(expected, task_id)
+            # A fresh index per request, as the endpoints use it
+            index = store.get_task_index("user-1")
+            assert index.mark_completed(index.position_of(task_id), "2026-01-01T00:00:00")
+            index.advance()
+
+            progress = store.get_roadmap("user-1")["progress"]
+            for key in ("current_month", "current_week", "current_day", "total_tasks_completed"):
+                assert progress[key] == expected["progress"][key], (task_id, key)
+            current = store.get_task_index("user-1").current()
+            if expected["progress"]["current_day"] == -1:
+                assert current is None
+            else:
+                task = store.get_task_index("user-1").task_at(current)
+                assert not task.get("completed") and task["day"] == expected["progress"]["current_day"]
+        assert all(task.get("completed") for month in store.get_roadmap("user-1")["roadmap"]
+                   for week in month["weeks"] for task in week["daily_tasks"])
+    finally:
+        store.close()
+
+
+def test_task_index_advances_from_stored_cursor(tmp_path):
+    # Two workers' indexes for one user, loaded before either completed anything
+    path = str(tmp_path / "navipro.db")
+    first, second = SQLiteUserStore(path), SQLiteUserStore(path)
+    try:
+        first.create_user("user-1", small_roadmap("Goal"))
+        stale = second.get_task_index("user-1")
+        index = first.get_task_index("user-1")
+        for pos in range(3):
+            index.mark_completed(pos, "2026-01-01T00:00:00")
+            index.advance()
+        assert index.cursor == 3
+
+        # Out of order: the dict path moves on from the stored task 3 (week 2, day 1), not from task 0
+        assert stale.mark_completed(5, "2026-01-01T00:00:00")
+        stale.advance()
+        fresh = first.get_task_index("user-1")
+        assert (stale.cursor, fresh.cursor) == (4, 4)
+        assert fresh.progress["current_week"] == 2 and fresh.progress["current_day"] == 2
+        assert fresh.completed == 4
+    finally:
+        first.close()
+        second.close()
+
+
+def test_incomplete_backend_fails_when_built():
+    class NoChatStore(UserStore):
+        def create_user(self, user_id, roadmap): ...
+        def get_roadmap(self, user_id): ...
+        def has_user(self, user_id): ...
+        def count_users(self): ...
+        def get_task_index(self, user_id): ...
+
+    with pytest.raises(TypeError, match="append_chat"):
+        NoChatStore()
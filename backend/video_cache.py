@@ -0,0 +1,137 @@
+# backend/video_cache.py
+import os
+import copy
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+import logs
+import metrics
+
+VIDEO_CACHE_BACKEND = os.getenv("VIDEO_CACHE_BACKEND", "memory")  # memory | sqlite | off
+VIDEO_CACHE_PATH = os.getenv("VIDEO_CACHE_PATH", os.path.join(os.path.dirname(__file__), "video_cache.db"))
+VIDEO_CACHE_TTL = float(os.getenv("VIDEO_CACHE_TTL", str(24 * 3600)))
+VIDEO_CACHE_STALE_TTL = float(os.getenv("VIDEO_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+VIDEO_CACHE_MAX_ENTRIES = int(os.getenv("VIDEO_CACHE_MAX_ENTRIES", "5000"))
+VIDEO_CACHE_REFRESH_WORKERS = int(os.getenv("VIDEO_CACHE_REFRESH_WORKERS", "2"))
+VIDEO_CACHE_MAX_PENDING = int(os.getenv("VIDEO_CACHE_MAX_PENDING", "100"))
+
+logger = logs.get_logger(__name__)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return value
+
+
+def video_cache_key(source: str, query: str, **params) -> str:
+    """Hash of the normalized query plus the parameters that change the result"""
+    canonical = {"source": source, "query": _normalize(query), **{k: _normalize(v) for k, v in params.items()}}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class VideoCache:
+    """YouTube result cache with stale-while-revalidate.
+
+    Entries younger than ttl are served as is. Entries up to ttl + stale_ttl old
+    are served immediately while a background worker refetches them. fetch()
+    returning None means "failed, don't cache".
+    """
+
+    def __init__(self, backend=None, ttl: float = VIDEO_CACHE_TTL, refresh_workers: int = VIDEO_CACHE_REFRESH_WORKERS,
+                 max_pending: int = VIDEO_CACHE_MAX_PENDING):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="video-cache")
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Optional[list]]) -> Optional[list]:
+        if self.backend is None:
+            return fetch()
+
+        cached = self.backend.get(key)
+        if cached is None:
+            metrics.VIDEO_CACHE_REQUESTS.inc(result="miss")
+            return self.refresh(key, fetch)
+
+        stored_at, videos = cached
+        if time.time() - stored_at > self.ttl:
+            metrics.VIDEO_CACHE_REQUESTS.inc(result="stale")
+            self.refresh_in_background(key, fetch)
+        else:
+            metrics.VIDEO_CACHE_REQUESTS.inc(result="hit")
+        return copy.deepcopy(videos)
+
+    def refresh(self, key: str, fetch: Callable[[], Optional[list]]) -> Optional[list]:
+        """Fetch now and store the result if it succeeded"""
+        videos = fetch()
+        if videos is not None and self.backend is not None:
+            self.backend.set(key, copy.deepcopy(videos))
+        return videos
+
+    def refresh_in_background(self, key: str, fetch: Callable[[], Optional[list]]) -> bool:
+        """Queue a refresh unless one for key is already pending or the queue is full"""
+        with self._lock:
+            if key in self._refreshing or len(self._refreshing) >= self.max_pending:
+                return False
+            self._refreshing.add(key)
+        self._executor.submit(self._background_refresh, key, fetch)
+        return True
+
+    def prefetch(self, key: str, fetch: Callable[[], Optional[list]]) -> str:
+        """Warm key in the background unless a fresh entry exists; returns what happened"""
+        if self.backend is None:
+            result = "disabled"
+        else:
+            cached = self.backend.get(key)
+            if cached is not None and time.time() - cached[0] <= self.ttl:
+                result = "cached"
+            elif self.refresh_in_background(key, fetch):
+                result = "queued"
+            else:
+                result = "skipped"
+        metrics.VIDEO_PREFETCHES.inc(result=result)
+        return result
+
+    def _background_refresh(self, key: str, fetch: Callable[[], Optional[list]]):
+        try:
+            self.refresh(key, fetch)
+        except Exception as e:
+            logger.warning("Video cache refresh failed", extra={"error": str(e)})
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "refreshing": len(self._refreshing),
+            "requests": metrics.VIDEO_CACHE_REQUESTS.snapshot(),
+            "prefetches": metrics.VIDEO_PREFETCHES.snapshot()
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_video_cache() -> VideoCache:
+    """Build the cache configured by VIDEO_CACHE_* environment variables"""
+    if VIDEO_CACHE_BACKEND == "off":
+        return VideoCache(None)
+    max_age = VIDEO_CACHE_TTL + VIDEO_CACHE_STALE_TTL
+    if VIDEO_CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(
+            VIDEO_CACHE_PATH, table="youtube_videos",
+            max_entries=VIDEO_CACHE_MAX_ENTRIES, max_age=max_age
+        )
+    else:
+        backend = MemoryCacheBackend(max_entries=VIDEO_CACHE_MAX_ENTRIES, max_age=max_age)
+    return VideoCache(backend)